@@ -0,0 +1,59 @@
+"""
+Memory per event and decode cost of a filtered replay.
+
+Compares events with a __dict__ (the previous Event layout) with slotted events,
+and eager decoding of every payload with lazy decoding when the handlers
+read the data of one event out of ten.
+
+    python -m benchmarks.event_memory [events]
+"""
+import sys
+import tracemalloc
+from time import perf_counter
+
+from pyeventor.event import Event
+
+
+class DictEvent(Event[int, dict]):
+    ...
+
+
+class SlottedEvent(Event[int, dict]):
+    __slots__ = ()
+
+
+def memory_per_event(event_class, n: int) -> float:
+    tracemalloc.start()
+    events = [event_class(None, sequence_order=i, version=i) for i in range(n)]
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del events
+    return size / n
+
+
+def replay(rows, lazy: bool) -> float:
+    start = perf_counter()
+    for i, raw in enumerate(rows):
+        event = SlottedEvent.loads(raw, lazy=lazy, sequence_order=i, version=i)
+        if i % 10 == 0:
+            event.data
+    return perf_counter() - start
+
+
+def main(n: int = 200_000):
+    print(f"events: {n}")
+    for event_class in (DictEvent, SlottedEvent):
+        size = memory_per_event(event_class, n)
+        print(f"  {event_class.__name__}: {size:,.0f} bytes per event")
+
+    rows = [
+        SlottedEvent({"amount": i, "currency": "EUR", "note": "x" * 50}).dumps()
+        for i in range(n)
+    ]
+    eager, lazy = replay(rows, lazy=False), replay(rows, lazy=True)
+    print(f"  eager decode: {eager * 1e3:,.0f} ms")
+    print(f"  lazy decode, 10% read: {lazy * 1e3:,.0f} ms ({eager / lazy:.1f}x)")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
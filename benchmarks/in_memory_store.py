@@ -0,0 +1,84 @@
+"""
+Read latency of InMemoryEventStore.
+
+Compares the previous list-scan store with the sorted, bisect-indexed one
+for range, type-filtered and snapshot lookups.
+
+    python -m benchmarks.in_memory_store [events]
+"""
+import sys
+from functools import partial
+from timeit import timeit
+
+from pyeventor.event import Event, JsonSnapshot
+from pyeventor.plugins.in_memory_store import InMemoryEventStore
+
+
+class Deposited(Event[int, int]):
+    ...
+
+
+class Withdrawn(Event[int, int]):
+    ...
+
+
+class ListScanEventStore:
+    """The store before the indexes: lists of (type, event) scanned on each read"""
+
+    def __init__(self):
+        self.events = {}
+        self.snapshots = {}
+
+    def get_events(self, aggregate_id, event_types=[], gt=None, lte=None):
+        events = self.events.get(aggregate_id, [])
+        if event_types:
+            events = [e for e in events if isinstance(e[1], tuple(event_types))]
+        if gt:
+            events = [e for e in events if e[1].sequence_order > gt]
+        if lte:
+            events = [e for e in events if e[1].sequence_order <= lte]
+        return [e[1] for e in events]
+
+    def save_events(self, events, aggregate_id):
+        self.events.setdefault(aggregate_id, []).extend((type(e), e) for e in events)
+
+    def save_snapshots(self, snapshots, aggregate_id):
+        self.snapshots.setdefault(aggregate_id, []).extend(
+            (type(s), s) for s in snapshots
+        )
+
+    def get_last_snapshot(self, aggregate_id, snapshot_type=None, load_at=None):
+        snapshots = self.snapshots.get(aggregate_id, [])
+        if snapshot_type:
+            snapshots = [s for s in snapshots if isinstance(s[1], snapshot_type)]
+        if load_at:
+            snapshots = [s for s in snapshots if s[1].sequence_order <= load_at]
+        return snapshots[-1][1] if snapshots else None
+
+
+def main(n: int = 100_000):
+    events = [
+        (Deposited if i % 4 else Withdrawn)(1, sequence_order=i + 1) for i in range(n)
+    ]
+    snapshots = [JsonSnapshot({}, sequence_order=i + 1) for i in range(0, n, 100)]
+    queries = {
+        "tail (gt=n-10)": lambda s: s.get_events("a", gt=n - 10),
+        "window (gt, lte)": lambda s: s.get_events("a", gt=n // 2, lte=n // 2 + 10),
+        "type + tail": lambda s: s.get_events("a", [Withdrawn], gt=n - 100),
+        "last snapshot": lambda s: s.get_last_snapshot(
+            "a", JsonSnapshot, load_at=n // 2
+        ),
+    }
+
+    print(f"events: {n}")
+    for store in (ListScanEventStore(), InMemoryEventStore()):
+        store.save_events(events, "a")
+        store.save_snapshots(snapshots, "a")
+        print(type(store).__name__)
+        for name, query in queries.items():
+            seconds = timeit(partial(query, store), number=20) / 20
+            print(f"  {name}: {seconds * 1e6:,.1f} us")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,71 @@
+"""
+Replay throughput of Aggregate._apply_without_saving.
+
+Compares the legacy lookup (MRO walk + inspect.signature for every event)
+with the cached dispatch table of EventHandler.get_invoker.
+
+    python -m benchmarks.replay [events]
+"""
+import inspect
+import sys
+from time import perf_counter
+
+from pyeventor.aggregate import Aggregate
+from pyeventor.decorator import register_handler
+from pyeventor.event import Event
+from pyeventor.handler import EventHandler
+
+
+class Deposited(Event[int, int]):
+    ...
+
+
+class Withdrawn(Event[int, int]):
+    ...
+
+
+class Account(Aggregate[str]):
+    def _init_empty_attributes(self):
+        self.balance = 0
+
+    @register_handler(Deposited)
+    def deposited(self, event: Deposited):
+        self.balance += event.data
+
+
+class SavingsAccount(Account):
+    @register_handler(Withdrawn)
+    def withdrawn(self, event: Withdrawn):
+        self.balance -= event.data
+
+
+def legacy_apply(aggregate, event):
+    handler = EventHandler.get_handler(type(aggregate), type(event))
+    for _, v in inspect.signature(handler).parameters.items():
+        if issubclass(v.annotation, aggregate.__class__):
+            handler(event, aggregate)
+            return aggregate
+        if issubclass(v.annotation, Event):
+            handler(aggregate, event)
+            return aggregate
+
+
+def run(apply, events) -> float:
+    aggregate = SavingsAccount()
+    start = perf_counter()
+    for event in events:
+        apply(aggregate, event)
+    return len(events) / (perf_counter() - start)
+
+
+def main(n: int = 100_000):
+    events = [[Deposited(1), Withdrawn(1), Deposited(2)][i % 3] for i in range(n)]
+    before = run(legacy_apply, events)
+    after = run(lambda a, e: a._apply_without_saving(e), events)
+    print(f"events: {n}")
+    print(f"legacy dispatch: {before:,.0f} events/sec")
+    print(f"cached dispatch: {after:,.0f} events/sec ({after / before:.1f}x)")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
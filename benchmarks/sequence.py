@@ -0,0 +1,52 @@
+"""
+Cost of the sequence strategies.
+
+Generation of the sequence_order of new events, and range lookups
+in the in-memory store with datetime and integer sequence orders.
+
+    python -m benchmarks.sequence [events]
+"""
+import sys
+from time import perf_counter
+
+from pyeventor.event import Event
+from pyeventor.plugins.in_memory_store import SequenceIndex
+from pyeventor.sequence import Timestamp, HybridLogicalClock, StreamVersion
+
+
+class Stamped(Event[int, None]):
+    __slots__ = ()
+
+
+def generate(strategy, n: int) -> float:
+    start = perf_counter()
+    for _ in range(n):
+        strategy.generate()
+    return perf_counter() - start
+
+
+def lookups(orders: list) -> float:
+    index = SequenceIndex()
+    for version, order in enumerate(orders, start=1):
+        index.add(Stamped(None, sequence_order=order, version=version))
+    start = perf_counter()
+    for order in orders:
+        for _ in index.range(gt=order, lte=order):
+            pass
+    return perf_counter() - start
+
+
+def main(n: int = 200_000):
+    print(f"events: {n}")
+    for strategy in (Timestamp(), HybridLogicalClock(), StreamVersion()):
+        seconds = generate(strategy, n)
+        print(f"  {type(strategy).__name__}: {seconds / n * 1e9:,.0f} ns per event")
+
+    timestamps = [Timestamp().generate() for _ in range(n)]
+    clock = [HybridLogicalClock().generate() for _ in range(n)]
+    print(f"  datetime lookups: {lookups(timestamps) * 1e3:,.0f} ms")
+    print(f"  integer lookups: {lookups(clock) * 1e3:,.0f} ms")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,66 @@
+"""
+Load latency of EventStore.load from a full replay and from a snapshot.
+
+The snapshot is taken `tail` events before the end of the stream, so the
+snapshot load replays only those events on top of it.
+
+    python -m benchmarks.snapshot_load [tail] [events ...]
+"""
+import sys
+from functools import partial
+from timeit import timeit
+
+from pyeventor.aggregate import Aggregate
+from pyeventor.decorator import register_handler
+from pyeventor.event import Event, JsonSnapshot
+from pyeventor.plugins.in_memory_store import InMemoryEventStore
+
+
+class Deposited(Event[int, int]):
+    ...
+
+
+class Account(Aggregate[str]):
+    def _init_empty_attributes(self):
+        self.balance = 0
+
+    @register_handler(Deposited)
+    def deposited(self, event: Deposited):
+        self.balance += event.data
+
+
+class AccountStore(InMemoryEventStore):
+    _AggregatedClass = Account
+
+
+def main(tail: int = 100, *sizes: int):
+    for n in sizes or (10_000, 100_000, 1_000_000):
+        store = AccountStore()
+        store.save_events(
+            [Deposited(1, sequence_order=i + 1) for i in range(n)], "account"
+        )
+        snapshot_at = n - tail
+        store.save_snapshots(
+            [JsonSnapshot({"balance": snapshot_at}, sequence_order=snapshot_at)],
+            "account",
+        )
+
+        full = store.load("account", from_snapshots=False)
+        from_snapshot = store.load("account")
+        assert full.balance == from_snapshot.balance == n
+
+        number = max(1, 100_000 // n)
+        full_seconds = timeit(
+            partial(store.load, "account", from_snapshots=False), number=number
+        )
+        snapshot_seconds = timeit(partial(store.load, "account"), number=number)
+        print(f"events: {n}, tail: {tail}")
+        print(f"  full replay: {full_seconds / number * 1e3:,.2f} ms")
+        print(
+            f"  snapshot + tail: {snapshot_seconds / number * 1e3:,.3f} ms "
+            f"({full_seconds / snapshot_seconds:,.0f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,70 @@
+"""
+Snapshot create/restore of a large aggregate and size/speed of the serializers.
+
+Compares the previous __dict__ scraping (inspect.ismethod per attribute) and
+per-key setattr with the cached SnapshotSchema and __dict__.update.
+
+    python -m benchmarks.snapshot_serialization [attributes]
+"""
+import inspect
+import sys
+from functools import partial
+from timeit import timeit
+
+from pyeventor.aggregate import Aggregate
+from pyeventor.event import JsonSnapshot
+from pyeventor.serializer import JsonSerializer, PickleSerializer, MsgpackSerializer
+
+
+def legacy_create(aggregate):
+    return JsonSnapshot(
+        data={
+            k: v
+            for k, v in aggregate.__dict__.items()
+            if not k.startswith("_") and not inspect.ismethod(getattr(aggregate, k))
+        }
+    )
+
+
+def legacy_restore(cls, aggregate_id, snapshot):
+    obj = cls(aggregate_id)
+    for k, v in snapshot.data.items():
+        setattr(obj, k, v)
+    return obj
+
+
+def main(n: int = 500):
+    class Large(Aggregate[str]):
+        def _init_empty_attributes(self):
+            for i in range(n):
+                setattr(self, f"field_{i}", {"count": i, "name": f"name {i}"})
+
+    aggregate = Large("large")
+    snapshot = JsonSnapshot.create(aggregate)
+    number = 2000
+
+    def us(fn) -> str:
+        return f"{timeit(fn, number=number) / number * 1e6:,.1f} us"
+
+    print(f"attributes: {n}")
+    print(f"  create legacy: {us(lambda: legacy_create(aggregate))}")
+    print(f"  create schema: {us(lambda: JsonSnapshot.create(aggregate))}")
+    print(f"  restore legacy: {us(lambda: legacy_restore(Large, 'id', snapshot))}")
+    print(f"  restore update: {us(lambda: Large.from_snapshot('id', snapshot))}")
+
+    serializers = [JsonSerializer(), PickleSerializer()]
+    try:
+        serializers.append(MsgpackSerializer())
+    except ImportError:
+        pass
+    for serializer in serializers:
+        raw = serializer.dumps(snapshot.data)
+        print(
+            f"  {type(serializer).__name__}: {len(raw):,} bytes, "
+            f"dumps {us(partial(serializer.dumps, snapshot.data))}, "
+            f"loads {us(partial(serializer.loads, raw))}"
+        )
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
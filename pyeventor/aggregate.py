@@ -2,9 +2,12 @@ from abc import ABC
 from pyeventor.event import Event, Snapshot, JsonSnapshot
 from uuid import uuid4
 from pyeventor.exceptions import HandlerException
-from typing import Generic, TypeVar, Optional, Protocol, Type
+from typing import Any, Generic, TypeVar, Optional, Protocol, Type
 from pyeventor.handler import EventHandler
-import inspect
+from pyeventor.schema import SnapshotSchema
+from pyeventor.snapshot_policy import SnapshotPolicy, EveryNVersions
+from datetime import datetime
+from time import time
 from abc import abstractmethod
 
 IdTypeHint = TypeVar("IdTypeHint")
@@ -18,6 +21,11 @@ class AttributesI(Protocol, Generic[IdTypeHint]):
     def _init_attributes(self, aggregate_id: Optional[IdTypeHint] = None):
         self._init_empty_attributes()
         self._aggregate_id = aggregate_id or self._id_factory()
+        self._version = 0
+        self._last_sequence_order = None
+        self._snapshot_version = 0
+        self._snapshot_time = time()
+        self._replay_seconds_per_event: Optional[float] = None
 
     def _init_empty_attributes(self):
         ...
@@ -26,17 +34,57 @@ class AttributesI(Protocol, Generic[IdTypeHint]):
     def id(self) -> IdTypeHint:
         return self._aggregate_id
 
+    @property
+    def version(self) -> int:
+        """Version of the stored stream the object was built from"""
+        return self._version
+
+    @property
+    def last_sequence_order(self):
+        """sequence_order of the last stored event (or snapshot) the object was built from"""
+        return self._last_sequence_order
+
+    @property
+    def snapshot_version(self) -> int:
+        """Version of the last snapshot the object was built from or has taken"""
+        return self._snapshot_version
+
+    @property
+    def snapshot_time(self) -> float:
+        """Timestamp of the last snapshot, or of the object creation if there is none"""
+        return self._snapshot_time
+
+    @property
+    def replay_seconds_per_event(self) -> Optional[float]:
+        """Time spent per event by the store the last time the object was loaded"""
+        return self._replay_seconds_per_event
+
+    def _mark_stored(self, event: Event) -> None:
+        """Move the stored position to the event, loaded from or saved to the store"""
+        if event.version is not None:
+            self._version = event.version
+        elif not isinstance(event, Snapshot):
+            self._version += 1
+        self._last_sequence_order = event.sequence_order
+        if isinstance(event, Snapshot):
+            self._snapshot_version = self._version
+            self._snapshot_time = (
+                event.sequence_order.timestamp()
+                if isinstance(event.sequence_order, datetime)
+                else time()
+            )
+
+    def _mark_replayed(self, events: int, seconds: float) -> None:
+        """Record the replay cost measured by the store on load"""
+        if events:
+            self._replay_seconds_per_event = seconds / events
+
 
 class ApplyI(Protocol):
     def _apply_without_saving(self, event: Event) -> "ApplyI":
-        if handler := EventHandler.get_handler(type(self), type(event)):
-            for _, v in inspect.signature(handler).parameters.items():
-                if issubclass(v.annotation, self.__class__):
-                    handler(event, self)
-                    return self
-                if issubclass(v.annotation, Event):
-                    handler(self, event)
-                    return self
+        if invoker := EventHandler.get_invoker(type(self), type(event)):
+            invoker(self, event)
+            return self
         raise HandlerException(f"handler for {event.__class__.__name__} not found")
 
     @abstractmethod
@@ -63,13 +111,44 @@ class SnapshotFromJsonI(Protocol[IdTypeHint]):
         cls, aggregate_id: IdTypeHint, snapshot: SnapshotClass
     ) -> "Aggregate":
         obj = cls(aggregate_id)
-        for k, v in snapshot.data.items():
-            setattr(obj, k, v)
+        SnapshotSchema.restore(obj, snapshot.data)
         return obj
 
 
 class SnapshotCreateI(SnapshotFromI[IdTypeHint]):
     projection_snapshot_classes: list[Type[Snapshot]] = []
+    # decides when apply takes snapshots, also used for the aggregates created by the store
+    snapshot_policy: Optional[SnapshotPolicy] = None
+
+    @property
+    def pending_version(self) -> int:
+        """Version of the stream once the uncommited events are stored"""
+        return max(self._pending_version, self._version)
+
+    @property
+    def events_since_snapshot(self) -> int:
+        return self.pending_version - self._snapshot_version
+
+    def _snapshot_if_needed(self) -> None:
+        if not self._snapshot_policy or not self._snapshot_policy.should_snapshot(self):
+            return
+        version = self.pending_version
+        self._pending_events.extend(self._create_snapshots(version))
+        self._snapshot_version = version
+        self._snapshot_time = time()
+
+    def _create_snapshots(
+        self, version: int, sequence_order: Optional[Any] = None
+    ) -> list[Snapshot]:
+        """Snapshots of the aggregate and its projections, taken at the stream version"""
+        snapshots = [self.SnapshotClass.create(self)]
+        for snapshot_projection in self.projection_snapshot_classes:
+            snapshots.append(snapshot_projection.create(self))
+        for snapshot in snapshots:
+            snapshot.version = version
+            if sequence_order is not None:
+                snapshot._sequence_order = sequence_order
+        return snapshots
 
     @abstractmethod
     def create_snapshot(self) -> Snapshot:
@@ -78,12 +157,7 @@ class SnapshotCreateI(SnapshotFromI[IdTypeHint]):
 
 class SnapshotCreateJsonI(SnapshotFromJsonI[IdTypeHint], SnapshotCreateI[IdTypeHint]):
     def create_snapshot(self) -> JsonSnapshot:
-        attributes = {
-            k: v
-            for k, v in self.__dict__.items()
-            if not k.startswith("_") and not inspect.ismethod(getattr(self, k))
-        }
-        return JsonSnapshot(data=attributes)
+        return self.SnapshotClass(data=SnapshotSchema.attributes_of(self))
 
 
 class Aggregate(
@@ -100,25 +174,26 @@ class Aggregate(
         self,
         aggregate_id: Optional[IdTypeHint] = None,
         auto_snapshot_each_n: Optional[int] = None,
+        snapshot_policy: Optional[SnapshotPolicy] = None,
     ):
+        """
+        auto_snapshot_each_n: shortcut for snapshot_policy=EveryNVersions(n)
+        snapshot_policy: overrides the snapshot_policy of the class for this instance
+        """
         super()._init_attributes(aggregate_id)
-        self._auto_snapshot_each_n = auto_snapshot_each_n
+        if not snapshot_policy and auto_snapshot_each_n:
+            snapshot_policy = EveryNVersions(auto_snapshot_each_n)
+        self._snapshot_policy = snapshot_policy or self.snapshot_policy
         self._events_applied = 0
+        self._pending_version = 0
         self._pending_events: list[Event] = []
 
     def apply(self, event: Event) -> "Aggregate":
         self._apply_without_saving(event)
         self._events_applied += 1
+        self._pending_version = self.pending_version + 1
         self._pending_events.append(event)
-        if (
-            self._auto_snapshot_each_n
-            and self._events_applied % self._auto_snapshot_each_n == 0
-        ):
-            snapshots = []
-            snapshots.append(self.SnapshotClass.create(self))
-            for snapshot_projection in self.projection_snapshot_classes:
-                snapshots.append(snapshot_projection.create(self))
-            self._pending_events.extend(snapshots)
+        self._snapshot_if_needed()
         return self
 
 
@@ -126,6 +201,14 @@ class Projection(ABC, AttributesI[IdTypeHint], ApplyI, SnapshotFromJsonI[IdTypeH
     def __init__(self, aggregate_id: Optional[IdTypeHint] = None):
         super()._init_attributes(aggregate_id)
 
+    @classmethod
+    def projection_name(cls) -> str:
+        """
+        Name the states and checkpoints of the projection are stored under.
+        Set __projection_name__ to keep it when the class is renamed or moved
+        """
+        return cls.__dict__.get("__projection_name__", cls.__name__)
+
     def apply(self, event: Event) -> "Projection":
         self._apply_without_saving(event)
         return self
@@ -3,7 +3,7 @@ from pyeventor.event import Event
 from pyeventor.exceptions import HandlerException
 from typing import Optional, Protocol
 from pyeventor.handler import EventHandler
-import inspect
+from pyeventor.snapshot_policy import SnapshotPolicy, EveryNVersions
 from pyeventor.aggregate import (
     AttributesI,
     SnapshotFromJsonI,
@@ -14,14 +14,9 @@ from pyeventor.aggregate import (
 
 class ApplyAsyncI(Protocol):
     async def _apply_without_saving(self, event: Event) -> "ApplyAsyncI":
-        if handler := EventHandler.get_handler(type(self), type(event)):
-            for _, v in inspect.signature(handler).parameters.items():
-                if issubclass(v.annotation, self.__class__):
-                    await handler(event, self)
-                    return self
-                if issubclass(v.annotation, Event):
-                    await handler(self, event)
-                    return self
+        if invoker := EventHandler.get_invoker(type(self), type(event)):
+            await invoker(self, event)
+            return self
         raise HandlerException(f"handler for {event.__class__.__name__} not found")
 
     @abstractmethod
@@ -43,25 +38,26 @@ class AsyncAggregate(
         self,
         aggregate_id: Optional[IdTypeHint] = None,
         auto_snapshot_each_n: Optional[int] = None,
+        snapshot_policy: Optional[SnapshotPolicy] = None,
     ):
+        """
+        auto_snapshot_each_n: shortcut for snapshot_policy=EveryNVersions(n)
+        snapshot_policy: overrides the snapshot_policy of the class for this instance
+        """
         super()._init_attributes(aggregate_id)
-        self._auto_snapshot_each_n = auto_snapshot_each_n
+        if not snapshot_policy and auto_snapshot_each_n:
+            snapshot_policy = EveryNVersions(auto_snapshot_each_n)
+        self._snapshot_policy = snapshot_policy or self.snapshot_policy
         self._events_applied = 0
+        self._pending_version = 0
         self._pending_events: list[Event] = []
 
     async def apply(self, event: Event) -> "Aggregate":
         await self._apply_without_saving(event)
         self._events_applied += 1
+        self._pending_version = self.pending_version + 1
         self._pending_events.append(event)
-        if (
-            self._auto_snapshot_each_n
-            and self._events_applied % self._auto_snapshot_each_n == 0
-        ):
-            snapshots = []
-            snapshots.append(self.SnapshotClass.create(self))
-            for snapshot_projection in self.projection_snapshot_classes:
-                snapshots.append(snapshot_projection.create(self))
-            self._pending_events.extend(snapshots)
+        self._snapshot_if_needed()
         return self
 
 
@@ -71,6 +67,14 @@ class AsyncProjection(
     def __init__(self, aggregate_id: Optional[IdTypeHint] = None):
         super()._init_attributes(aggregate_id)
 
+    @classmethod
+    def projection_name(cls) -> str:
+        """
+        Name the states and checkpoints of the projection are stored under.
+        Set __projection_name__ to keep it when the class is renamed or moved
+        """
+        return cls.__dict__.get("__projection_name__", cls.__name__)
+
     async def apply(self, event: Event) -> "Projection":
         await self._apply_without_saving(event)
         return self
@@ -0,0 +1,51 @@
+import asyncio
+from copy import deepcopy
+from typing import Any, Awaitable, Callable, Generic, Optional
+
+from pyeventor.aggregate import IdTypeHint
+from pyeventor.asyncio.event_store import AggregateAsyncHint, AsyncEventStore
+from pyeventor.command import RetryPolicy
+from pyeventor.exceptions import ConcurrencyException
+
+
+class AsyncCommandExecutor(Generic[AggregateAsyncHint]):
+    """
+    Run commands on the aggregates of the store: load -> command -> save.
+    On ConcurrencyException only the new events are applied to the loaded aggregate
+    and the command is retried on it.
+    """
+
+    def __init__(
+        self,
+        store: AsyncEventStore[Any, Any, AggregateAsyncHint],
+        retry_policy: Optional[RetryPolicy] = None,
+    ):
+        self.store = store
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.executions = 0
+        self.conflicts = 0
+        self.retries = 0
+
+    async def execute(
+        self,
+        aggregate_id: IdTypeHint,
+        command: Callable[[AggregateAsyncHint], Awaitable[Any]],
+    ) -> AggregateAsyncHint:
+        """Run the command and save the aggregate, return the saved aggregate"""
+        self.executions += 1
+        loaded = await self.store.load(aggregate_id)
+        retry = 0
+        while True:
+            aggregate = deepcopy(loaded)
+            await command(aggregate)
+            try:
+                await self.store.save(aggregate)
+                return aggregate
+            except ConcurrencyException:
+                self.conflicts += 1
+                if retry >= self.retry_policy.max_retries:
+                    raise
+                retry += 1
+                self.retries += 1
+                await asyncio.sleep(self.retry_policy.delay(retry))
+                await self.store.refresh(loaded)
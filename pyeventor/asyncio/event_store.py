@@ -1,11 +1,27 @@
+import asyncio
 from abc import ABC, abstractmethod
+from copy import deepcopy
+from time import perf_counter
 from typing import Generic, TypeVar, List, Optional, Type, Protocol
+from typing import TYPE_CHECKING, Any, AsyncIterator, Awaitable, Callable, Iterable
 from pyeventor.event import Event, Snapshot
 from pyeventor.aggregate import Projection, IdTypeHint
 from pyeventor.asyncio.aggregate import AsyncAggregate
 from pyeventor.handler import EventHandler
+from pyeventor.cache import AggregateCache, SnapshotCache, NOT_CACHED
+from pyeventor.event_store import (
+    UnitOfWork,
+    split_uncommited_events,
+    place_snapshots,
+    upcast_event,
+    upcast_snapshot,
+)
 from contextlib import asynccontextmanager
 
+if TYPE_CHECKING:
+    from pyeventor.asyncio.snapshotter import AsyncBackgroundSnapshotter
+    from pyeventor.asyncio.materialized import AsyncMaterializer
+
 AggregateAsyncHint = TypeVar("AggregateAsyncHint", bound=AsyncAggregate)
 SequenceHint = TypeVar("SequenceHint")
 
@@ -17,6 +33,16 @@ class SnapshotStoreAsyncI(Protocol, Generic[IdTypeHint, SequenceHint]):
     ) -> None:
         raise NotImplementedError()
 
+    async def save_snapshots_batch(
+        self, snapshots: dict[IdTypeHint, list[Snapshot]]
+    ) -> None:
+        """
+        Save snapshots of several aggregates at once.
+        Override to write them with a single query.
+        """
+        for aggregate_id, aggregate_snapshots in snapshots.items():
+            await self.save_snapshots(aggregate_snapshots, aggregate_id)
+
     @abstractmethod
     async def get_last_snapshot(
         self,
@@ -30,6 +56,24 @@ class SnapshotStoreAsyncI(Protocol, Generic[IdTypeHint, SequenceHint]):
         """
         raise NotImplementedError()
 
+    async def get_last_snapshots(
+        self,
+        aggregate_ids: Iterable[IdTypeHint],
+        snapshot_type: Optional[Type[Snapshot]] = None,
+        load_at: Optional[SequenceHint] = None,
+    ) -> dict[IdTypeHint, Snapshot]:
+        """
+        Last snapshots of several aggregates, aggregates without snapshot are omitted.
+        Override to fetch them with a single query.
+        """
+        snapshots = {}
+        for aggregate_id in aggregate_ids:
+            if snapshot := await self.get_last_snapshot(
+                aggregate_id, snapshot_type, load_at
+            ):
+                snapshots[aggregate_id] = snapshot
+        return snapshots
+
 
 class EventStoreAsyncI(Protocol, Generic[SequenceHint, IdTypeHint, AggregateAsyncHint]):
     _AggregatedClass: Type[AggregateAsyncHint]
@@ -56,14 +100,128 @@ class EventStoreAsyncI(Protocol, Generic[SequenceHint, IdTypeHint, AggregateAsyn
         """
         raise NotImplementedError()
 
+    async def aiter_events(
+        self,
+        aggregate_id: IdTypeHint,
+        event_types: list[Type[Event]] = [],
+        gt: Optional[SequenceHint] = None,
+        lte: Optional[SequenceHint] = None,
+    ) -> AsyncIterator[Event]:
+        """
+        Same as get_events, but yield the events one by one.
+        Override to stream them from the storage without loading the whole list.
+        """
+        for event in await self.get_events(aggregate_id, event_types, gt=gt, lte=lte):
+            yield event
+
+    async def aiter_events_after_version(
+        self, aggregate_id: IdTypeHint, version: int
+    ) -> AsyncIterator[Event]:
+        """
+        Events of the aggregate with a version greater than version, in version order,
+        whatever their sequence_order. Events stored without a version are numbered
+        by their position in the stream. Override to select them in the storage.
+        """
+        tail = []
+        stored = 0
+        async for event in self.aiter_events(aggregate_id):
+            stored += 1
+            event_version = event.version if event.version is not None else stored
+            if event_version > version:
+                tail.append((event_version, event))
+        tail.sort(key=lambda pair: pair[0])
+        for _, event in tail:
+            yield event
+
+    async def get_events_batch(
+        self,
+        gt_by_aggregate: dict[IdTypeHint, Optional[SequenceHint]],
+        event_types: list[Type[Event]] = [],
+        lte: Optional[SequenceHint] = None,
+    ) -> dict[IdTypeHint, List[Event]]:
+        """
+        Events of several aggregates, each aggregate with its own gt.
+        Override to fetch them with a single query.
+        """
+        return {
+            aggregate_id: await self.get_events(
+                aggregate_id, event_types, gt=gt, lte=lte
+            )
+            for aggregate_id, gt in gt_by_aggregate.items()
+        }
+
+    async def get_all_events(
+        self, after_position: int = 0, limit: int = 1000
+    ) -> List[Event]:
+        """
+        Events of all the aggregates stored after after_position, in commit order,
+        with their aggregate_id and position set.
+        Positions start from 1 and have no gaps. Override in the stores keeping a global log.
+        """
+        raise NotImplementedError()
+
+    async def get_aggregate_ids(self) -> List[IdTypeHint]:
+        """Ids of all the aggregates with stored events"""
+        raise NotImplementedError()
+
+    async def get_last_position(self) -> int:
+        """Position of the last stored event, 0 if the store is empty"""
+        raise NotImplementedError()
+
+    async def read_all(
+        self, from_position: int = 0, batch_size: int = 1000
+    ) -> AsyncIterator[List[Event]]:
+        """Batches of the events stored after from_position, until the end of the log"""
+        while batch := await self.get_all_events(from_position, batch_size):
+            yield batch
+            if len(batch) < batch_size:
+                return
+            from_position = batch[-1].position
+
+    async def subscribe(
+        self,
+        from_position: int = 0,
+        batch_size: int = 1000,
+        poll_interval: float = 1.0,
+    ) -> AsyncIterator[List[Event]]:
+        """
+        Catch-up subscription: batches of the stored events,
+        then of the new ones as they are saved, polling every poll_interval seconds
+        """
+        while True:
+            async for batch in self.read_all(from_position, batch_size):
+                yield batch
+                from_position = batch[-1].position
+            await asyncio.sleep(poll_interval)
+
+    async def save_events_batch(self, events: dict[IdTypeHint, List[Event]]) -> None:
+        """
+        Save events of several aggregates at once.
+        Override to write them with a single query.
+        """
+        for aggregate_id, aggregate_events in events.items():
+            await self.save_events(aggregate_events, aggregate_id)
+
     @asynccontextmanager
     async def transaction(self):
         yield
 
+    async def after_commit(self, callback: Callable[[], Awaitable[None]]) -> None:
+        """
+        Await callback once the current transaction is committed, right away outside of one.
+        Override in stores with nested transactions, so a save nested in an outer
+        transaction is only seen by the caches once the outer transaction is committed.
+        """
+        await callback()
+
     @abstractmethod
     async def save(self, aggregate: AggregateAsyncHint) -> None:
         ...
 
+    @abstractmethod
+    async def save_many(self, aggregates: Iterable[AggregateAsyncHint]) -> None:
+        ...
+
     @abstractmethod
     async def load(
         self,
@@ -73,6 +231,19 @@ class EventStoreAsyncI(Protocol, Generic[SequenceHint, IdTypeHint, AggregateAsyn
     ) -> Optional[AggregateAsyncHint]:
         ...
 
+    @abstractmethod
+    async def refresh(self, aggregate: AggregateAsyncHint) -> AggregateAsyncHint:
+        ...
+
+    @abstractmethod
+    async def load_many(
+        self,
+        aggregate_ids: Iterable[IdTypeHint],
+        load_at: Optional[SequenceHint] = None,
+        from_snapshots: bool = True,
+    ) -> dict[IdTypeHint, AggregateAsyncHint]:
+        ...
+
 
 class ProjectionStoreAsyncI(Protocol, Generic[SequenceHint]):
     @abstractmethod
@@ -85,6 +256,16 @@ class ProjectionStoreAsyncI(Protocol, Generic[SequenceHint]):
     ) -> Optional[Projection]:
         ...
 
+    @abstractmethod
+    async def load_projections_many(
+        self,
+        aggregate_ids: Iterable[IdTypeHint],
+        projection_class: Type[Projection],
+        load_at: Optional[SequenceHint] = None,
+        from_snapshots: bool = True,
+    ) -> dict[IdTypeHint, Projection]:
+        ...
+
 
 class AsyncEventStore(
     ABC,
@@ -92,21 +273,85 @@ class AsyncEventStore(
     ProjectionStoreAsyncI[SequenceHint],
     SnapshotStoreAsyncI[IdTypeHint, SequenceHint],
 ):
+    # set to AggregateCache to keep loaded and saved aggregates in memory
+    aggregate_cache: Optional[AggregateCache] = None
+    # set to SnapshotCache to keep the last snapshots in memory
+    snapshot_cache: Optional[SnapshotCache] = None
+    # set to AsyncBackgroundSnapshotter to take snapshots off the command path
+    snapshotter: Optional["AsyncBackgroundSnapshotter"] = None
+    # set to AsyncMaterializer to keep the state of projections up to date on save
+    materializer: Optional["AsyncMaterializer"] = None
+
     async def save(self, aggregate: AggregateAsyncHint) -> None:
-        async with self.transaction():
-            events_for_save = aggregate.uncommmited_events
-            if not events_for_save:
-                return
+        await self.save_many([aggregate])
+
+    async def save_many(self, aggregates: Iterable[AggregateAsyncHint]) -> None:
+        """Save uncommited events of all the aggregates in one transaction"""
+        aggregates = [a for a in aggregates if a.uncommmited_events]
+        if not aggregates:
+            return
 
-            snapshots = [s for s in events_for_save if isinstance(s, Snapshot)]
-            events_without_snapshots = [
-                s for s in events_for_save if not isinstance(s, Snapshot)
-            ]
+        async with self.transaction():
+            snapshots, events = split_uncommited_events(aggregates)
+            # events first, the store may assign their sequence_order
+            if events:
+                await self.save_events_batch(events)
             if snapshots:
-                await self.save_snapshots(snapshots, aggregate.id)
-            if events_without_snapshots:
-                await self.save_events(events_without_snapshots, aggregate.id)
-            aggregate.uncommmited_events.clear()
+                place_snapshots(snapshots, events)
+                await self.save_snapshots_batch(snapshots)
+            if events and self.materializer is not None:
+                await self.materializer.on_save(self, events)
+            for aggregate in aggregates:
+                for event in events.get(aggregate.id, []):
+                    aggregate._mark_stored(event)
+                aggregate.uncommmited_events.clear()
+            # the aggregates may change before an outer transaction is committed
+            saved = (
+                [deepcopy(aggregate) for aggregate in aggregates]
+                if self.aggregate_cache is not None or self.snapshotter is not None
+                else []
+            )
+
+        # a save rolled back with an outer transaction leaves the caches,
+        # the snapshotter and the materializer untouched
+        await self.after_commit(lambda: self._committed(saved, snapshots, events))
+
+    async def _committed(
+        self,
+        aggregates: list[AggregateAsyncHint],
+        snapshots: dict[Any, list[Snapshot]],
+        events: dict[Any, list[Event]],
+    ) -> None:
+        await self._cache_saved(aggregates, snapshots)
+        if self.snapshotter is not None:
+            for aggregate in aggregates:
+                await self.snapshotter.notify(aggregate)
+        if events and self.materializer is not None:
+            await self.materializer.on_commit(self, events)
+
+    async def _cache_saved(
+        self,
+        aggregates: list[AggregateAsyncHint],
+        snapshots: dict[Any, list[Snapshot]],
+    ) -> None:
+        if self.aggregate_cache is not None:
+            for aggregate in aggregates:
+                self.aggregate_cache.put(aggregate)
+        if self.snapshot_cache is not None:
+            for aggregate_id, aggregate_snapshots in snapshots.items():
+                self.snapshot_cache.save(aggregate_id, aggregate_snapshots)
+
+    @asynccontextmanager
+    async def unit_of_work(self) -> AsyncIterator[UnitOfWork[AggregateAsyncHint]]:
+        """
+        Collect aggregates and save them together on exit
+
+            async with store.unit_of_work() as uow:
+                uow.add(aggregate)
+        """
+        uow: UnitOfWork[AggregateAsyncHint] = UnitOfWork()
+        yield uow
+        await self.save_many(uow.aggregates)
 
     async def load(
         self,
@@ -114,39 +359,65 @@ class AsyncEventStore(
         load_at: Optional[SequenceHint] = None,
         from_snapshots: bool = True,
     ) -> Optional[AggregateAsyncHint]:
+        use_cache = self.aggregate_cache is not None and load_at is None
+        if use_cache and (cached := self.aggregate_cache.get(aggregate_id)):
+            aggregate = await self.refresh(deepcopy(cached))
+            if aggregate.version != cached.version:
+                self.aggregate_cache.put(deepcopy(aggregate))
+            return aggregate
 
         snapshot = (
-            await self.get_last_snapshot(
-                aggregate_id,
-                snapshot_type=self._AggregatedClass.SnapshotClass,
-                load_at=load_at,
+            await self._get_last_snapshot(
+                aggregate_id, self._AggregatedClass.SnapshotClass, load_at
             )
             if from_snapshots
             else None
         )
         if snapshot:
-            actual_snapshot = snapshot.upcast()
-            while type(actual_snapshot) != type(snapshot):
-                snapshot = actual_snapshot
-                actual_snapshot = snapshot.upcast()
-
+            snapshot = upcast_snapshot(snapshot)
             aggregate = self._AggregatedClass.from_snapshot(aggregate_id, snapshot)
-            all_events = await self.get_events(
+            aggregate._mark_stored(snapshot)
+            all_events = self.aiter_events(
                 aggregate_id, lte=load_at, gt=snapshot.sequence_order
             )
         else:
-            all_events = await self.get_events(aggregate_id, lte=load_at)
             aggregate = self._AggregatedClass(aggregate_id)
+            all_events = self.aiter_events(aggregate_id, lte=load_at)
 
-            for event in all_events:
-                actual_event = event.upcast()
-                while not isinstance(actual_event, type(event)):
-                    event = actual_event
-                    actual_event = event.upcast()
-                await aggregate._apply_without_saving(actual_event)
+        start, replayed = perf_counter(), 0
+        async for event in all_events:
+            await aggregate._apply_without_saving(upcast_event(event))
+            aggregate._mark_stored(event)
+            replayed += 1
+        aggregate._mark_replayed(replayed, perf_counter() - start)
 
+        if use_cache:
+            self.aggregate_cache.put(deepcopy(aggregate))
         return aggregate
 
+    async def take_snapshot(self, aggregate_id: IdTypeHint) -> bool:
+        """
+        Rebuild the aggregate from the store and save its snapshots at the stored version,
+        return False if the last snapshot is already at that version
+        """
+        aggregate = await self.load(aggregate_id)
+        if aggregate.version == aggregate.snapshot_version:
+            return False
+        # the snapshots are placed on the last applied event, not at the current time,
+        # so events saved in the meantime are still replayed after them
+        snapshots = aggregate._create_snapshots(
+            aggregate.version, aggregate.last_sequence_order
+        )
+        async with self.transaction():
+            await self.save_snapshots_batch({aggregate_id: snapshots})
+
+        for snapshot in snapshots:
+            aggregate._mark_stored(snapshot)
+        await self.after_commit(
+            lambda: self._cache_saved([aggregate], {aggregate_id: snapshots})
+        )
+        return True
+
     async def load_projection(
         self,
         aggregate_id: IdTypeHint,
@@ -154,41 +425,189 @@ class AsyncEventStore(
         load_at: Optional[SequenceHint] = None,
         from_snapshots: bool = True,
     ) -> Optional[Projection]:
+        if self._reads_materialized(projection_class, load_at) and (
+            projection := await self.materializer.state_store.get(
+                projection_class, aggregate_id
+            )
+        ):
+            return projection
 
-        projection_events = list(
-            EventHandler.get_aggregate_handlers(projection_class).keys()
-        )
+        projection_events = EventHandler.get_handled_event_types(projection_class)
 
         snapshot = (
-            await self.get_last_snapshot(
-                aggregate_id,
-                snapshot_type=projection_class.SnapshotClass,
-                load_at=load_at,
+            await self._get_last_snapshot(
+                aggregate_id, projection_class.SnapshotClass, load_at
             )
             if from_snapshots
             else None
         )
         if snapshot:
-            actual_snapshot = snapshot.upcast()
-            while type(actual_snapshot) != type(snapshot):
-                snapshot = actual_snapshot
-                actual_snapshot = snapshot.upcast()
-
+            snapshot = upcast_snapshot(snapshot)
             aggregate = projection_class.from_snapshot(aggregate_id, snapshot)
-            all_events = await self.get_events(
+            all_events = self.aiter_events(
                 aggregate_id, projection_events, lte=load_at, gt=snapshot.sequence_order
             )
         else:
-            all_events = await self.get_events(
-                aggregate_id, projection_events, lte=load_at
-            )
+            all_events = self.aiter_events(aggregate_id, projection_events, lte=load_at)
             aggregate = projection_class(aggregate_id)
 
-        for event in all_events:
-            actual_event = event.upcast()
-            while not isinstance(actual_event, type(event)):
-                event = actual_event
-                actual_event = event.upcast()
-            await aggregate.apply(actual_event)
+        async for event in all_events:
+            await aggregate.apply(upcast_event(event))
+
+        return aggregate
 
+    async def refresh(self, aggregate: AggregateAsyncHint) -> AggregateAsyncHint:
+        """
+        Apply the events stored after the aggregate was loaded or saved,
+        without replaying the whole stream. The aggregate should have no uncommited events.
+        The events are selected by version, so events of other writers with an older
+        sequence_order, e.g. from a skewed clock, are applied too.
+        """
+        async for event in self.aiter_events_after_version(
+            aggregate.id, aggregate.version
+        ):
+            await aggregate._apply_without_saving(upcast_event(event))
+            aggregate._mark_stored(event)
         return aggregate
+
+    async def load_many(
+        self,
+        aggregate_ids: Iterable[IdTypeHint],
+        load_at: Optional[SequenceHint] = None,
+        from_snapshots: bool = True,
+    ) -> dict[IdTypeHint, AggregateAsyncHint]:
+        """Load several aggregates with one snapshots and one events query"""
+        return await self._load_many(
+            self._AggregatedClass, aggregate_ids, [], load_at, from_snapshots
+        )
+
+    async def load_projections_many(
+        self,
+        aggregate_ids: Iterable[IdTypeHint],
+        projection_class: Type[Projection],
+        load_at: Optional[SequenceHint] = None,
+        from_snapshots: bool = True,
+    ) -> dict[IdTypeHint, Projection]:
+        """Load projections of several aggregates with one snapshots and one events query"""
+        projections = {}
+        if self._reads_materialized(projection_class, load_at):
+            aggregate_ids = list(aggregate_ids)
+            projections = await self.materializer.state_store.get_many(
+                projection_class, aggregate_ids
+            )
+            aggregate_ids = [a for a in aggregate_ids if a not in projections]
+            if not aggregate_ids:
+                return projections
+
+        projection_events = EventHandler.get_handled_event_types(projection_class)
+        projections.update(
+            await self._load_many(
+                projection_class,
+                aggregate_ids,
+                projection_events,
+                load_at,
+                from_snapshots,
+            )
+        )
+        return projections
+
+    def _reads_materialized(
+        self, projection_class: Type[Projection], load_at: Optional[SequenceHint]
+    ) -> bool:
+        """Current state of the projection is read from the materializer"""
+        return (
+            self.materializer is not None
+            and load_at is None
+            and self.materializer.materializes(projection_class)
+        )
+
+    async def _get_last_snapshot(
+        self,
+        aggregate_id: IdTypeHint,
+        snapshot_type: Type[Snapshot],
+        load_at: Optional[SequenceHint],
+    ) -> Optional[Snapshot]:
+        """get_last_snapshot through snapshot_cache, time travel loads bypass the cache"""
+        cache = self.snapshot_cache if load_at is None else None
+        snapshot = (
+            cache.get(aggregate_id, snapshot_type) if cache is not None else NOT_CACHED
+        )
+        if snapshot is NOT_CACHED:
+            snapshot = await self.get_last_snapshot(
+                aggregate_id, snapshot_type=snapshot_type, load_at=load_at
+            )
+            if cache is not None:
+                cache.put(aggregate_id, snapshot_type, snapshot)
+        return snapshot
+
+    async def _get_last_snapshots(
+        self,
+        aggregate_ids: list[IdTypeHint],
+        snapshot_type: Type[Snapshot],
+        load_at: Optional[SequenceHint],
+    ) -> dict[IdTypeHint, Snapshot]:
+        """get_last_snapshots querying only the aggregates missing from snapshot_cache"""
+        cache = self.snapshot_cache if load_at is None else None
+        if cache is None:
+            return await self.get_last_snapshots(
+                aggregate_ids, snapshot_type=snapshot_type, load_at=load_at
+            )
+
+        snapshots = {}
+        missing = []
+        for aggregate_id in aggregate_ids:
+            snapshot = cache.get(aggregate_id, snapshot_type)
+            if snapshot is NOT_CACHED:
+                missing.append(aggregate_id)
+            elif snapshot is not None:
+                snapshots[aggregate_id] = snapshot
+        if missing:
+            found = await self.get_last_snapshots(missing, snapshot_type=snapshot_type)
+            for aggregate_id in missing:
+                cache.put(aggregate_id, snapshot_type, found.get(aggregate_id))
+            snapshots.update(found)
+        return snapshots
+
+    async def _load_many(
+        self,
+        aggregate_class: Type[Any],
+        aggregate_ids: Iterable[IdTypeHint],
+        event_types: list[Type[Event]],
+        load_at: Optional[SequenceHint],
+        from_snapshots: bool,
+    ) -> dict[IdTypeHint, Any]:
+        aggregate_ids = list(aggregate_ids)
+        snapshots = (
+            await self._get_last_snapshots(
+                aggregate_ids, aggregate_class.SnapshotClass, load_at
+            )
+            if from_snapshots
+            else {}
+        )
+
+        aggregates = {}
+        gt_by_aggregate = {}
+        for aggregate_id in aggregate_ids:
+            if snapshot := snapshots.get(aggregate_id):
+                snapshot = upcast_snapshot(snapshot)
+                aggregates[aggregate_id] = aggregate_class.from_snapshot(
+                    aggregate_id, snapshot
+                )
+                aggregates[aggregate_id]._mark_stored(snapshot)
+                gt_by_aggregate[aggregate_id] = snapshot.sequence_order
+            else:
+                aggregates[aggregate_id] = aggregate_class(aggregate_id)
+                gt_by_aggregate[aggregate_id] = None
+
+        all_events = await self.get_events_batch(
+            gt_by_aggregate, event_types, lte=load_at
+        )
+        for aggregate_id, events in all_events.items():
+            aggregate = aggregates[aggregate_id]
+            start = perf_counter()
+            for event in events:
+                await aggregate._apply_without_saving(upcast_event(event))
+                aggregate._mark_stored(event)
+            aggregate._mark_replayed(len(events), perf_counter() - start)
+
+        return aggregates
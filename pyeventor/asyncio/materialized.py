@@ -0,0 +1,164 @@
+import asyncio
+from abc import ABC, abstractmethod
+from contextvars import Context
+from copy import deepcopy
+from typing import Any, Iterable, Optional, Type
+
+from pyeventor.asyncio.aggregate import AsyncProjection
+from pyeventor.asyncio.event_store import AsyncEventStore
+from pyeventor.event import Event
+from pyeventor.materialized import INLINE, EVENTUAL, handled_events, unapplied
+
+
+class AsyncProjectionStateStore(ABC):
+    """Current state of the materialized projections, by projection class and aggregate id"""
+
+    @abstractmethod
+    async def get_many(
+        self, projection_class: Type[AsyncProjection], aggregate_ids: Iterable[Any]
+    ) -> dict[Any, AsyncProjection]:
+        """States of the aggregates, the aggregates without state are omitted"""
+        ...
+
+    @abstractmethod
+    async def save_many(
+        self,
+        projection_class: Type[AsyncProjection],
+        projections: dict[Any, AsyncProjection],
+    ) -> None:
+        ...
+
+    async def get(
+        self, projection_class: Type[AsyncProjection], aggregate_id: Any
+    ) -> Optional[AsyncProjection]:
+        return (await self.get_many(projection_class, [aggregate_id])).get(aggregate_id)
+
+
+class AsyncInMemoryProjectionStateStore(AsyncProjectionStateStore):
+    def __init__(self):
+        # (projection name, aggregate id) -> projection
+        self.states: dict[tuple[str, Any], AsyncProjection] = {}
+
+    async def get_many(
+        self, projection_class: Type[AsyncProjection], aggregate_ids: Iterable[Any]
+    ) -> dict[Any, AsyncProjection]:
+        name = projection_class.projection_name()
+        return {
+            aggregate_id: deepcopy(self.states[(name, aggregate_id)])
+            for aggregate_id in aggregate_ids
+            if (name, aggregate_id) in self.states
+        }
+
+    async def save_many(
+        self,
+        projection_class: Type[AsyncProjection],
+        projections: dict[Any, AsyncProjection],
+    ) -> None:
+        name = projection_class.projection_name()
+        for aggregate_id, projection in projections.items():
+            self.states[(name, aggregate_id)] = deepcopy(projection)
+
+
+async def apply_handled(
+    projection: AsyncProjection, handled: list[tuple[Event, Event]]
+) -> None:
+    for event, actual_event in unapplied(projection, handled):
+        await projection._apply_without_saving(actual_event)
+        projection._mark_stored(event)
+
+
+class AsyncMaterializer:
+    """
+    Keep the state of projections in an AsyncProjectionStateStore, updated with the events
+    saved by the store, so load_projection is a single lookup instead of a replay.
+    Aggregates without a state yet are replayed from the store once.
+
+        store.materializer = AsyncMaterializer(state_store, [CustomProjection])
+    """
+
+    def __init__(
+        self,
+        state_store: AsyncProjectionStateStore,
+        projection_classes: Iterable[Type[AsyncProjection]],
+        consistency: str = INLINE,
+    ):
+        """
+        consistency: INLINE to update the states in the transaction of the save,
+            EVENTUAL to update them after the save in a background task
+        """
+        if consistency not in (INLINE, EVENTUAL):
+            raise ValueError(f"unknown consistency {consistency!r}")
+        self.state_store = state_store
+        self.projection_classes = list(projection_classes)
+        self.consistency = consistency
+        self.errors = 0
+        self.last_error: Optional[Exception] = None
+        self._queue: asyncio.Queue = asyncio.Queue()
+        # a single worker keeps the updates in the order of the saves
+        self._task: Optional[asyncio.Task] = None
+
+    def materializes(self, projection_class: Type[AsyncProjection]) -> bool:
+        return projection_class in self.projection_classes
+
+    async def on_save(
+        self, store: AsyncEventStore, events: dict[Any, list[Event]]
+    ) -> None:
+        """Called by the store in the transaction of the save"""
+        if self.consistency == INLINE:
+            await self.update(store, events)
+
+    async def on_commit(
+        self, store: AsyncEventStore, events: dict[Any, list[Event]]
+    ) -> None:
+        """Called by the store once the save is committed"""
+        if self.consistency == EVENTUAL:
+            if self._task is None:
+                # the worker serves all the later saves, it gets an empty context
+                # instead of the one of the save which started it
+                self._task = Context().run(asyncio.create_task, self._worker())
+            await self._queue.put((store, events))
+
+    async def update(
+        self, store: AsyncEventStore, events: dict[Any, list[Event]]
+    ) -> None:
+        """Apply the saved events to the states of all the materialized projections"""
+        for projection_class in self.projection_classes:
+            handled = handled_events(projection_class, events)
+            if not handled:
+                continue
+            projections = await self.state_store.get_many(projection_class, handled)
+            if missing := [a for a in handled if a not in projections]:
+                # the store already has the saved events, they are not applied again
+                projections.update(
+                    await store.load_projections_many(missing, projection_class)
+                )
+            for aggregate_id, aggregate_handled in handled.items():
+                await apply_handled(projections[aggregate_id], aggregate_handled)
+            await self.state_store.save_many(projection_class, projections)
+
+    async def _worker(self) -> None:
+        while True:
+            store, events = await self._queue.get()
+            try:
+                await self.update(store, events)
+            except Exception as e:
+                self.errors += 1
+                self.last_error = e
+            finally:
+                self._queue.task_done()
+
+    async def close(self, wait: bool = True) -> None:
+        """Stop the background worker, by default after the queued updates are applied"""
+        if self._task is None:
+            return
+        if wait:
+            await self._queue.join()
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    async def __aenter__(self) -> "AsyncMaterializer":
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        await self.close()
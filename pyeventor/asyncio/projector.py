@@ -0,0 +1,197 @@
+import asyncio
+from abc import ABC, abstractmethod
+from time import perf_counter
+from typing import Any, Awaitable, Callable, Iterable, Optional, Type
+
+from pyeventor.asyncio.aggregate import AsyncProjection
+from pyeventor.asyncio.event_store import AsyncEventStore
+from pyeventor.event import Event
+from pyeventor.projector import (
+    batch_invokers,
+    partition,
+    chunks,
+    upcast_logged_event,
+)
+
+
+class AsyncCheckpointStore(ABC):
+    """Last position of the log processed by each projection runner"""
+
+    @abstractmethod
+    async def load(self, name: str) -> int:
+        """Checkpoint of the runner, 0 if it has none"""
+        ...
+
+    @abstractmethod
+    async def save(self, name: str, position: int) -> None:
+        ...
+
+
+class AsyncInMemoryCheckpointStore(AsyncCheckpointStore):
+    def __init__(self):
+        self.positions: dict[str, int] = {}
+
+    async def load(self, name: str) -> int:
+        return self.positions.get(name, 0)
+
+    async def save(self, name: str, position: int) -> None:
+        self.positions[name] = position
+
+
+class AsyncProjectionRunner:
+    """
+    Keep a projection of the events of all the aggregates up to date.
+    Batches of the global log are applied to the projection, events without a handler
+    are skipped, and the position is checkpointed every `checkpoint_every` events,
+    so a restarted runner resumes where it stopped.
+    As with ProjectionRunner, the events after the last checkpoint are applied again
+    on restart, so handlers have to write their results idempotently.
+
+        runner = AsyncProjectionRunner(store, OrdersByCustomer("orders"), checkpoints)
+        task = asyncio.create_task(runner.run())  # until runner.stop() or task.cancel()
+    """
+
+    def __init__(
+        self,
+        store: AsyncEventStore,
+        projection: AsyncProjection,
+        checkpoints: Optional[AsyncCheckpointStore] = None,
+        name: Optional[str] = None,
+        batch_size: int = 1000,
+        checkpoint_every: int = 1000,
+        poll_interval: float = 1.0,
+    ):
+        """
+        checkpoints: where the position is kept, in memory by default
+        name: name of the checkpoint, the projection_name() of the projection by default
+        batch_size: number of events read from the store at a time
+        checkpoint_every: number of events between the checkpoints
+        poll_interval: seconds run waits for new events once it has caught up
+        """
+        self.store = store
+        self.projection = projection
+        self.checkpoints = checkpoints or AsyncInMemoryCheckpointStore()
+        self.name = name or type(projection).projection_name()
+        self.batch_size = batch_size
+        self.checkpoint_every = checkpoint_every
+        self.poll_interval = poll_interval
+        # loaded from the checkpoints on the first run
+        self.position: Optional[int] = None
+        self.checkpoint: Optional[int] = None
+        self.events_processed = 0
+        self.seconds = 0.0
+        self._stop = asyncio.Event()
+
+    @property
+    def events_per_second(self) -> Optional[float]:
+        """Throughput of the handlers, None before the first event"""
+        return self.events_processed / self.seconds if self.seconds else None
+
+    async def lag(self) -> int:
+        """Number of stored events the projection has not processed yet"""
+        await self._load_checkpoint()
+        return await self.store.get_last_position() - self.position
+
+    async def run_once(self) -> int:
+        """Apply the events stored after the position and checkpoint, return their number"""
+        await self._load_checkpoint()
+        processed = 0
+        async for batch in self.store.read_all(self.position, self.batch_size):
+            await self._apply_batch(batch)
+            processed += len(batch)
+        await self.save_checkpoint()
+        return processed
+
+    async def run(self) -> None:
+        """Follow the log until stop is called, polling every poll_interval seconds"""
+        self._stop.clear()
+        while not self._stop.is_set():
+            await self.run_once()
+            try:
+                await asyncio.wait_for(self._stop.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    async def save_checkpoint(self) -> None:
+        if self.position != self.checkpoint:
+            await self.checkpoints.save(self.name, self.position)
+            self.checkpoint = self.position
+
+    async def _load_checkpoint(self) -> None:
+        if self.position is None:
+            self.position = self.checkpoint = await self.checkpoints.load(self.name)
+
+    async def _apply_batch(self, batch: list[Event]) -> None:
+        start = perf_counter()
+        events = [upcast_logged_event(event) for event in batch]
+        invokers = batch_invokers(type(self.projection), events)
+        for event in events:
+            if invoker := invokers[type(event)]:
+                await invoker(self.projection, event)
+        self.seconds += perf_counter() - start
+        self.events_processed += len(batch)
+        self.position = batch[-1].position
+        if self.position - self.checkpoint >= self.checkpoint_every:
+            await self.save_checkpoint()
+
+
+class AsyncProjectionRebuild:
+    """
+    Rebuild a projection for many aggregates with concurrent tasks sharing the store,
+    so the loads run in parallel over the connection pool of the store.
+    Aggregate ids are partitioned by hash, each task replays its partition in chunks
+    of `chunk_size` aggregates with load_projections_many and hands them to `write`.
+
+        rebuild = AsyncProjectionRebuild(store, CustomProjection, write=save_rows, workers=8)
+        await rebuild.run()
+    """
+
+    def __init__(
+        self,
+        store: AsyncEventStore,
+        projection_class: Type[AsyncProjection],
+        write: Optional[Callable[[dict[Any, AsyncProjection]], Awaitable[None]]] = None,
+        workers: int = 4,
+        chunk_size: int = 100,
+        progress: Optional[Callable[[int, int], None]] = None,
+    ):
+        """
+        write: coroutine function saving a chunk of rebuilt projections,
+            None to collect them in `projections`
+        workers: number of partitions and tasks, keep it within the connection pool size
+        progress: called with the number of rebuilt aggregates and their total after each chunk
+        """
+        self.store = store
+        self.projection_class = projection_class
+        self.write = write
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.progress = progress
+        self.done = 0
+        self.total = 0
+        self.projections: dict[Any, AsyncProjection] = {}
+
+    async def run(self, aggregate_ids: Optional[Iterable[Any]] = None) -> int:
+        """Rebuild the projection of the aggregates, all the stored ones by default"""
+        if aggregate_ids is None:
+            aggregate_ids = await self.store.get_aggregate_ids()
+        parts = partition(aggregate_ids, self.workers)
+        self.done, self.total = 0, sum(len(part) for part in parts)
+        await asyncio.gather(*(self._rebuild_partition(part) for part in parts))
+        return self.done
+
+    async def _rebuild_partition(self, aggregate_ids: list[Any]) -> None:
+        for chunk in chunks(aggregate_ids, self.chunk_size):
+            projections = await self.store.load_projections_many(
+                chunk, self.projection_class
+            )
+            if self.write is None:
+                self.projections.update(projections)
+            else:
+                await self.write(projections)
+            self.done += len(chunk)
+            if self.progress:
+                self.progress(self.done, self.total)
@@ -0,0 +1,97 @@
+import asyncio
+from contextvars import Context
+from typing import Any, Generic, Optional
+
+from pyeventor.aggregate import IdTypeHint
+from pyeventor.asyncio.event_store import AggregateAsyncHint, AsyncEventStore
+
+
+class AsyncBackgroundSnapshotter(Generic[AggregateAsyncHint]):
+    """
+    Take snapshots off the command path. Aggregates saved with at least `threshold` events
+    after their last snapshot are rebuilt from the store and snapshotted by worker tasks.
+
+        store.snapshotter = AsyncBackgroundSnapshotter(store, threshold=100)
+    """
+
+    def __init__(
+        self,
+        store: AsyncEventStore[Any, Any, AggregateAsyncHint],
+        threshold: int = 100,
+        workers: int = 1,
+        max_pending: int = 1000,
+        timeout: Optional[float] = None,
+    ):
+        """
+        threshold: number of events after the last snapshot to queue the aggregate
+        workers: number of tasks taking the snapshots
+        max_pending: number of queued aggregates, submit waits while the queue is full
+        timeout: seconds submit waits for a place in the queue before dropping the aggregate,
+            None to wait as long as needed
+        """
+        self.store = store
+        self.threshold = threshold
+        self.workers = workers
+        self.timeout = timeout
+        self.snapshots_taken = 0
+        self.dropped = 0
+        self.errors = 0
+        self.last_error: Optional[Exception] = None
+        self._queue: asyncio.Queue = asyncio.Queue(max_pending)
+        self._pending: set = set()
+        self._tasks: list[asyncio.Task] = []
+
+    async def notify(self, aggregate: AggregateAsyncHint) -> bool:
+        """Queue the saved aggregate if its tail reached the threshold"""
+        if aggregate.events_since_snapshot < self.threshold:
+            return False
+        return await self.submit(aggregate.id)
+
+    async def submit(self, aggregate_id: IdTypeHint) -> bool:
+        """Queue the aggregate, return False if it is already queued or was dropped"""
+        if aggregate_id in self._pending:
+            return False
+        if not self._tasks:
+            # submit runs in the transaction of a save, the workers get an empty context
+            # so they don't inherit its session
+            self._tasks = [
+                Context().run(asyncio.create_task, self._worker())
+                for _ in range(self.workers)
+            ]
+        self._pending.add(aggregate_id)
+        try:
+            await asyncio.wait_for(self._queue.put(aggregate_id), self.timeout)
+        except asyncio.TimeoutError:
+            self._pending.discard(aggregate_id)
+            self.dropped += 1
+            return False
+        return True
+
+    async def _worker(self) -> None:
+        while True:
+            aggregate_id = await self._queue.get()
+            try:
+                # events saved from now on queue the aggregate again
+                self._pending.discard(aggregate_id)
+                if await self.store.take_snapshot(aggregate_id):
+                    self.snapshots_taken += 1
+            except Exception as e:
+                self.errors += 1
+                self.last_error = e
+            finally:
+                self._queue.task_done()
+
+    async def close(self, wait: bool = True) -> None:
+        """Stop the workers, by default after the queued snapshots are taken"""
+        if wait:
+            await self._queue.join()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def __aenter__(self) -> "AsyncBackgroundSnapshotter[AggregateAsyncHint]":
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        await self.close()
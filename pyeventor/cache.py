@@ -0,0 +1,137 @@
+from collections import OrderedDict
+from copy import deepcopy
+from threading import Lock
+from time import monotonic
+from typing import Any, Optional, Type
+from pyeventor.event import Snapshot
+
+# returned by SnapshotCache.get when the store has to be queried
+NOT_CACHED: Any = object()
+
+
+class _LRUCache:
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[Any, Any] = OrderedDict()
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _set(self, key: Any, entry: Any) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Any) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class AggregateCache(_LRUCache):
+    """
+    LRU cache of hydrated aggregates by id, used by the stores in front of load.
+    Cached aggregates are brought up to date with the events stored after them,
+    so the cache never returns a stale state.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: Optional[float] = None):
+        """
+        max_size: number of aggregates kept, the least recently used are evicted
+        ttl: seconds an aggregate is kept after it was cached, None to keep until evicted
+        """
+        super().__init__(max_size)
+        self.ttl = ttl
+
+    def get(self, aggregate_id: Any) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(aggregate_id)
+            if entry and self.ttl is not None and monotonic() - entry[0] > self.ttl:
+                del self._entries[aggregate_id]
+                entry = None
+            if not entry:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(aggregate_id)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, aggregate: Any) -> None:
+        """Cache the aggregate unless a newer version of it is already cached"""
+        with self._lock:
+            current = self._entries.get(aggregate.id)
+            if current and current[1].version > aggregate.version:
+                return
+            self._set(aggregate.id, (monotonic(), aggregate))
+
+
+class SnapshotCache(_LRUCache):
+    """
+    LRU cache of the last snapshot by aggregate id and snapshot type, used by the stores
+    in front of get_last_snapshot. Aggregates without snapshots are cached as None.
+    A snapshot older than the stored one is still valid to load from,
+    so snapshots saved by other processes only make the loads replay more events.
+    """
+
+    def __init__(self, max_size: int = 1024):
+        """max_size: number of aggregates kept, the least recently used are evicted"""
+        super().__init__(max_size)
+
+    def get(self, aggregate_id: Any, snapshot_type: Type[Snapshot]) -> Any:
+        """Copy of the cached snapshot, None if there is none, NOT_CACHED on a miss"""
+        with self._lock:
+            snapshots = self._entries.get(aggregate_id)
+            if snapshots is None or snapshot_type not in snapshots:
+                self.misses += 1
+                return NOT_CACHED
+            self._entries.move_to_end(aggregate_id)
+            self.hits += 1
+            return deepcopy(snapshots[snapshot_type])
+
+    def put(
+        self,
+        aggregate_id: Any,
+        snapshot_type: Type[Snapshot],
+        snapshot: Optional[Snapshot],
+    ) -> None:
+        """Cache the last snapshot of the type as read from the store"""
+        with self._lock:
+            snapshots = self._entries.get(aggregate_id, {})
+            self._put(snapshots, snapshot_type, snapshot)
+            self._set(aggregate_id, snapshots)
+
+    def save(self, aggregate_id: Any, snapshots: list[Snapshot]) -> None:
+        """Write through saved snapshots to every cached type they are an instance of"""
+        with self._lock:
+            cached = self._entries.get(aggregate_id, {})
+            for snapshot in snapshots:
+                for snapshot_type in {*cached, type(snapshot)}:
+                    if isinstance(snapshot, snapshot_type):
+                        self._put(cached, snapshot_type, snapshot)
+            self._set(aggregate_id, cached)
+
+    @staticmethod
+    def _put(
+        snapshots: dict[Type[Snapshot], Optional[Snapshot]],
+        snapshot_type: Type[Snapshot],
+        snapshot: Optional[Snapshot],
+    ) -> None:
+        current = snapshots.get(snapshot_type)
+        if (
+            current is not None
+            and snapshot is not None
+            and current.sequence_order > snapshot.sequence_order
+        ):
+            return
+        if current is not None and snapshot is None:
+            return
+        snapshots[snapshot_type] = deepcopy(snapshot)
@@ -0,0 +1,67 @@
+from copy import deepcopy
+from random import uniform
+from time import sleep
+from typing import Any, Callable, Generic, Optional
+
+from pyeventor.aggregate import IdTypeHint
+from pyeventor.event_store import AggregateHint, EventStore
+from pyeventor.exceptions import ConcurrencyException
+
+
+class RetryPolicy:
+    def __init__(
+        self, max_retries: int = 5, backoff: float = 0.01, max_backoff: float = 1.0
+    ):
+        """
+        max_retries: number of retries after the first conflict
+        backoff: base delay in seconds, doubled on each retry
+        max_backoff: upper bound of the delay
+        """
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+    def delay(self, retry: int) -> float:
+        """Random delay up to the exponential backoff, so writers don't retry in lockstep"""
+        return uniform(0, min(self.max_backoff, self.backoff * 2 ** (retry - 1)))
+
+
+class CommandExecutor(Generic[AggregateHint]):
+    """
+    Run commands on the aggregates of the store: load -> command -> save.
+    On ConcurrencyException only the new events are applied to the loaded aggregate
+    and the command is retried on it.
+    """
+
+    def __init__(
+        self,
+        store: EventStore[Any, Any, AggregateHint],
+        retry_policy: Optional[RetryPolicy] = None,
+    ):
+        self.store = store
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.executions = 0
+        self.conflicts = 0
+        self.retries = 0
+
+    def execute(
+        self, aggregate_id: IdTypeHint, command: Callable[[AggregateHint], Any]
+    ) -> AggregateHint:
+        """Run the command and save the aggregate, return the saved aggregate"""
+        self.executions += 1
+        loaded = self.store.load(aggregate_id)
+        retry = 0
+        while True:
+            aggregate = deepcopy(loaded)
+            command(aggregate)
+            try:
+                self.store.save(aggregate)
+                return aggregate
+            except ConcurrencyException:
+                self.conflicts += 1
+                if retry >= self.retry_policy.max_retries:
+                    raise
+                retry += 1
+                self.retries += 1
+                sleep(self.retry_policy.delay(retry))
+                self.store.refresh(loaded)
@@ -32,6 +32,7 @@ def register_handler(*register_objects: Union[Type[Event], Type[Aggregate]]):
                             "Register of the same event more than once for the same class is not allowed"
                         )
                     EventHandler.set_handler(handler_class, event_class, self.handler)
+                EventHandler.set_arguments_order(self.handler, event_first=False)
             elif all(
                 map(
                     lambda x: isinstance(x, type)
@@ -55,6 +56,7 @@ def register_handler(*register_objects: Union[Type[Event], Type[Aggregate]]):
                     EventHandler.set_handler(
                         aggregate_class, handler_class, self.handler
                     )
+                EventHandler.set_arguments_order(self.handler, event_first=True)
             else:
                 raise RegisterException(
                     "all register_objects should be the same Event or Aggregate class"
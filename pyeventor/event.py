@@ -1,8 +1,13 @@
 from __future__ import annotations
 from abc import ABC
-from typing import TypeVar, Generic, TYPE_CHECKING, Optional, Protocol
-from datetime import datetime
+from typing import TypeVar, Generic, TYPE_CHECKING, Optional, Protocol, Any
+from typing import get_args, get_origin
+from collections import defaultdict, deque
+from functools import lru_cache
 import inspect
+from pyeventor.schema import SnapshotSchema
+from pyeventor.serializer import Serializer, JsonSerializer
+from pyeventor.sequence import SequenceStrategy, Timestamp
 
 if TYPE_CHECKING:
     from pyeventor.aggregate import SnapshotCreateI
@@ -13,6 +18,8 @@ EventDataTypeHint = TypeVar("EventDataTypeHint")
 
 
 class SequenceI(Protocol, Generic[SequenceHint]):
+    __slots__ = ()
+
     def _sequence_generate(self) -> SequenceHint:
         ...
 
@@ -22,22 +29,176 @@ class SequenceI(Protocol, Generic[SequenceHint]):
 
 
 class VersionI(Protocol):
+    __slots__ = ()
+
     def upcast(self) -> "VersionI":
         return self
 
 
 class SnapshotI(Protocol):
+    __slots__ = ()
+
     @classmethod
     def create(cls, aggregate: SnapshotCreateI) -> "SnapshotI":
         ...
 
 
+JSON_SERIALIZER = JsonSerializer()
+
+
+@lru_cache(maxsize=None)
+def _data_type(event_class: type) -> Any:
+    return event_class.data_type()
+
+
+class EventTypeFilter:
+    """Event classes matching some event types, their subclasses included, and their stored names"""
+
+    __slots__ = ("classes", "names")
+
+    def __init__(self, event_types: tuple[type, ...]):
+        classes: set[type] = set()
+        pending = list(event_types)
+        while pending:
+            event_class = pending.pop()
+            if event_class not in classes:
+                classes.add(event_class)
+                pending.extend(event_class.__subclasses__())
+        self.classes = frozenset(classes)
+        # sorted, so the queries filtering on them are the same for the same types
+        self.names = tuple(sorted({event_class.type_name() for event_class in classes}))
+
+
+@lru_cache(maxsize=None)
+def event_type_filter(event_types: tuple[type, ...]) -> EventTypeFilter:
+    """Filter of the event types, computed once until a new event class is defined"""
+    return EventTypeFilter(event_types)
+
+
+@lru_cache(maxsize=None)
+def event_classes_by_name() -> dict[str, tuple[type, ...]]:
+    """
+    Event classes by stored name, computed once until a new event class is defined.
+    More than one class under a name is a collision, a class defined again
+    with the same qualified name, e.g. by reloading its module, replaces the previous one
+    """
+    by_name: dict[str, dict[str, type]] = defaultdict(dict)
+    seen: set[type] = set()
+    # breadth first in definition order, so the last definition of a class wins
+    pending = deque([Event])
+    while pending:
+        event_class = pending.popleft()
+        if event_class not in seen:
+            seen.add(event_class)
+            qualified_name = f"{event_class.__module__}.{event_class.__qualname__}"
+            by_name[event_class.type_name()][qualified_name] = event_class
+            pending.extend(event_class.__subclasses__())
+    return {name: tuple(classes.values()) for name, classes in by_name.items()}
+
+
 # Abstract class for events
 class Event(
     ABC, SequenceI[SequenceHint], VersionI, Generic[SequenceHint, EventDataTypeHint]
 ):
+    # subclasses without __slots__ get a __dict__, declare __slots__ = () for compact events
+    __slots__ = (
+        "data",
+        "_raw",
+        "_sequence_order",
+        "version",
+        "aggregate_id",
+        "position",
+    )
+    # serializer of the data, None to use the one of the store (JSON without a store)
+    serializer: Optional[Serializer] = None
+    # how sequence_order is generated, e.g. HybridLogicalClock() or StreamVersion() for integers
+    sequence: SequenceStrategy = Timestamp()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # the new class matches the filters of its bases and may be looked up by name
+        event_type_filter.cache_clear()
+        event_classes_by_name.cache_clear()
+
     def _sequence_generate(self) -> SequenceHint:
-        return datetime.now()
+        return self.sequence.generate()
+
+    @classmethod
+    def type_name(cls) -> str:
+        """
+        Name the event type is stored under.
+        Set __type_name__ on the class to namespace or version it, e.g. "billing.Paid.v2"
+        """
+        return cls.__dict__.get("__type_name__", cls.__name__)
+
+    @classmethod
+    def data_type(cls) -> Any:
+        """
+        Type of the event data, taken from the generic parameters, e.g. Event[int, dict] -> dict
+        """
+        for base in inspect.getmro(cls):
+            for orig_base in base.__dict__.get("__orig_bases__", ()):
+                origin = get_origin(orig_base)
+                args = get_args(orig_base)
+                if (
+                    isinstance(origin, type)
+                    and issubclass(origin, Event)
+                    and len(args) == 2
+                    and not isinstance(args[1], TypeVar)
+                ):
+                    return args[1]
+        return None
+
+    def dumps(self, default: Optional[Serializer] = None) -> bytes:
+        """Serialize the data, default: serializer used if the class doesn't set one"""
+        serializer = self.serializer or default or JSON_SERIALIZER
+        if self._raw is not None and self._raw[1] is serializer:
+            return self._raw[0]
+        return serializer.dumps(self.data)
+
+    @classmethod
+    def loads(
+        cls,
+        raw: bytes,
+        default: Optional[Serializer] = None,
+        lazy: bool = False,
+        **kwargs,
+    ) -> Event:
+        """
+        Build the event from the data serialized with dumps,
+        lazy: keep the raw data and decode it on the first access of data
+        kwargs: sequence_order and version of the event
+        """
+        serializer = cls.serializer or default or JSON_SERIALIZER
+        if lazy:
+            event = cls(**kwargs)
+            del event.data
+            event._raw = (raw, serializer)
+            return event
+        return cls(data=cls._decode(raw, serializer), **kwargs)
+
+    @classmethod
+    def _decode(cls, raw: bytes, serializer: Serializer) -> Any:
+        data = serializer.loads(raw)
+        data_type = _data_type(cls)
+        if (
+            isinstance(data, dict)
+            and isinstance(data_type, type)
+            and not isinstance(data, data_type)
+        ):
+            data = data_type(**data)
+        return data
+
+    def __getattr__(self, name: str) -> Any:
+        # data is left unset by lazy loads, it's decoded on the first access
+        if name != "data" or self._raw is None:
+            raise AttributeError(
+                f"'{type(self).__name__}' object has no attribute '{name}'"
+            )
+        raw, serializer = self._raw
+        self.data = self._decode(raw, serializer)
+        self._raw = None
+        return self.data
 
     @property
     def sequence_order(self) -> SequenceHint:
@@ -47,21 +208,28 @@ class Event(
         self,
         data: Optional[EventDataTypeHint] = None,
         sequence_order: Optional[SequenceHint] = None,
+        version: Optional[int] = None,
     ):
         self.data = data
-        self._sequence_order = sequence_order or self._sequence_generate()
+        # encoded data and its serializer, while data is not decoded yet
+        self._raw: Optional[tuple[bytes, Serializer]] = None
+        self._sequence_order = (
+            sequence_order if sequence_order is not None else self._sequence_generate()
+        )
+        # position in the aggregate stream, for snapshots the version they were taken at
+        self.version = version
+        # set by the store: the aggregate of the event and its position in the whole store
+        self.aggregate_id: Optional[Any] = None
+        self.position: Optional[int] = None
 
 
 class Snapshot(Event[SequenceHint, EventDataTypeHint], SnapshotI):
-    ...
+    __slots__ = ()
 
 
 class JsonSnapshot(Snapshot[SequenceHint, dict]):
+    __slots__ = ()
+
     @classmethod
     def create(cls, aggregate: SnapshotCreateI):
-        attributes = {
-            k: v
-            for k, v in aggregate.__dict__.items()
-            if not k.startswith("_") and not inspect.ismethod(getattr(aggregate, k))
-        }
-        return JsonSnapshot(data=attributes)
+        return cls(data=SnapshotSchema.attributes_of(aggregate))
@@ -1,14 +1,92 @@
 from abc import ABC, abstractmethod
+from copy import deepcopy
+from time import perf_counter, sleep
 from typing import Generic, TypeVar, List, Optional, Type, Protocol
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator
 from pyeventor.event import Event, Snapshot
 from pyeventor.aggregate import Aggregate, Projection, IdTypeHint
 from pyeventor.handler import EventHandler
+from pyeventor.cache import AggregateCache, SnapshotCache, NOT_CACHED
+from pyeventor.sequence import StreamVersion
 from contextlib import contextmanager
 
+if TYPE_CHECKING:
+    from pyeventor.snapshotter import BackgroundSnapshotter
+    from pyeventor.materialized import Materializer
+
 AggregateHint = TypeVar("AggregateHint", bound=Aggregate)
 SequenceHint = TypeVar("SequenceHint")
 
 
+class UnitOfWork(Generic[AggregateHint]):
+    def __init__(self):
+        self.aggregates: list[AggregateHint] = []
+
+    def add(self, aggregate: AggregateHint) -> None:
+        if not any(a is aggregate for a in self.aggregates):
+            self.aggregates.append(aggregate)
+
+
+def split_uncommited_events(
+    aggregates: Iterable[Any],
+) -> tuple[dict[Any, list[Snapshot]], dict[Any, list[Event]]]:
+    """
+    Group uncommited snapshots and events of the aggregates by aggregate id.
+    Events are numbered after the aggregate version, so the store can check
+    that nobody else has appended events since the aggregate was loaded.
+    """
+    snapshots: dict[Any, list[Snapshot]] = {}
+    events: dict[Any, list[Event]] = {}
+    for aggregate in aggregates:
+        version = aggregate.version
+        for event in aggregate.uncommmited_events:
+            if isinstance(event, Snapshot):
+                snapshots.setdefault(aggregate.id, []).append(event)
+            else:
+                version += 1
+                event.version = version
+                if event.sequence_order is None and isinstance(
+                    event.sequence, StreamVersion
+                ):
+                    event._sequence_order = version
+                events.setdefault(aggregate.id, []).append(event)
+    return snapshots, events
+
+
+def place_snapshots(
+    snapshots: dict[Any, list[Snapshot]], events: dict[Any, list[Event]]
+) -> None:
+    """
+    Give the snapshots the sequence_order of the last event they include,
+    so the events replayed after a snapshot are the ones with a greater sequence_order
+    whatever the sequence strategy of the events is.
+    """
+    for aggregate_id, aggregate_snapshots in snapshots.items():
+        sequence_by_version = {
+            event.version: event.sequence_order
+            for event in events.get(aggregate_id, [])
+        }
+        for snapshot in aggregate_snapshots:
+            if snapshot.version in sequence_by_version:
+                snapshot._sequence_order = sequence_by_version[snapshot.version]
+
+
+def upcast_event(event: Event) -> Event:
+    actual_event = event.upcast()
+    while not isinstance(actual_event, type(event)):
+        event = actual_event
+        actual_event = event.upcast()
+    return actual_event
+
+
+def upcast_snapshot(snapshot: Snapshot) -> Snapshot:
+    actual_snapshot = snapshot.upcast()
+    while type(actual_snapshot) != type(snapshot):
+        snapshot = actual_snapshot
+        actual_snapshot = snapshot.upcast()
+    return snapshot
+
+
 class SnapshotStoreI(Protocol, Generic[IdTypeHint, SequenceHint]):
     @abstractmethod
     def save_snapshots(
@@ -16,6 +94,14 @@ class SnapshotStoreI(Protocol, Generic[IdTypeHint, SequenceHint]):
     ) -> None:
         raise NotImplementedError()
 
+    def save_snapshots_batch(self, snapshots: dict[IdTypeHint, list[Snapshot]]) -> None:
+        """
+        Save snapshots of several aggregates at once.
+        Override to write them with a single query.
+        """
+        for aggregate_id, aggregate_snapshots in snapshots.items():
+            self.save_snapshots(aggregate_snapshots, aggregate_id)
+
     @abstractmethod
     def get_last_snapshot(
         self,
@@ -29,6 +115,22 @@ class SnapshotStoreI(Protocol, Generic[IdTypeHint, SequenceHint]):
         """
         raise NotImplementedError()
 
+    def get_last_snapshots(
+        self,
+        aggregate_ids: Iterable[IdTypeHint],
+        snapshot_type: Optional[Type[Snapshot]] = None,
+        load_at: Optional[SequenceHint] = None,
+    ) -> dict[IdTypeHint, Snapshot]:
+        """
+        Last snapshots of several aggregates, aggregates without snapshot are omitted.
+        Override to fetch them with a single query.
+        """
+        snapshots = {}
+        for aggregate_id in aggregate_ids:
+            if snapshot := self.get_last_snapshot(aggregate_id, snapshot_type, load_at):
+                snapshots[aggregate_id] = snapshot
+        return snapshots
+
 
 class EventStoreI(Protocol, Generic[SequenceHint, IdTypeHint, AggregateHint]):
     _AggregatedClass: Type[AggregateHint]
@@ -55,14 +157,121 @@ class EventStoreI(Protocol, Generic[SequenceHint, IdTypeHint, AggregateHint]):
         """
         raise NotImplementedError()
 
+    def iter_events(
+        self,
+        aggregate_id: IdTypeHint,
+        event_types: list[Type[Event]] = [],
+        gt: Optional[SequenceHint] = None,
+        lte: Optional[SequenceHint] = None,
+    ) -> Iterator[Event]:
+        """
+        Same as get_events, but yield the events one by one.
+        Override to stream them from the storage without loading the whole list.
+        """
+        yield from self.get_events(aggregate_id, event_types, gt=gt, lte=lte)
+
+    def iter_events_after_version(
+        self, aggregate_id: IdTypeHint, version: int
+    ) -> Iterator[Event]:
+        """
+        Events of the aggregate with a version greater than version, in version order,
+        whatever their sequence_order. Events stored without a version are numbered
+        by their position in the stream. Override to select them in the storage.
+        """
+        tail = []
+        for stored, event in enumerate(self.iter_events(aggregate_id), start=1):
+            event_version = event.version if event.version is not None else stored
+            if event_version > version:
+                tail.append((event_version, event))
+        tail.sort(key=lambda pair: pair[0])
+        for _, event in tail:
+            yield event
+
+    def get_events_batch(
+        self,
+        gt_by_aggregate: dict[IdTypeHint, Optional[SequenceHint]],
+        event_types: list[Type[Event]] = [],
+        lte: Optional[SequenceHint] = None,
+    ) -> dict[IdTypeHint, List[Event]]:
+        """
+        Events of several aggregates, each aggregate with its own gt.
+        Override to fetch them with a single query.
+        """
+        return {
+            aggregate_id: self.get_events(aggregate_id, event_types, gt=gt, lte=lte)
+            for aggregate_id, gt in gt_by_aggregate.items()
+        }
+
+    def get_all_events(self, after_position: int = 0, limit: int = 1000) -> List[Event]:
+        """
+        Events of all the aggregates stored after after_position, in commit order,
+        with their aggregate_id and position set.
+        Positions start from 1 and have no gaps. Override in the stores keeping a global log.
+        """
+        raise NotImplementedError()
+
+    def get_aggregate_ids(self) -> List[IdTypeHint]:
+        """Ids of all the aggregates with stored events"""
+        raise NotImplementedError()
+
+    def get_last_position(self) -> int:
+        """Position of the last stored event, 0 if the store is empty"""
+        raise NotImplementedError()
+
+    def read_all(
+        self, from_position: int = 0, batch_size: int = 1000
+    ) -> Iterator[List[Event]]:
+        """Batches of the events stored after from_position, until the end of the log"""
+        while batch := self.get_all_events(from_position, batch_size):
+            yield batch
+            if len(batch) < batch_size:
+                return
+            from_position = batch[-1].position
+
+    def subscribe(
+        self,
+        from_position: int = 0,
+        batch_size: int = 1000,
+        poll_interval: float = 1.0,
+    ) -> Iterator[List[Event]]:
+        """
+        Catch-up subscription: batches of the stored events,
+        then of the new ones as they are saved, polling every poll_interval seconds
+        """
+        while True:
+            for batch in self.read_all(from_position, batch_size):
+                yield batch
+                from_position = batch[-1].position
+            sleep(poll_interval)
+
+    def save_events_batch(self, events: dict[IdTypeHint, List[Event]]) -> None:
+        """
+        Save events of several aggregates at once.
+        Override to write them with a single query.
+        """
+        for aggregate_id, aggregate_events in events.items():
+            self.save_events(aggregate_events, aggregate_id)
+
     @contextmanager
     def transaction(self):
         pass
 
+    def after_commit(self, callback: Callable[[], None]) -> None:
+        """
+        Run callback once the current transaction is committed, right away outside of one.
+        Override in stores with nested transactions, so a save nested in an outer
+        transaction is only seen by the caches once the outer transaction is committed.
+        """
+        callback()
+
     @abstractmethod
     def save(self, aggregate: AggregateHint) -> None:
         ...
 
+    @abstractmethod
+    def save_many(self, aggregates: Iterable[AggregateHint]) -> None:
+        ...
+
     @abstractmethod
     def load(
         self,
@@ -72,6 +281,19 @@ class EventStoreI(Protocol, Generic[SequenceHint, IdTypeHint, AggregateHint]):
     ) -> Optional[AggregateHint]:
         ...
 
+    @abstractmethod
+    def refresh(self, aggregate: AggregateHint) -> AggregateHint:
+        ...
+
+    @abstractmethod
+    def load_many(
+        self,
+        aggregate_ids: Iterable[IdTypeHint],
+        load_at: Optional[SequenceHint] = None,
+        from_snapshots: bool = True,
+    ) -> dict[IdTypeHint, AggregateHint]:
+        ...
+
 
 class ProjectionStoreI(Protocol, Generic[SequenceHint]):
     @abstractmethod
@@ -84,6 +306,16 @@ class ProjectionStoreI(Protocol, Generic[SequenceHint]):
     ) -> Optional[Projection]:
         ...
 
+    @abstractmethod
+    def load_projections_many(
+        self,
+        aggregate_ids: Iterable[IdTypeHint],
+        projection_class: Type[Projection],
+        load_at: Optional[SequenceHint] = None,
+        from_snapshots: bool = True,
+    ) -> dict[IdTypeHint, Projection]:
+        ...
+
 
 class EventStore(
     ABC,
@@ -91,21 +323,83 @@ class EventStore(
     ProjectionStoreI[SequenceHint],
     SnapshotStoreI[IdTypeHint, SequenceHint],
 ):
+    # set to AggregateCache to keep loaded and saved aggregates in memory
+    aggregate_cache: Optional[AggregateCache] = None
+    # set to SnapshotCache to keep the last snapshots in memory
+    snapshot_cache: Optional[SnapshotCache] = None
+    # set to BackgroundSnapshotter to take snapshots off the command path
+    snapshotter: Optional["BackgroundSnapshotter"] = None
+    # set to Materializer to keep the state of projections up to date on save
+    materializer: Optional["Materializer"] = None
+
     def save(self, aggregate: AggregateHint) -> None:
-        with self.transaction():
-            events_for_save = aggregate.uncommmited_events
-            if not events_for_save:
-                return
+        self.save_many([aggregate])
 
-            snapshots = [s for s in events_for_save if isinstance(s, Snapshot)]
-            events_without_snapshots = [
-                s for s in events_for_save if not isinstance(s, Snapshot)
-            ]
+    def save_many(self, aggregates: Iterable[AggregateHint]) -> None:
+        """Save uncommited events of all the aggregates in one transaction"""
+        aggregates = [a for a in aggregates if a.uncommmited_events]
+        if not aggregates:
+            return
+
+        with self.transaction():
+            snapshots, events = split_uncommited_events(aggregates)
+            # events first, the store may assign their sequence_order
+            if events:
+                self.save_events_batch(events)
             if snapshots:
-                self.save_snapshots(snapshots, aggregate.id)
-            if events_without_snapshots:
-                self.save_events(events_without_snapshots, aggregate.id)
-            aggregate.uncommmited_events.clear()
+                place_snapshots(snapshots, events)
+                self.save_snapshots_batch(snapshots)
+            if events and self.materializer is not None:
+                self.materializer.on_save(self, events)
+            for aggregate in aggregates:
+                for event in events.get(aggregate.id, []):
+                    aggregate._mark_stored(event)
+                aggregate.uncommmited_events.clear()
+            # the aggregates may change before an outer transaction is committed
+            saved = (
+                [deepcopy(aggregate) for aggregate in aggregates]
+                if self.aggregate_cache is not None or self.snapshotter is not None
+                else []
+            )
+
+        # a save rolled back with an outer transaction leaves the caches,
+        # the snapshotter and the materializer untouched
+        self.after_commit(lambda: self._committed(saved, snapshots, events))
+
+    def _committed(
+        self,
+        aggregates: list[AggregateHint],
+        snapshots: dict[Any, list[Snapshot]],
+        events: dict[Any, list[Event]],
+    ) -> None:
+        self._cache_saved(aggregates, snapshots)
+        if self.snapshotter is not None:
+            for aggregate in aggregates:
+                self.snapshotter.notify(aggregate)
+        if events and self.materializer is not None:
+            self.materializer.on_commit(self, events)
+
+    def _cache_saved(
+        self, aggregates: list[AggregateHint], snapshots: dict[Any, list[Snapshot]]
+    ) -> None:
+        if self.aggregate_cache is not None:
+            for aggregate in aggregates:
+                self.aggregate_cache.put(aggregate)
+        if self.snapshot_cache is not None:
+            for aggregate_id, aggregate_snapshots in snapshots.items():
+                self.snapshot_cache.save(aggregate_id, aggregate_snapshots)
+
+    @contextmanager
+    def unit_of_work(self) -> Iterator[UnitOfWork[AggregateHint]]:
+        """
+        Collect aggregates and save them together on exit
+
+            with store.unit_of_work() as uow:
+                uow.add(aggregate)
+        """
+        uow: UnitOfWork[AggregateHint] = UnitOfWork()
+        yield uow
+        self.save_many(uow.aggregates)
 
     def load(
         self,
@@ -113,39 +407,65 @@ class EventStore(
         load_at: Optional[SequenceHint] = None,
         from_snapshots: bool = True,
     ) -> Optional[AggregateHint]:
+        use_cache = self.aggregate_cache is not None and load_at is None
+        if use_cache and (cached := self.aggregate_cache.get(aggregate_id)):
+            aggregate = self.refresh(deepcopy(cached))
+            if aggregate.version != cached.version:
+                self.aggregate_cache.put(deepcopy(aggregate))
+            return aggregate
 
         snapshot = (
-            self.get_last_snapshot(
-                aggregate_id,
-                snapshot_type=self._AggregatedClass.SnapshotClass,
-                load_at=load_at,
+            self._get_last_snapshot(
+                aggregate_id, self._AggregatedClass.SnapshotClass, load_at
             )
             if from_snapshots
             else None
         )
         if snapshot:
-            actual_snapshot = snapshot.upcast()
-            while type(actual_snapshot) != type(snapshot):
-                snapshot = actual_snapshot
-                actual_snapshot = snapshot.upcast()
-
+            snapshot = upcast_snapshot(snapshot)
             aggregate = self._AggregatedClass.from_snapshot(aggregate_id, snapshot)
-            all_events = self.get_events(
+            aggregate._mark_stored(snapshot)
+            all_events = self.iter_events(
                 aggregate_id, lte=load_at, gt=snapshot.sequence_order
             )
         else:
-            all_events = self.get_events(aggregate_id, lte=load_at)
             aggregate = self._AggregatedClass(aggregate_id)
+            all_events = self.iter_events(aggregate_id, lte=load_at)
 
-            for event in all_events:
-                actual_event = event.upcast()
-                while not isinstance(actual_event, type(event)):
-                    event = actual_event
-                    actual_event = event.upcast()
-                aggregate._apply_without_saving(actual_event)
+        start, replayed = perf_counter(), 0
+        for event in all_events:
+            aggregate._apply_without_saving(upcast_event(event))
+            aggregate._mark_stored(event)
+            replayed += 1
+        aggregate._mark_replayed(replayed, perf_counter() - start)
 
+        if use_cache:
+            self.aggregate_cache.put(deepcopy(aggregate))
         return aggregate
 
+    def take_snapshot(self, aggregate_id: IdTypeHint) -> bool:
+        """
+        Rebuild the aggregate from the store and save its snapshots at the stored version,
+        return False if the last snapshot is already at that version
+        """
+        aggregate = self.load(aggregate_id)
+        if aggregate.version == aggregate.snapshot_version:
+            return False
+        # the snapshots are placed on the last applied event, not at the current time,
+        # so events saved in the meantime are still replayed after them
+        snapshots = aggregate._create_snapshots(
+            aggregate.version, aggregate.last_sequence_order
+        )
+        with self.transaction():
+            self.save_snapshots_batch({aggregate_id: snapshots})
+
+        for snapshot in snapshots:
+            aggregate._mark_stored(snapshot)
+        self.after_commit(
+            lambda: self._cache_saved([aggregate], {aggregate_id: snapshots})
+        )
+        return True
+
     def load_projection(
         self,
         aggregate_id: IdTypeHint,
@@ -153,39 +473,185 @@ class EventStore(
         load_at: Optional[SequenceHint] = None,
         from_snapshots: bool = True,
     ) -> Optional[Projection]:
+        if self._reads_materialized(projection_class, load_at) and (
+            projection := self.materializer.state_store.get(
+                projection_class, aggregate_id
+            )
+        ):
+            return projection
 
-        projection_events = list(
-            EventHandler.get_aggregate_handlers(projection_class).keys()
-        )
+        projection_events = EventHandler.get_handled_event_types(projection_class)
 
         snapshot = (
-            self.get_last_snapshot(
-                aggregate_id,
-                snapshot_type=projection_class.SnapshotClass,
-                load_at=load_at,
+            self._get_last_snapshot(
+                aggregate_id, projection_class.SnapshotClass, load_at
             )
             if from_snapshots
             else None
         )
         if snapshot:
-            actual_snapshot = snapshot.upcast()
-            while type(actual_snapshot) != type(snapshot):
-                snapshot = actual_snapshot
-                actual_snapshot = snapshot.upcast()
-
+            snapshot = upcast_snapshot(snapshot)
             aggregate = projection_class.from_snapshot(aggregate_id, snapshot)
-            all_events = self.get_events(
+            all_events = self.iter_events(
                 aggregate_id, projection_events, lte=load_at, gt=snapshot.sequence_order
             )
         else:
-            all_events = self.get_events(aggregate_id, projection_events, lte=load_at)
+            all_events = self.iter_events(aggregate_id, projection_events, lte=load_at)
             aggregate = projection_class(aggregate_id)
 
         for event in all_events:
-            actual_event = event.upcast()
-            while not isinstance(actual_event, type(event)):
-                event = actual_event
-                actual_event = event.upcast()
-            aggregate.apply(actual_event)
+            aggregate.apply(upcast_event(event))
+
+        return aggregate
 
+    def refresh(self, aggregate: AggregateHint) -> AggregateHint:
+        """
+        Apply the events stored after the aggregate was loaded or saved,
+        without replaying the whole stream. The aggregate should have no uncommited events.
+        The events are selected by version, so events of other writers with an older
+        sequence_order, e.g. from a skewed clock, are applied too.
+        """
+        for event in self.iter_events_after_version(aggregate.id, aggregate.version):
+            aggregate._apply_without_saving(upcast_event(event))
+            aggregate._mark_stored(event)
         return aggregate
+
+    def load_many(
+        self,
+        aggregate_ids: Iterable[IdTypeHint],
+        load_at: Optional[SequenceHint] = None,
+        from_snapshots: bool = True,
+    ) -> dict[IdTypeHint, AggregateHint]:
+        """Load several aggregates with one snapshots and one events query"""
+        return self._load_many(
+            self._AggregatedClass, aggregate_ids, [], load_at, from_snapshots
+        )
+
+    def load_projections_many(
+        self,
+        aggregate_ids: Iterable[IdTypeHint],
+        projection_class: Type[Projection],
+        load_at: Optional[SequenceHint] = None,
+        from_snapshots: bool = True,
+    ) -> dict[IdTypeHint, Projection]:
+        """Load projections of several aggregates with one snapshots and one events query"""
+        projections = {}
+        if self._reads_materialized(projection_class, load_at):
+            aggregate_ids = list(aggregate_ids)
+            projections = self.materializer.state_store.get_many(
+                projection_class, aggregate_ids
+            )
+            aggregate_ids = [a for a in aggregate_ids if a not in projections]
+            if not aggregate_ids:
+                return projections
+
+        projection_events = EventHandler.get_handled_event_types(projection_class)
+        projections.update(
+            self._load_many(
+                projection_class,
+                aggregate_ids,
+                projection_events,
+                load_at,
+                from_snapshots,
+            )
+        )
+        return projections
+
+    def _reads_materialized(
+        self, projection_class: Type[Projection], load_at: Optional[SequenceHint]
+    ) -> bool:
+        """Current state of the projection is read from the materializer"""
+        return (
+            self.materializer is not None
+            and load_at is None
+            and self.materializer.materializes(projection_class)
+        )
+
+    def _get_last_snapshot(
+        self,
+        aggregate_id: IdTypeHint,
+        snapshot_type: Type[Snapshot],
+        load_at: Optional[SequenceHint],
+    ) -> Optional[Snapshot]:
+        """get_last_snapshot through snapshot_cache, time travel loads bypass the cache"""
+        cache = self.snapshot_cache if load_at is None else None
+        snapshot = (
+            cache.get(aggregate_id, snapshot_type) if cache is not None else NOT_CACHED
+        )
+        if snapshot is NOT_CACHED:
+            snapshot = self.get_last_snapshot(
+                aggregate_id, snapshot_type=snapshot_type, load_at=load_at
+            )
+            if cache is not None:
+                cache.put(aggregate_id, snapshot_type, snapshot)
+        return snapshot
+
+    def _get_last_snapshots(
+        self,
+        aggregate_ids: list[IdTypeHint],
+        snapshot_type: Type[Snapshot],
+        load_at: Optional[SequenceHint],
+    ) -> dict[IdTypeHint, Snapshot]:
+        """get_last_snapshots querying only the aggregates missing from snapshot_cache"""
+        cache = self.snapshot_cache if load_at is None else None
+        if cache is None:
+            return self.get_last_snapshots(
+                aggregate_ids, snapshot_type=snapshot_type, load_at=load_at
+            )
+
+        snapshots = {}
+        missing = []
+        for aggregate_id in aggregate_ids:
+            snapshot = cache.get(aggregate_id, snapshot_type)
+            if snapshot is NOT_CACHED:
+                missing.append(aggregate_id)
+            elif snapshot is not None:
+                snapshots[aggregate_id] = snapshot
+        if missing:
+            found = self.get_last_snapshots(missing, snapshot_type=snapshot_type)
+            for aggregate_id in missing:
+                cache.put(aggregate_id, snapshot_type, found.get(aggregate_id))
+            snapshots.update(found)
+        return snapshots
+
+    def _load_many(
+        self,
+        aggregate_class: Type[Any],
+        aggregate_ids: Iterable[IdTypeHint],
+        event_types: list[Type[Event]],
+        load_at: Optional[SequenceHint],
+        from_snapshots: bool,
+    ) -> dict[IdTypeHint, Any]:
+        aggregate_ids = list(aggregate_ids)
+        snapshots = (
+            self._get_last_snapshots(
+                aggregate_ids, aggregate_class.SnapshotClass, load_at
+            )
+            if from_snapshots
+            else {}
+        )
+
+        aggregates = {}
+        gt_by_aggregate = {}
+        for aggregate_id in aggregate_ids:
+            if snapshot := snapshots.get(aggregate_id):
+                snapshot = upcast_snapshot(snapshot)
+                aggregates[aggregate_id] = aggregate_class.from_snapshot(
+                    aggregate_id, snapshot
+                )
+                aggregates[aggregate_id]._mark_stored(snapshot)
+                gt_by_aggregate[aggregate_id] = snapshot.sequence_order
+            else:
+                aggregates[aggregate_id] = aggregate_class(aggregate_id)
+                gt_by_aggregate[aggregate_id] = None
+
+        all_events = self.get_events_batch(gt_by_aggregate, event_types, lte=load_at)
+        for aggregate_id, events in all_events.items():
+            aggregate = aggregates[aggregate_id]
+            start = perf_counter()
+            for event in events:
+                aggregate._apply_without_saving(upcast_event(event))
+                aggregate._mark_stored(event)
+            aggregate._mark_replayed(len(events), perf_counter() - start)
+
+        return aggregates
@@ -8,3 +8,7 @@ class RegisterException(PyeventorException):
 
 class HandlerException(PyeventorException):
     ...
+
+
+class ConcurrencyException(PyeventorException):
+    ...
@@ -3,15 +3,29 @@ from collections import defaultdict
 
 import inspect
 from typing import Type, Callable, Optional
-from typing import TYPE_CHECKING, get_args, Any
+from typing import TYPE_CHECKING, Any
+
+from pyeventor.event import Event, event_classes_by_name
+from pyeventor.exceptions import RegisterException
 
 if TYPE_CHECKING:
     from pyeventor.aggregate import Aggregate
-    from pyeventor.event import Event
+
+
+def _qualified_name(event_class: Type[Event]) -> str:
+    return f"{event_class.__module__}.{event_class.__qualname__}"
 
 
 class EventHandler:
     __event_handlers__: dict[Type, dict[Type, Callable]] = defaultdict(dict)
+    # handler -> True when it is defined on the event (called as handler(event, aggregate))
+    __handlers_event_first__: dict[Callable, bool] = {}
+    # (aggregate class, event class) -> invoker called as invoker(aggregate, event)
+    __dispatch_cache__: dict[tuple[Type, Type], Optional[Callable]] = {}
+    # aggregate class -> event classes with a handler in the class or its bases
+    __handled_event_types__: dict[Type, list[Type[Event]]] = {}
+    # Event.type_name() -> (event class, event data type)
+    __event_types__: dict[str, tuple[Type, Any]] = {}
 
     @classmethod
     def set_handler(
@@ -21,6 +35,31 @@ class EventHandler:
         function: Callable,
     ) -> None:
         cls.__event_handlers__[aggregate_class][event_class] = function
+        cls.register_event_type(event_class)
+        cls.__dispatch_cache__.clear()
+        cls.__handled_event_types__.clear()
+
+    @classmethod
+    def register_event_type(cls, event_class: Type[Event]) -> None:
+        type_name = event_class.type_name()
+        registered, _ = cls.__event_types__.get(type_name, (None, None))
+        # a class defined again, e.g. by reloading its module, replaces the previous one
+        if registered is not None and _qualified_name(registered) != _qualified_name(
+            event_class
+        ):
+            raise RegisterException(
+                f"{_qualified_name(event_class)} and {_qualified_name(registered)} "
+                f"are both stored as {type_name!r}, set __type_name__ on one of them"
+            )
+        cls.__event_types__[type_name] = (
+            event_class,
+            event_class.data_type(),
+        )
+
+    @classmethod
+    def set_arguments_order(cls, function: Callable, event_first: bool) -> None:
+        cls.__handlers_event_first__[function] = event_first
+        cls.__dispatch_cache__.clear()
 
     @classmethod
     def get_aggregate_handlers(
@@ -28,6 +67,21 @@ class EventHandler:
     ) -> dict[Type, Callable]:
         return cls.__event_handlers__.get(aggregate_class, {})
 
+    @classmethod
+    def get_handled_event_types(cls, aggregate_class: Type[Any]) -> list[Type[Event]]:
+        """
+        Event classes with a handler in the class or its bases, the events projections load.
+        Computed once per class until the handlers registry changes.
+        """
+        if (event_types := cls.__handled_event_types__.get(aggregate_class)) is None:
+            handled: dict[Type[Event], None] = {}
+            for next_class_base in inspect.getmro(aggregate_class):
+                handled.update(
+                    dict.fromkeys(cls.get_aggregate_handlers(next_class_base))
+                )
+            event_types = cls.__handled_event_types__[aggregate_class] = list(handled)
+        return event_types
+
     @classmethod
     def get_handler(
         cls, aggregate_class: Type[Aggregate], event_class: Type[Event]
@@ -39,18 +93,68 @@ class EventHandler:
                     return handler
         return None
 
+    @classmethod
+    def get_invoker(
+        cls, aggregate_class: Type[Aggregate], event_class: Type[Event]
+    ) -> Optional[Callable]:
+        """
+        Return the handler for the pair as a callable with (aggregate, event) signature.
+        Resolved once per pair and cached until the handlers registry changes.
+        """
+        key = (aggregate_class, event_class)
+        try:
+            return cls.__dispatch_cache__[key]
+        except KeyError:
+            pass
+
+        invoker: Optional[Callable] = None
+        if handler := cls.get_handler(aggregate_class, event_class):
+            event_first = cls._is_event_first(handler, aggregate_class)
+            if event_first:
+
+                def invoker(aggregate, event):
+                    return handler(event, aggregate)
+
+            elif event_first is not None:
+                invoker = handler
+        cls.__dispatch_cache__[key] = invoker
+        return invoker
+
+    @classmethod
+    def _is_event_first(
+        cls, handler: Callable, aggregate_class: Type[Aggregate]
+    ) -> Optional[bool]:
+        if handler in cls.__handlers_event_first__:
+            return cls.__handlers_event_first__[handler]
+
+        for _, v in inspect.signature(handler).parameters.items():
+            if not isinstance(v.annotation, type):
+                continue
+            if issubclass(v.annotation, aggregate_class):
+                return True
+            if issubclass(v.annotation, Event):
+                return False
+        return None
+
     @classmethod
     def copy_handlers(
         cls, copy_from: Type[Aggregate], copy_to: Type[Aggregate]
     ) -> None:
         cls.__event_handlers__[copy_to] = cls.get_aggregate_handlers(copy_from)
+        cls.__dispatch_cache__.clear()
+        cls.__handled_event_types__.clear()
 
     @classmethod
     def get_event_class_by_name(cls, event_class_name: str) -> tuple[Type[Event], Any]:
-        for event_dict in cls.__event_handlers__.values():
-            for event_class in event_dict.keys():
-                if event_class.__name__ == event_class_name:
-                    type_data = get_args(event_class.__orig_bases__[0])[1]
-                    return event_class, type_data
-
-        return None, None
+        if event_class_name not in cls.__event_types__:
+            # event classes without handlers, e.g. subclasses of the handled ones,
+            # unknown names are looked up in the same map until a class is defined
+            event_classes = event_classes_by_name().get(event_class_name, ())
+            if len(event_classes) > 1:
+                raise RegisterException(
+                    f"{', '.join(map(_qualified_name, event_classes))} "
+                    f"are all stored as {event_class_name!r}, set __type_name__ on them"
+                )
+            if event_classes:
+                cls.register_event_type(event_classes[0])
+        return cls.__event_types__.get(event_class_name, (None, None))
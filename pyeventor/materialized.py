@@ -0,0 +1,173 @@
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from copy import deepcopy
+from threading import Lock
+from typing import Any, Iterable, Iterator, Optional, Type
+
+from pyeventor.aggregate import Projection
+from pyeventor.event import Event
+from pyeventor.event_store import EventStore, upcast_event
+from pyeventor.handler import EventHandler
+
+# the states are updated in the transaction of the save
+INLINE = "inline"
+# the states are updated after the save by a background worker, reads may lag behind
+EVENTUAL = "eventual"
+
+
+class ProjectionStateStore(ABC):
+    """Current state of the materialized projections, by projection class and aggregate id"""
+
+    @abstractmethod
+    def get_many(
+        self, projection_class: Type[Projection], aggregate_ids: Iterable[Any]
+    ) -> dict[Any, Projection]:
+        """States of the aggregates, the aggregates without state are omitted"""
+        ...
+
+    @abstractmethod
+    def save_many(
+        self, projection_class: Type[Projection], projections: dict[Any, Projection]
+    ) -> None:
+        ...
+
+    def get(
+        self, projection_class: Type[Projection], aggregate_id: Any
+    ) -> Optional[Projection]:
+        return self.get_many(projection_class, [aggregate_id]).get(aggregate_id)
+
+
+class InMemoryProjectionStateStore(ProjectionStateStore):
+    def __init__(self):
+        # (projection name, aggregate id) -> projection
+        self.states: dict[tuple[str, Any], Projection] = {}
+
+    def get_many(
+        self, projection_class: Type[Projection], aggregate_ids: Iterable[Any]
+    ) -> dict[Any, Projection]:
+        name = projection_class.projection_name()
+        return {
+            aggregate_id: deepcopy(self.states[(name, aggregate_id)])
+            for aggregate_id in aggregate_ids
+            if (name, aggregate_id) in self.states
+        }
+
+    def save_many(
+        self, projection_class: Type[Projection], projections: dict[Any, Projection]
+    ) -> None:
+        name = projection_class.projection_name()
+        for aggregate_id, projection in projections.items():
+            self.states[(name, aggregate_id)] = deepcopy(projection)
+
+
+def handled_events(
+    projection_class: Type[Any], events: dict[Any, list[Event]]
+) -> dict[Any, list[tuple[Event, Event]]]:
+    """Stored and upcasted events the projection has a handler for, by aggregate id"""
+    handled: dict[Any, list[tuple[Event, Event]]] = {}
+    for aggregate_id, aggregate_events in events.items():
+        for event in aggregate_events:
+            actual_event = upcast_event(event)
+            if EventHandler.get_invoker(projection_class, type(actual_event)):
+                handled.setdefault(aggregate_id, []).append((event, actual_event))
+    return handled
+
+
+def unapplied(
+    projection: Any, handled: list[tuple[Event, Event]]
+) -> Iterator[tuple[Event, Event]]:
+    """Handled events newer than the state, so an update applied twice changes nothing"""
+    for event, actual_event in handled:
+        if event.version is None or event.version > projection.version:
+            yield event, actual_event
+
+
+def apply_handled(projection: Any, handled: list[tuple[Event, Event]]) -> None:
+    for event, actual_event in unapplied(projection, handled):
+        projection._apply_without_saving(actual_event)
+        projection._mark_stored(event)
+
+
+class Materializer:
+    """
+    Keep the state of projections in a ProjectionStateStore, updated with the events
+    saved by the store, so load_projection is a single lookup instead of a replay.
+    Aggregates without a state yet are replayed from the store once.
+
+        store.materializer = Materializer(InMemoryProjectionStateStore(), [CustomProjection])
+    """
+
+    def __init__(
+        self,
+        state_store: ProjectionStateStore,
+        projection_classes: Iterable[Type[Projection]],
+        consistency: str = INLINE,
+    ):
+        """
+        consistency: INLINE to update the states in the transaction of the save,
+            EVENTUAL to update them after the save in a background thread
+        """
+        if consistency not in (INLINE, EVENTUAL):
+            raise ValueError(f"unknown consistency {consistency!r}")
+        self.state_store = state_store
+        self.projection_classes = list(projection_classes)
+        self.consistency = consistency
+        self.errors = 0
+        self.last_error: Optional[Exception] = None
+        self._lock = Lock()
+        # a single worker keeps the updates in the order of the saves
+        self._executor = (
+            ThreadPoolExecutor(1, thread_name_prefix="pyeventor-materializer")
+            if consistency == EVENTUAL
+            else None
+        )
+
+    def materializes(self, projection_class: Type[Projection]) -> bool:
+        return projection_class in self.projection_classes
+
+    def on_save(self, store: EventStore, events: dict[Any, list[Event]]) -> None:
+        """Called by the store in the transaction of the save"""
+        if self._executor is None:
+            self.update(store, events)
+
+    def on_commit(self, store: EventStore, events: dict[Any, list[Event]]) -> None:
+        """Called by the store once the save is committed"""
+        if self._executor is not None:
+            self._executor.submit(self._update_in_background, store, events)
+
+    def update(self, store: EventStore, events: dict[Any, list[Event]]) -> None:
+        """Apply the saved events to the states of all the materialized projections"""
+        for projection_class in self.projection_classes:
+            handled = handled_events(projection_class, events)
+            if not handled:
+                continue
+            projections = self.state_store.get_many(projection_class, handled)
+            if missing := [a for a in handled if a not in projections]:
+                # the store already has the saved events, they are not applied again
+                projections.update(
+                    store.load_projections_many(missing, projection_class)
+                )
+            for aggregate_id, aggregate_handled in handled.items():
+                apply_handled(projections[aggregate_id], aggregate_handled)
+            self.state_store.save_many(projection_class, projections)
+
+    def _update_in_background(
+        self, store: EventStore, events: dict[Any, list[Event]]
+    ) -> None:
+        try:
+            self.update(store, events)
+        except Exception as e:
+            with self._lock:
+                self.errors += 1
+                self.last_error = e
+
+    def close(self, wait: bool = True) -> None:
+        """Stop the background worker, by default after the queued updates are applied"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+
+    def __enter__(self) -> "Materializer":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
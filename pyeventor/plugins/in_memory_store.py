@@ -6,14 +6,62 @@ from pyeventor.event_store import (
     Snapshot,
     AggregateHint,
 )
-from typing import Type, List, Optional
+from pyeventor.event import event_type_filter
+from pyeventor.exceptions import ConcurrencyException
+from typing import Type, List, Optional, Iterator, Any
 from contextlib import contextmanager
+from bisect import bisect_right
+from heapq import merge
+
+
+class SequenceIndex:
+    """Events kept sorted by sequence_order, ranges are found with bisect"""
+
+    def __init__(self):
+        self.keys: list[Any] = []
+        self.events: list[Event] = []
+
+    def add(self, event: Event) -> None:
+        position = bisect_right(self.keys, event.sequence_order)
+        self.keys.insert(position, event.sequence_order)
+        self.events.insert(position, event)
+
+    def range(
+        self, gt: Optional[SequenceHint] = None, lte: Optional[SequenceHint] = None
+    ) -> Iterator[Event]:
+        start = bisect_right(self.keys, gt) if gt is not None else 0
+        end = bisect_right(self.keys, lte) if lte is not None else len(self.keys)
+        for position in range(start, end):
+            yield self.events[position]
+
+    def last(self, lte: Optional[SequenceHint] = None) -> Optional[Event]:
+        end = bisect_right(self.keys, lte) if lte is not None else len(self.keys)
+        return self.events[end - 1] if end else None
+
+
+class StreamIndex(SequenceIndex):
+    """All the events of an aggregate, also kept in version order"""
+
+    def __init__(self):
+        super().__init__()
+        # versions are checked on save, the event of version v is at index v - 1
+        self.by_version: list[Event] = []
+
+    def add(self, event: Event) -> None:
+        super().add(event)
+        self.by_version.append(event)
 
 
 class InMemoryEventStore(EventStore[AggregateHint, SequenceHint, IdTypeHint]):
     def __init__(self):
-        self.events = {}
-        self.snapshots = {}
+        # aggregate_id -> all the events of the aggregate
+        self.events: dict[Any, StreamIndex] = {}
+        # aggregate_id -> event class -> events of that class
+        self.events_by_type: dict[Any, dict[Type[Event], SequenceIndex]] = {}
+        # aggregate_id -> snapshot class -> snapshots of that class
+        self.snapshots: dict[Any, dict[Type[Snapshot], SequenceIndex]] = {}
+        # all the events in the order they were saved, the position of an event is its index + 1
+        self.log: list[Event] = []
 
     def get_events(
         self,
@@ -22,26 +70,81 @@ class InMemoryEventStore(EventStore[AggregateHint, SequenceHint, IdTypeHint]):
         gt: Optional[SequenceHint] = None,
         lte: Optional[SequenceHint] = None,
     ) -> List[Event]:
+        return list(self.iter_events(aggregate_id, event_types, gt=gt, lte=lte))
+
+    def iter_events(
+        self,
+        aggregate_id: IdTypeHint,
+        event_types: list[Type[Event]] = [],
+        gt: Optional[SequenceHint] = None,
+        lte: Optional[SequenceHint] = None,
+    ) -> Iterator[Event]:
+        if aggregate_id not in self.events:
+            return
+        if not event_types:
+            yield from self.events[aggregate_id].range(gt, lte)
+            return
+
+        classes = event_type_filter(tuple(event_types)).classes
+        indexes = [
+            index
+            for event_class, index in self.events_by_type[aggregate_id].items()
+            if event_class in classes
+        ]
+        if len(indexes) == 1:
+            yield from indexes[0].range(gt, lte)
+        else:
+            yield from merge(
+                *(index.range(gt, lte) for index in indexes),
+                key=lambda event: event.sequence_order,
+            )
+
+    def iter_events_after_version(
+        self, aggregate_id: IdTypeHint, version: int
+    ) -> Iterator[Event]:
         if aggregate_id in self.events:
-            events = self.events[aggregate_id]
-            if event_types:
-                events = [
-                    event
-                    for event in events
-                    if isinstance(event[1], tuple(event_types))
-                ]
-            if gt:
-                events = [event for event in events if event[1].sequence_order > gt]
-            if lte:
-                events = [event for event in events if event[1].sequence_order <= lte]
-            return [event[1] for event in events]
-        return []
+            yield from self.events[aggregate_id].by_version[version:]
 
     def save_events(self, events: List[Event], aggregate_id: IdTypeHint) -> None:
-        if aggregate_id not in self.events:
-            self.events[aggregate_id] = []
+        self._check_versions(events, aggregate_id)
+        all_events = self.events.setdefault(aggregate_id, StreamIndex())
+        events_by_type = self.events_by_type.setdefault(aggregate_id, {})
         for event in events:
-            self.events[aggregate_id].append((type(event), event))
+            if event.version is None:
+                event.version = len(all_events.events) + 1
+            event.aggregate_id = aggregate_id
+            event.position = len(self.log) + 1
+            self.log.append(event)
+            if event.sequence_order is None:
+                event._sequence_order = event.position
+            all_events.add(event)
+            events_by_type.setdefault(type(event), SequenceIndex()).add(event)
+
+    def get_all_events(self, after_position: int = 0, limit: int = 1000) -> List[Event]:
+        return self.log[after_position : after_position + limit]
+
+    def get_aggregate_ids(self) -> List[IdTypeHint]:
+        return list(self.events)
+
+    def get_last_position(self) -> int:
+        return len(self.log)
+
+    def save_events_batch(self, events: dict[IdTypeHint, List[Event]]) -> None:
+        # check all the aggregates before writing, so a conflict doesn't leave a partial save
+        for aggregate_id, aggregate_events in events.items():
+            self._check_versions(aggregate_events, aggregate_id)
+        super().save_events_batch(events)
+
+    def _check_versions(self, events: List[Event], aggregate_id: IdTypeHint) -> None:
+        stored = (
+            len(self.events[aggregate_id].events) if aggregate_id in self.events else 0
+        )
+        for expected, event in enumerate(events, start=stored + 1):
+            if event.version is not None and event.version != expected:
+                raise ConcurrencyException(
+                    f"aggregate {aggregate_id} has {stored} stored events, "
+                    f"event with version {event.version} can't be appended"
+                )
 
     @contextmanager
     def transaction(self):
@@ -50,10 +153,9 @@ class InMemoryEventStore(EventStore[AggregateHint, SequenceHint, IdTypeHint]):
     def save_snapshots(
         self, snapshots: list[Snapshot], aggregate_id: IdTypeHint
     ) -> None:
-        if aggregate_id not in self.snapshots:
-            self.snapshots[aggregate_id] = []
+        snapshots_by_type = self.snapshots.setdefault(aggregate_id, {})
         for snapshot in snapshots:
-            self.snapshots[aggregate_id].append((type(snapshot), snapshot))
+            snapshots_by_type.setdefault(type(snapshot), SequenceIndex()).add(snapshot)
 
     def get_last_snapshot(
         self,
@@ -61,12 +163,13 @@ class InMemoryEventStore(EventStore[AggregateHint, SequenceHint, IdTypeHint]):
         snapshot_type: Optional[Type[Snapshot]] = None,
         load_at: Optional[SequenceHint] = None,
     ) -> Optional[Snapshot]:
-        if aggregate_id in self.snapshots:
-            snapshots = self.snapshots[aggregate_id]
-            if snapshot_type:
-                snapshots = [s for s in snapshots if isinstance(s[1], snapshot_type)]
-            if load_at:
-                snapshots = [s for s in snapshots if s[1].sequence_order <= load_at]
-            if snapshots:
-                return snapshots[-1][1]
-        return None
+        last = None
+        for snapshot_class, index in self.snapshots.get(aggregate_id, {}).items():
+            if snapshot_type and not issubclass(snapshot_class, snapshot_type):
+                continue
+            snapshot = index.last(load_at)
+            if snapshot and (
+                not last or snapshot.sequence_order >= last.sequence_order
+            ):
+                last = snapshot
+        return last
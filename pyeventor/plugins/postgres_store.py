@@ -1,18 +1,29 @@
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.future import select
-import json
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from asyncpg.exceptions import UniqueViolationError
 from sqlalchemy import (
     Column,
     Integer,
     String,
     DateTime,
-    JSON,
+    LargeBinary,
     Table,
     MetaData,
+    Index,
+    and_,
+    or_,
+    func,
+    text,
+    BigInteger,
+    Sequence,
 )
 from datetime import datetime
 from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from zlib import crc32
 from pyeventor.asyncio.event_store import (
     AsyncEventStore,
     IdTypeHint,
@@ -20,48 +31,243 @@ from pyeventor.asyncio.event_store import (
     SequenceHint,
     AggregateAsyncHint,
 )
-from pyeventor.event import Event
-from typing import Type, Optional, List
+from pyeventor.event import Event, event_type_filter
+from pyeventor.exceptions import ConcurrencyException
+from typing import Type, Optional, List, Iterable, AsyncIterator, Any
+from typing import Awaitable, Callable
 from pyeventor.handler import EventHandler
+from pyeventor.serializer import Serializer, JsonSerializer
+from pyeventor.asyncio.projector import AsyncCheckpointStore
+from pyeventor.asyncio.materialized import AsyncProjectionStateStore
+from pyeventor.asyncio.aggregate import AsyncProjection
+
+
+def create_tables(
+    metadata: MetaData, sequence_type: Any = DateTime, prefix: str = ""
+) -> tuple[Table, Table]:
+    """
+    Events and snapshots tables with the given sequence_order column type,
+    e.g. BigInteger for the events using HybridLogicalClock, StreamVersion or StorePosition.
+    The events get a global position, StorePosition events use it as sequence_order.
+    """
+    events_name = f"{prefix}events"
+    snapshots_name = f"{prefix}snapshots"
+    default = datetime.utcnow if sequence_type is DateTime else None
+    events = Table(
+        events_name,
+        metadata,
+        Column("id", Integer, primary_key=True, index=True),
+        Column("aggregate_id", String, nullable=False),
+        Column("type", String, nullable=False),
+        # serialized with the serializer of the event class or of the store
+        Column("data", LargeBinary),
+        Column("sequence_order", sequence_type, default=default),
+        # position of the event in the aggregate stream, starting from 1
+        Column("version", Integer, nullable=False),
+        # position of the event in the whole store, starting from 1, in commit order
+        # with ordered_log, otherwise taken from the sequence
+        Column(
+            "position",
+            BigInteger,
+            Sequence(f"{events_name}_position_seq"),
+            nullable=False,
+        ),
+        Index(f"uq_{events_name}_position", "position", unique=True),
+        Index(
+            f"uq_{events_name}_aggregate_id_version",
+            "aggregate_id",
+            "version",
+            unique=True,
+        ),
+        Index(
+            f"ix_{events_name}_aggregate_id_sequence_order",
+            "aggregate_id",
+            "sequence_order",
+        ),
+        Index(
+            f"ix_{events_name}_aggregate_id_type_sequence_order",
+            "aggregate_id",
+            "type",
+            "sequence_order",
+        ),
+    )
+    snapshots = Table(
+        snapshots_name,
+        metadata,
+        Column("id", Integer, primary_key=True, index=True),
+        Column("aggregate_id", String, nullable=False),
+        Column("type", String, nullable=False),
+        Column("data", LargeBinary),
+        Column("sequence_order", sequence_type, default=default),
+        # version of the aggregate the snapshot was taken at
+        Column("version", Integer),
+        Index(
+            f"ix_{snapshots_name}_aggregate_id_type_sequence_order",
+            "aggregate_id",
+            "type",
+            "sequence_order",
+        ),
+    )
+    return events, snapshots
 
 
 metadata = MetaData()
 
-event_table = Table(
-    "events",
+event_table, snapshot_table = create_tables(metadata)
+
+# positions of the projection runners, see PostgresAsyncCheckpointStore
+checkpoint_table = Table(
+    "projection_checkpoints",
     metadata,
-    Column("id", Integer, primary_key=True, index=True),
-    Column("aggregate_id", String, nullable=False),
-    Column("type", String, nullable=False),
-    Column("data", JSON),
-    Column("sequence_order", DateTime, default=datetime.utcnow),
+    Column("name", String, primary_key=True),
+    Column("position", BigInteger, nullable=False),
 )
 
-snapshot_table = Table(
-    "snapshots",
+# current state of the materialized projections, see PostgresAsyncProjectionStateStore
+projection_state_table = Table(
+    "projection_states",
     metadata,
-    Column("id", Integer, primary_key=True, index=True),
-    Column("aggregate_id", String, nullable=False),
-    Column("type", String, nullable=False),
-    Column("data", JSON),
-    Column("sequence_order", DateTime, default=datetime.utcnow),
+    Column("projection", String, primary_key=True),
+    Column("aggregate_id", String, primary_key=True),
+    Column("data", LargeBinary),
+    # version of the last event applied to the state
+    Column("version", Integer, nullable=False),
 )
 
+# Bring the tables created before the version and position columns, the indexes
+# and the binary data column to the current schema, formatted with the names of the
+# events and snapshots tables
+MIGRATION_STATEMENTS = [
+    "ALTER TABLE {events} ADD COLUMN IF NOT EXISTS version INTEGER",
+    """
+    UPDATE {events} SET version = numbered.version
+    FROM (
+        SELECT id, ROW_NUMBER() OVER (
+            PARTITION BY aggregate_id ORDER BY sequence_order, id
+        ) AS version
+        FROM {events}
+    ) AS numbered
+    WHERE {events}.id = numbered.id AND {events}.version IS NULL
+    """,
+    "ALTER TABLE {events} ALTER COLUMN version SET NOT NULL",
+    "ALTER TABLE {snapshots} ADD COLUMN IF NOT EXISTS version INTEGER",
+    # the snapshots are at the version of the last event they were taken after
+    """
+    UPDATE {snapshots} SET version = (
+        SELECT COUNT(*) FROM {events}
+        WHERE {events}.aggregate_id = {snapshots}.aggregate_id
+        AND {events}.sequence_order <= {snapshots}.sequence_order
+    )
+    WHERE {snapshots}.version IS NULL
+    """,
+    "CREATE UNIQUE INDEX IF NOT EXISTS uq_{events}_aggregate_id_version "
+    "ON {events} (aggregate_id, version)",
+    "CREATE INDEX IF NOT EXISTS ix_{events}_aggregate_id_sequence_order "
+    "ON {events} (aggregate_id, sequence_order)",
+    "CREATE INDEX IF NOT EXISTS ix_{events}_aggregate_id_type_sequence_order "
+    "ON {events} (aggregate_id, type, sequence_order)",
+    "CREATE INDEX IF NOT EXISTS ix_{snapshots}_aggregate_id_type_sequence_order "
+    "ON {snapshots} (aggregate_id, type, sequence_order)",
+    "ALTER TABLE {events} ADD COLUMN IF NOT EXISTS position BIGINT",
+    """
+    UPDATE {events} SET position = numbered.position
+    FROM (
+        SELECT id, ROW_NUMBER() OVER (ORDER BY id) + (
+            SELECT COALESCE(MAX(position), 0) FROM {events}
+        ) AS position
+        FROM {events} WHERE position IS NULL
+    ) AS numbered
+    WHERE {events}.id = numbered.id
+    """,
+    "ALTER TABLE {events} ALTER COLUMN position SET NOT NULL",
+    "CREATE UNIQUE INDEX IF NOT EXISTS uq_{events}_position ON {events} (position)",
+    "CREATE SEQUENCE IF NOT EXISTS {events}_position_seq",
+    # after the positions given under the lock of ordered_log as well
+    """
+    SELECT setval('{events}_position_seq', GREATEST(
+        (SELECT COALESCE(MAX(position), 0) FROM {events}),
+        (SELECT last_value FROM {events}_position_seq)
+    ))
+    """,
+    # event data was stored as a JSON string holding the encoded JSON, snapshot data as JSON
+    """
+    DO $$ BEGIN
+        IF (SELECT data_type FROM information_schema.columns
+            WHERE table_name = '{events}' AND column_name = 'data') <> 'bytea' THEN
+            ALTER TABLE {events} ALTER COLUMN data TYPE BYTEA
+                USING convert_to(data::json #>> '{{}}', 'UTF8');
+        END IF;
+        IF (SELECT data_type FROM information_schema.columns
+            WHERE table_name = '{snapshots}' AND column_name = 'data') <> 'bytea' THEN
+            ALTER TABLE {snapshots} ALTER COLUMN data TYPE BYTEA
+                USING convert_to(data::text, 'UTF8');
+        END IF;
+    END $$
+    """,
+]
+
 
 class PostgresAsyncEventStore(
     AsyncEventStore[SequenceHint, IdTypeHint, AggregateAsyncHint]
 ):
-    def __init__(self, database_url):
+    # tables of the store, set them from create_tables for another sequence_order type
+    event_table: Table = event_table
+    snapshot_table: Table = snapshot_table
+
+    def __init__(
+        self,
+        database_url,
+        copy_threshold: Optional[int] = None,
+        fetch_size: int = 1000,
+        serializer: Optional[Serializer] = None,
+        lazy_data: bool = False,
+        ordered_log: bool = False,
+    ):
+        """
+        copy_threshold: number of rows from which a batch is written with COPY
+        instead of a multi-row INSERT, None to always use INSERT
+        fetch_size: number of rows fetched at a time when events are streamed
+        serializer: serializer of the event and snapshot data, for the classes
+        which don't set their own (Event.serializer), JsonSerializer if None.
+        The rows converted by migrate_schema hold JSON, they can't be read with a
+        serializer which doesn't decode JSON
+        lazy_data: keep the event data encoded until the handlers access it
+        ordered_log: give the positions under a lock, in commit order and without gaps,
+        as read_all and the projection runners need. The saves of all the aggregates
+        then wait for each other, without it the positions come from a sequence
+        """
         self.engine = create_async_engine(database_url)
         self.async_session_factory = sessionmaker(
             self.engine, expire_on_commit=False, class_=AsyncSession
         )
+        self.copy_threshold = copy_threshold
+        self.fetch_size = fetch_size
+        self.serializer = serializer or JsonSerializer()
+        self.lazy_data = lazy_data
+        self.ordered_log = ordered_log
+        self._current_session: ContextVar[Optional[AsyncSession]] = ContextVar(
+            f"pyeventor_session_{id(self)}", default=None
+        )
+        # callbacks awaited once the outermost transaction is committed
+        self._after_commit: ContextVar[Optional[list]] = ContextVar(
+            f"pyeventor_after_commit_{id(self)}", default=None
+        )
 
     @asynccontextmanager
     async def transaction(self):
-        """Provide a transactional scope around a series of operations."""
+        """
+        Provide a transactional scope around a series of operations.
+        Nested transactions reuse the outer session, so the scope is committed once.
+        """
+        if outer_session := self._current_session.get():
+            yield outer_session
+            return
+
+        callbacks: list[Callable[[], Awaitable[None]]] = []
         async with self.async_session_factory() as session:
             async with session.begin():
+                token = self._current_session.set(session)
+                callbacks_token = self._after_commit.set(callbacks)
                 try:
                     yield session
                 except Exception as e:
@@ -69,33 +275,171 @@ class PostgresAsyncEventStore(
                     raise e
                 else:
                     await session.commit()  # Explicit commit if no errors
+                finally:
+                    self._current_session.reset(token)
+                    self._after_commit.reset(callbacks_token)
+        # outside of the transaction, so the callbacks don't use its closed session
+        for callback in callbacks:
+            await callback()
+
+    async def after_commit(self, callback: Callable[[], Awaitable[None]]) -> None:
+        """Await callback once the outermost transaction is committed, never on rollback"""
+        if (callbacks := self._after_commit.get()) is not None:
+            callbacks.append(callback)
+        else:
+            await callback()
+
+    @asynccontextmanager
+    async def _read_session(self):
+        """Session of the current transaction if there is one, a new session otherwise"""
+        if outer_session := self._current_session.get():
+            yield outer_session
+        else:
+            async with self.async_session_factory() as session:
+                yield session
+
+    async def create_schema(self) -> None:
+        """Create the events and snapshots tables with their indexes if they don't exist"""
+        async with self.engine.begin() as connection:
+            await connection.run_sync(self.event_table.metadata.create_all)
+
+    async def migrate_schema(self) -> None:
+        """
+        Upgrade tables created by the previous versions of the plugin:
+        add and fill the version and position columns, create the indexes
+        """
+        names = {"events": self.event_table.name, "snapshots": self.snapshot_table.name}
+        async with self.engine.begin() as connection:
+            for statement in MIGRATION_STATEMENTS:
+                await connection.execute(text(statement.format(**names)))
+
+    async def _last_versions(
+        self, session: AsyncSession, aggregate_ids: Iterable[IdTypeHint]
+    ) -> dict[IdTypeHint, int]:
+        stmt = (
+            select(
+                self.event_table.c.aggregate_id, func.max(self.event_table.c.version)
+            )
+            .where(self.event_table.c.aggregate_id.in_(list(aggregate_ids)))
+            .group_by(self.event_table.c.aggregate_id)
+        )
+        result = await session.execute(stmt)
+        return {r[0]: r[1] for r in result.all()}
+
+    async def _last_position(self, session: AsyncSession) -> int:
+        """
+        Last position of the log, taken under a lock held until the end of the transaction,
+        so the positions are given in commit order and without gaps
+        """
+        await session.execute(
+            select(func.pg_advisory_xact_lock(crc32(self.event_table.name.encode())))
+        )
+        result = await session.execute(
+            select(func.coalesce(func.max(self.event_table.c.position), 0))
+        )
+        return result.scalar()
+
+    async def _positions(self, session: AsyncSession, count: int) -> list[int]:
+        """Positions of the next count events, ascending"""
+        if self.ordered_log:
+            last_position = await self._last_position(session)
+            return list(range(last_position + 1, last_position + count + 1))
+        sequence = self.event_table.c.position.default
+        result = await session.execute(
+            select(sequence.next_value()).select_from(func.generate_series(1, count))
+        )
+        return sorted(result.scalars())
+
+    async def _insert_rows(
+        self, session: AsyncSession, table: Table, rows: list[dict]
+    ) -> None:
+        """Write all the rows in one round-trip"""
+        if not rows:
+            return
+        if self.copy_threshold is not None and len(rows) >= self.copy_threshold:
+            connection = await session.connection()
+            raw_connection = await connection.get_raw_connection()
+            columns = list(rows[0].keys())
+            await raw_connection.driver_connection.copy_records_to_table(
+                table.name,
+                records=[tuple(row[c] for c in columns) for row in rows],
+                columns=columns,
+            )
+        else:
+            await session.execute(table.insert(), rows)
 
     async def save_events(self, events: List[Event], aggregate_id: IdTypeHint) -> None:
-        async with self.transaction() as session:
+        await self.save_events_batch({aggregate_id: events})
 
-            for event in events:
-                await session.execute(
-                    event_table.insert().values(
-                        aggregate_id=aggregate_id,
-                        type=event.__class__.__name__,
-                        data=json.dumps(event.data),
-                        sequence_order=event.sequence_order,
+    async def save_events_batch(self, events: dict[IdTypeHint, List[Event]]) -> None:
+        async with self.transaction() as session:
+            # with ordered_log the lock taken for the positions serializes the writers,
+            # otherwise concurrent appends are rejected by the unique version index
+            positions = iter(
+                await self._positions(session, sum(map(len, events.values())))
+            )
+            unversioned = [
+                aggregate_id
+                for aggregate_id, aggregate_events in events.items()
+                if any(event.version is None for event in aggregate_events)
+            ]
+            last_versions = (
+                await self._last_versions(session, unversioned) if unversioned else {}
+            )
+            rows = []
+            for aggregate_id, aggregate_events in events.items():
+                version = last_versions.get(aggregate_id, 0)
+                for event in aggregate_events:
+                    version = (
+                        event.version if event.version is not None else version + 1
                     )
-                )
+                    position = next(positions)
+                    event.aggregate_id = aggregate_id
+                    event.position = position
+                    if event.sequence_order is None:
+                        event._sequence_order = position
+                    rows.append(
+                        dict(
+                            aggregate_id=aggregate_id,
+                            type=event.type_name(),
+                            data=event.dumps(self.serializer),
+                            sequence_order=event.sequence_order,
+                            version=version,
+                            position=position,
+                        )
+                    )
+            try:
+                await self._insert_rows(session, self.event_table, rows)
+            except (IntegrityError, UniqueViolationError) as e:
+                # the unique (aggregate_id, version) index is violated
+                raise ConcurrencyException(
+                    f"events of {list(events.keys())} were appended by another writer"
+                ) from e
 
     async def save_snapshots(
         self, snapshots: list[Snapshot], aggregate_id: IdTypeHint
+    ) -> None:
+        await self.save_snapshots_batch({aggregate_id: snapshots})
+
+    async def save_snapshots_batch(
+        self, snapshots: dict[IdTypeHint, list[Snapshot]]
     ) -> None:
         async with self.transaction() as session:
-            for snapshot in snapshots:
-                await session.execute(
-                    snapshot_table.insert().values(
+            await self._insert_rows(
+                session,
+                self.snapshot_table,
+                [
+                    dict(
                         aggregate_id=aggregate_id,
-                        type=snapshot.__class__.__name__,
-                        data=snapshot.data,
+                        type=snapshot.type_name(),
+                        data=snapshot.dumps(self.serializer),
                         sequence_order=snapshot.sequence_order,
+                        version=snapshot.version,
                     )
-                )
+                    for aggregate_id, aggregate_snapshots in snapshots.items()
+                    for snapshot in aggregate_snapshots
+                ],
+            )
 
     async def get_events(
         self,
@@ -104,47 +448,294 @@ class PostgresAsyncEventStore(
         gt: Optional[SequenceHint] = None,
         lte: Optional[SequenceHint] = None,
     ) -> List[Event]:
-        async with self.async_session_factory() as session:
-            stmt = select(event_table).where(event_table.c.aggregate_id == aggregate_id)
+        return [
+            event
+            async for event in self.aiter_events(
+                aggregate_id, event_types, gt=gt, lte=lte
+            )
+        ]
+
+    async def aiter_events(
+        self,
+        aggregate_id: IdTypeHint,
+        event_types: list[Type[Event]] = [],
+        gt: Optional[SequenceHint] = None,
+        lte: Optional[SequenceHint] = None,
+    ) -> AsyncIterator[Event]:
+        """Stream the events with a server-side cursor, fetch_size rows at a time"""
+        stmt = select(self.event_table).where(
+            self.event_table.c.aggregate_id == aggregate_id
+        )
+        if event_types:
+            stmt = stmt.where(
+                self.event_table.c.type.in_(event_type_filter(tuple(event_types)).names)
+            )
+        if gt is not None:
+            stmt = stmt.where(self.event_table.c.sequence_order > gt)
+        if lte is not None:
+            stmt = stmt.where(self.event_table.c.sequence_order <= lte)
+        stmt = stmt.order_by(
+            self.event_table.c.sequence_order, self.event_table.c.version
+        ).execution_options(yield_per=self.fetch_size)
+
+        async with self._read_session() as session:
+            result = await session.stream(stmt)
+            async for r in result:
+                yield self._event_from_row(r)
+
+    async def aiter_events_after_version(
+        self, aggregate_id: IdTypeHint, version: int
+    ) -> AsyncIterator[Event]:
+        """Select the tail on the unique (aggregate_id, version) index"""
+        stmt = (
+            select(self.event_table)
+            .where(
+                self.event_table.c.aggregate_id == aggregate_id,
+                self.event_table.c.version > version,
+            )
+            .order_by(self.event_table.c.version)
+            .execution_options(yield_per=self.fetch_size)
+        )
+        async with self._read_session() as session:
+            result = await session.stream(stmt)
+            async for r in result:
+                yield self._event_from_row(r)
+
+    async def get_events_batch(
+        self,
+        gt_by_aggregate: dict[IdTypeHint, Optional[SequenceHint]],
+        event_types: list[Type[Event]] = [],
+        lte: Optional[SequenceHint] = None,
+    ) -> dict[IdTypeHint, List[Event]]:
+        events: dict[IdTypeHint, List[Event]] = {
+            aggregate_id: [] for aggregate_id in gt_by_aggregate
+        }
+        if not events:
+            return events
+
+        conditions = [
+            and_(
+                self.event_table.c.aggregate_id == aggregate_id,
+                self.event_table.c.sequence_order > gt,
+            )
+            for aggregate_id, gt in gt_by_aggregate.items()
+            if gt is not None
+        ]
+        if full_ids := [a for a, gt in gt_by_aggregate.items() if gt is None]:
+            conditions.append(self.event_table.c.aggregate_id.in_(full_ids))
+
+        async with self._read_session() as session:
+            stmt = select(self.event_table).where(or_(*conditions))
             if event_types:
                 stmt = stmt.where(
-                    event_table.c.type.in_([et.__name__ for et in event_types])
+                    self.event_table.c.type.in_(
+                        event_type_filter(tuple(event_types)).names
+                    )
                 )
-            if gt:
-                stmt = stmt.where(event_table.c.sequence_order > gt)
-            if lte:
-                stmt = stmt.where(event_table.c.sequence_order <= lte)
+            if lte is not None:
+                stmt = stmt.where(self.event_table.c.sequence_order <= lte)
+            stmt = stmt.order_by(
+                self.event_table.c.aggregate_id,
+                self.event_table.c.sequence_order,
+                self.event_table.c.version,
+            )
             result = await session.execute(stmt)
 
-            events = []
             for r in result.all():
-                event_class, event_data = EventHandler.get_event_class_by_name(r[2])
-                event = event_class(
-                    data=event_data(**json.loads(r[3])), sequence_order=r[4]
-                )
-                events.append(event)
-
+                events[r[1]].append(self._event_from_row(r))
             return events
 
+    async def get_all_events(
+        self, after_position: int = 0, limit: int = 1000
+    ) -> List[Event]:
+        stmt = (
+            select(self.event_table)
+            .where(self.event_table.c.position > after_position)
+            .order_by(self.event_table.c.position)
+            .limit(limit)
+        )
+        async with self._read_session() as session:
+            result = await session.execute(stmt)
+            return [self._event_from_row(r) for r in result.all()]
+
+    async def get_aggregate_ids(self) -> List[IdTypeHint]:
+        async with self._read_session() as session:
+            result = await session.execute(
+                select(self.event_table.c.aggregate_id).distinct()
+            )
+            return list(result.scalars())
+
+    async def get_last_position(self) -> int:
+        async with self._read_session() as session:
+            result = await session.execute(
+                select(func.coalesce(func.max(self.event_table.c.position), 0))
+            )
+            return result.scalar()
+
     async def get_last_snapshot(
         self,
         aggregate_id: IdTypeHint,
         snapshot_type: Optional[Type[Snapshot]] = None,
         load_at: Optional[SequenceHint] = None,
     ) -> Optional[Snapshot]:
-        async with self.async_session_factory() as session:
-            stmt = select(snapshot_table).where(
-                snapshot_table.c.aggregate_id == aggregate_id
+        async with self._read_session() as session:
+            stmt = select(self.snapshot_table).where(
+                self.snapshot_table.c.aggregate_id == aggregate_id
             )
             if snapshot_type:
-                stmt = stmt.where(snapshot_table.c.type == snapshot_type.__name__)
-            if load_at:
-                stmt = stmt.where(snapshot_table.c.sequence_order <= load_at)
-            stmt = stmt.order_by(snapshot_table.c.sequence_order.desc())
+                stmt = stmt.where(
+                    self.snapshot_table.c.type == snapshot_type.type_name()
+                )
+            if load_at is not None:
+                stmt = stmt.where(self.snapshot_table.c.sequence_order <= load_at)
+            stmt = stmt.order_by(self.snapshot_table.c.sequence_order.desc())
             result = await session.execute(stmt)
             raw = result.first()
             if raw:
-                snapshot_class = self._AggregatedClass.SnapshotClass
-                snapshot = snapshot_class(data=raw[3], sequence_order=raw[4])
+                return self._snapshot_from_row(raw, snapshot_type)
+
+    async def get_last_snapshots(
+        self,
+        aggregate_ids: Iterable[IdTypeHint],
+        snapshot_type: Optional[Type[Snapshot]] = None,
+        load_at: Optional[SequenceHint] = None,
+    ) -> dict[IdTypeHint, Snapshot]:
+        async with self._read_session() as session:
+            stmt = select(self.snapshot_table).where(
+                self.snapshot_table.c.aggregate_id.in_(list(aggregate_ids))
+            )
+            if snapshot_type:
+                stmt = stmt.where(
+                    self.snapshot_table.c.type == snapshot_type.type_name()
+                )
+            if load_at is not None:
+                stmt = stmt.where(self.snapshot_table.c.sequence_order <= load_at)
+            stmt = stmt.distinct(self.snapshot_table.c.aggregate_id).order_by(
+                self.snapshot_table.c.aggregate_id,
+                self.snapshot_table.c.sequence_order.desc(),
+            )
+            result = await session.execute(stmt)
 
-                return snapshot
+            snapshots: dict[IdTypeHint, Snapshot] = {}
+            for raw in result.all():
+                if raw[1] not in snapshots:
+                    snapshots[raw[1]] = self._snapshot_from_row(raw, snapshot_type)
+            return snapshots
+
+    def _event_from_row(self, r) -> Event:
+        event_class, _ = EventHandler.get_event_class_by_name(r[2])
+        event = event_class.loads(
+            r[3], self.serializer, self.lazy_data, sequence_order=r[4], version=r[5]
+        )
+        event.aggregate_id = r[1]
+        event.position = r[6]
+        return event
+
+    def _snapshot_from_row(
+        self, r, snapshot_type: Optional[Type[Snapshot]]
+    ) -> Snapshot:
+        snapshot_class = snapshot_type or self._AggregatedClass.SnapshotClass
+        return snapshot_class.loads(
+            r[3], self.serializer, sequence_order=r[4], version=r[5]
+        )
+
+
+class PostgresAsyncCheckpointStore(AsyncCheckpointStore):
+    """
+    Checkpoints of the projection runners in the projection_checkpoints table,
+    saved in the transaction of the store if there is one
+    """
+
+    def __init__(self, store: PostgresAsyncEventStore, table: Table = checkpoint_table):
+        self.store = store
+        self.table = table
+
+    async def create_schema(self) -> None:
+        """Create the checkpoints table if it doesn't exist"""
+        async with self.store.engine.begin() as connection:
+            await connection.run_sync(self.table.create, checkfirst=True)
+
+    async def load(self, name: str) -> int:
+        async with self.store._read_session() as session:
+            result = await session.execute(
+                select(self.table.c.position).where(self.table.c.name == name)
+            )
+            return result.scalar() or 0
+
+    async def save(self, name: str, position: int) -> None:
+        stmt = pg_insert(self.table).values(name=name, position=position)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[self.table.c.name],
+            set_=dict(position=stmt.excluded.position),
+        )
+        async with self.store.transaction() as session:
+            await session.execute(stmt)
+
+
+class PostgresAsyncProjectionStateStore(AsyncProjectionStateStore):
+    """
+    States of the materialized projections in the projection_states table,
+    serialized as the snapshots of the projection class.
+    Saved in the transaction of the store if there is one, so inline updates
+    are committed with the events
+    """
+
+    def __init__(
+        self,
+        store: PostgresAsyncEventStore,
+        table: Table = projection_state_table,
+    ):
+        self.store = store
+        self.table = table
+
+    async def create_schema(self) -> None:
+        """Create the projection states table if it doesn't exist"""
+        async with self.store.engine.begin() as connection:
+            await connection.run_sync(self.table.create, checkfirst=True)
+
+    async def get_many(
+        self, projection_class: Type[AsyncProjection], aggregate_ids: Iterable[Any]
+    ) -> dict[Any, AsyncProjection]:
+        stmt = select(self.table).where(
+            self.table.c.projection == projection_class.projection_name(),
+            self.table.c.aggregate_id.in_(list(aggregate_ids)),
+        )
+        async with self.store._read_session() as session:
+            result = await session.execute(stmt)
+            rows = result.all()
+
+        projections = {}
+        for r in rows:
+            snapshot = projection_class.SnapshotClass.loads(
+                r.data, self.store.serializer, version=r.version
+            )
+            projection = projection_class.from_snapshot(r.aggregate_id, snapshot)
+            projection._version = r.version
+            projections[r.aggregate_id] = projection
+        return projections
+
+    async def save_many(
+        self,
+        projection_class: Type[AsyncProjection],
+        projections: dict[Any, AsyncProjection],
+    ) -> None:
+        if not projections:
+            return
+        rows = [
+            dict(
+                projection=projection_class.projection_name(),
+                aggregate_id=aggregate_id,
+                data=projection_class.SnapshotClass.create(projection).dumps(
+                    self.store.serializer
+                ),
+                version=projection.version,
+            )
+            for aggregate_id, projection in projections.items()
+        ]
+        stmt = pg_insert(self.table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[self.table.c.projection, self.table.c.aggregate_id],
+            set_=dict(data=stmt.excluded.data, version=stmt.excluded.version),
+        )
+        async with self.store.transaction() as session:
+            await session.execute(stmt, rows)
@@ -0,0 +1,255 @@
+import os
+from abc import ABC, abstractmethod
+from concurrent.futures import Executor, ProcessPoolExecutor, as_completed
+from threading import Event as StopFlag
+from time import perf_counter
+from typing import Any, Callable, Iterable, Optional, Type
+from zlib import crc32
+
+from pyeventor.aggregate import Projection
+from pyeventor.event import Event
+from pyeventor.event_store import EventStore, upcast_event
+from pyeventor.handler import EventHandler
+
+
+class CheckpointStore(ABC):
+    """Last position of the log processed by each projection runner"""
+
+    @abstractmethod
+    def load(self, name: str) -> int:
+        """Checkpoint of the runner, 0 if it has none"""
+        ...
+
+    @abstractmethod
+    def save(self, name: str, position: int) -> None:
+        ...
+
+
+class InMemoryCheckpointStore(CheckpointStore):
+    def __init__(self):
+        self.positions: dict[str, int] = {}
+
+    def load(self, name: str) -> int:
+        return self.positions.get(name, 0)
+
+    def save(self, name: str, position: int) -> None:
+        self.positions[name] = position
+
+
+def batch_invokers(
+    projection_class: Type[Any], batch: list[Event]
+) -> dict[Type[Event], Optional[Callable]]:
+    """Handlers of the event types of the batch, resolved once per type"""
+    return {
+        event_class: EventHandler.get_invoker(projection_class, event_class)
+        for event_class in {type(event) for event in batch}
+    }
+
+
+def upcast_logged_event(event: Event) -> Event:
+    """Upcast an event of the global log, keeping its aggregate id and position"""
+    actual_event = upcast_event(event)
+    if actual_event is not event:
+        actual_event.aggregate_id = event.aggregate_id
+        actual_event.position = event.position
+    return actual_event
+
+
+class ProjectionRunner:
+    """
+    Keep a projection of the events of all the aggregates up to date.
+    Batches of the global log are applied to the projection, events without a handler
+    are skipped, and the position is checkpointed every `checkpoint_every` events,
+    so a restarted runner resumes where it stopped.
+    The projection itself is not persisted and the events after the last checkpoint
+    are applied again on restart, so handlers have to write their results idempotently.
+
+        runner = ProjectionRunner(store, OrdersByCustomer("orders"), checkpoints)
+        runner.run(stop)  # until stop.set() is called from another thread
+    """
+
+    def __init__(
+        self,
+        store: EventStore,
+        projection: Projection,
+        checkpoints: Optional[CheckpointStore] = None,
+        name: Optional[str] = None,
+        batch_size: int = 1000,
+        checkpoint_every: int = 1000,
+        poll_interval: float = 1.0,
+    ):
+        """
+        checkpoints: where the position is kept, in memory by default
+        name: name of the checkpoint, the projection_name() of the projection by default
+        batch_size: number of events read from the store at a time
+        checkpoint_every: number of events between the checkpoints
+        poll_interval: seconds run waits for new events once it has caught up
+        """
+        self.store = store
+        self.projection = projection
+        self.checkpoints = checkpoints or InMemoryCheckpointStore()
+        self.name = name or type(projection).projection_name()
+        self.batch_size = batch_size
+        self.checkpoint_every = checkpoint_every
+        self.poll_interval = poll_interval
+        self.position = self.checkpoints.load(self.name)
+        self.checkpoint = self.position
+        self.events_processed = 0
+        self.seconds = 0.0
+
+    @property
+    def events_per_second(self) -> Optional[float]:
+        """Throughput of the handlers, None before the first event"""
+        return self.events_processed / self.seconds if self.seconds else None
+
+    def lag(self) -> int:
+        """Number of stored events the projection has not processed yet"""
+        return self.store.get_last_position() - self.position
+
+    def run_once(self) -> int:
+        """Apply the events stored after the position and checkpoint, return their number"""
+        processed = 0
+        for batch in self.store.read_all(self.position, self.batch_size):
+            self._apply_batch(batch)
+            processed += len(batch)
+        self.save_checkpoint()
+        return processed
+
+    def run(self, stop: Optional[StopFlag] = None) -> None:
+        """Follow the log until stop is set, polling every poll_interval seconds"""
+        stop = stop or StopFlag()
+        while not stop.is_set():
+            self.run_once()
+            stop.wait(self.poll_interval)
+
+    def save_checkpoint(self) -> None:
+        if self.position != self.checkpoint:
+            self.checkpoints.save(self.name, self.position)
+            self.checkpoint = self.position
+
+    def _apply_batch(self, batch: list[Event]) -> None:
+        start = perf_counter()
+        events = [upcast_logged_event(event) for event in batch]
+        invokers = batch_invokers(type(self.projection), events)
+        for event in events:
+            if invoker := invokers[type(event)]:
+                invoker(self.projection, event)
+        self.seconds += perf_counter() - start
+        self.events_processed += len(batch)
+        self.position = batch[-1].position
+        if self.position - self.checkpoint >= self.checkpoint_every:
+            self.save_checkpoint()
+
+
+def partition(aggregate_ids: Iterable[Any], partitions: int) -> list[list[Any]]:
+    """
+    Split the aggregate ids by a hash stable across the processes,
+    so an aggregate always falls in the same partition
+    """
+    parts: list[list[Any]] = [[] for _ in range(partitions)]
+    for aggregate_id in aggregate_ids:
+        parts[crc32(str(aggregate_id).encode()) % partitions].append(aggregate_id)
+    return parts
+
+
+def chunks(aggregate_ids: list[Any], size: int) -> Iterable[list[Any]]:
+    for start in range(0, len(aggregate_ids), size):
+        yield aggregate_ids[start : start + size]
+
+
+# store of each factory in the worker process, so the connections are reused between partitions
+_worker_stores: dict[Callable[[], EventStore], EventStore] = {}
+
+
+def _rebuild_partition(
+    store_factory: Callable[[], EventStore],
+    projection_class: Type[Projection],
+    aggregate_ids: list[Any],
+    chunk_size: int,
+    write: Optional[Callable[[dict[Any, Projection]], None]],
+) -> tuple[int, Optional[dict[Any, Projection]]]:
+    if store_factory not in _worker_stores:
+        _worker_stores[store_factory] = store_factory()
+    store = _worker_stores[store_factory]
+    rebuilt: dict[Any, Projection] = {}
+    for chunk in chunks(aggregate_ids, chunk_size):
+        projections = store.load_projections_many(chunk, projection_class)
+        if write is None:
+            rebuilt.update(projections)
+        else:
+            write(projections)
+    return len(aggregate_ids), rebuilt if write is None else None
+
+
+class ProjectionRebuild:
+    """
+    Rebuild a projection for many aggregates in worker processes.
+    Aggregate ids are partitioned by hash, each partition is one task of the executor
+    replaying it in chunks of `chunk_size` aggregates with load_projections_many
+    and handing them to `write`.
+
+        rebuild = ProjectionRebuild(make_store, CustomProjection, write=save_rows, workers=8)
+        rebuild.run()
+    """
+
+    def __init__(
+        self,
+        store_factory: Callable[[], EventStore],
+        projection_class: Type[Projection],
+        write: Optional[Callable[[dict[Any, Projection]], None]] = None,
+        workers: Optional[int] = None,
+        chunk_size: int = 100,
+        progress: Optional[Callable[[int, int], None]] = None,
+        executor: Optional[Executor] = None,
+    ):
+        """
+        store_factory: picklable callable creating the store in each worker process
+        write: picklable callable saving a chunk of rebuilt projections, called in the workers.
+            None to send the projections back, they are collected in `projections`
+        workers: number of partitions and processes, the number of CPUs by default
+        progress: called with the number of rebuilt aggregates and their total after each partition
+        executor: executor running the partitions instead of a new ProcessPoolExecutor
+        """
+        self.store_factory = store_factory
+        self.projection_class = projection_class
+        self.write = write
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.progress = progress
+        self.executor = executor
+        self.done = 0
+        self.total = 0
+        self.projections: dict[Any, Projection] = {}
+
+    def run(self, aggregate_ids: Optional[Iterable[Any]] = None) -> int:
+        """Rebuild the projection of the aggregates, all the stored ones by default"""
+        if aggregate_ids is None:
+            aggregate_ids = self.store_factory().get_aggregate_ids()
+        parts = partition(aggregate_ids, self.workers)
+        self.done, self.total = 0, sum(len(part) for part in parts)
+
+        executor = self.executor or ProcessPoolExecutor(self.workers)
+        try:
+            futures = [
+                executor.submit(
+                    _rebuild_partition,
+                    self.store_factory,
+                    self.projection_class,
+                    part,
+                    self.chunk_size,
+                    self.write,
+                )
+                for part in parts
+                if part
+            ]
+            for future in as_completed(futures):
+                rebuilt, projections = future.result()
+                if projections is not None:
+                    self.projections.update(projections)
+                self.done += rebuilt
+                if self.progress:
+                    self.progress(self.done, self.total)
+        finally:
+            if self.executor is None:
+                executor.shutdown()
+        return self.done
@@ -0,0 +1,73 @@
+import inspect
+from copy import deepcopy
+from operator import attrgetter
+from typing import Any, KeysView, Optional
+
+
+class SnapshotSchema:
+    """
+    Attributes snapshots are built from, computed once per aggregate class.
+    Set __snapshot_fields__ on the class to declare them, otherwise they are the public
+    attributes of the first snapshotted instance, computed again only when
+    an instance has other attributes.
+    """
+
+    _schemas: dict[type, "SnapshotSchema"] = {}
+
+    def __init__(self, fields: tuple[str, ...], keys: Optional[frozenset[str]] = None):
+        """
+        fields: names of the attributes
+        keys: names of the entries of the instance __dict__ the fields were taken from,
+            None for declared fields
+        """
+        self.fields = fields
+        self.keys = keys
+        self._getter = attrgetter(*fields) if keys is None and fields else None
+
+    def matches(self, attributes: KeysView) -> bool:
+        """Whether the schema was computed from an instance with these attributes"""
+        return self.keys is None or attributes == self.keys
+
+    @classmethod
+    def of(cls, aggregate: Any) -> "SnapshotSchema":
+        schema = cls._schemas.get(type(aggregate))
+        if schema is None or not schema.matches(aggregate.__dict__.keys()):
+            schema = cls._schemas[type(aggregate)] = cls._build(aggregate)
+        return schema
+
+    @classmethod
+    def attributes_of(cls, aggregate: Any) -> dict[str, Any]:
+        """Snapshot data of the aggregate, a copy sharing no object with it"""
+        return deepcopy(cls.of(aggregate).attributes(aggregate))
+
+    @staticmethod
+    def restore(aggregate: Any, data: dict[str, Any]) -> None:
+        """
+        Set the attributes of the aggregate from a copy of the snapshot data,
+        through the setters of the properties, read-only properties are computed again
+        """
+        aggregate_class = type(aggregate)
+        for name, value in deepcopy(data).items():
+            attribute = getattr(aggregate_class, name, None)
+            if isinstance(attribute, property) and attribute.fset is None:
+                continue
+            setattr(aggregate, name, value)
+
+    @classmethod
+    def _build(cls, aggregate: Any) -> "SnapshotSchema":
+        declared = getattr(type(aggregate), "__snapshot_fields__", None)
+        if declared is not None:
+            return cls(tuple(declared))
+        fields = tuple(
+            k
+            for k in aggregate.__dict__
+            if not k.startswith("_") and not inspect.ismethod(getattr(aggregate, k))
+        )
+        return cls(fields, frozenset(aggregate.__dict__))
+
+    def attributes(self, aggregate: Any) -> dict[str, Any]:
+        if self._getter is not None:
+            values = self._getter(aggregate)
+            return dict(zip(self.fields, values if len(self.fields) > 1 else (values,)))
+        attributes = aggregate.__dict__
+        return {k: attributes[k] for k in self.fields}
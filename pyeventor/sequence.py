@@ -0,0 +1,54 @@
+from abc import ABC, abstractmethod
+from datetime import datetime
+from threading import Lock
+from time import time_ns
+from typing import Any
+
+
+class SequenceStrategy(ABC):
+    """Generates the sequence_order of the new events of a class, set with Event.sequence"""
+
+    @abstractmethod
+    def generate(self) -> Any:
+        """sequence_order of a new event, None when it's assigned on save"""
+        ...
+
+
+class Timestamp(SequenceStrategy):
+    """Local time of the event creation, the default one"""
+
+    def generate(self) -> datetime:
+        return datetime.now()
+
+
+class HybridLogicalClock(SequenceStrategy):
+    """
+    64-bit integers: milliseconds since the epoch in the high bits and a counter in the 16 low bits.
+    The clock is shared by the whole process, it never goes back even if the system clock does,
+    and never returns the same value twice.
+    """
+
+    # last value given in the process, shared by all the instances
+    _last = [0]
+    _lock = Lock()
+
+    def generate(self) -> int:
+        physical = (time_ns() // 1_000_000) << 16
+        with self._lock:
+            last = self._last[0] + 1
+            self._last[0] = last = physical if physical > last else last
+            return last
+
+
+class StreamVersion(SequenceStrategy):
+    """The version of the event in the aggregate stream, assigned on save"""
+
+    def generate(self) -> None:
+        return None
+
+
+class StorePosition(SequenceStrategy):
+    """Position of the event in the log of the whole store, assigned by the store on save"""
+
+    def generate(self) -> None:
+        return None
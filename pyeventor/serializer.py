@@ -0,0 +1,69 @@
+import json
+import pickle
+from abc import ABC, abstractmethod
+from typing import Any
+
+
+class Serializer(ABC):
+    """Turns snapshot (or event) data into bytes and back"""
+
+    @abstractmethod
+    def dumps(self, data: Any) -> bytes:
+        ...
+
+    @abstractmethod
+    def loads(self, raw: bytes) -> Any:
+        ...
+
+
+class JsonSerializer(Serializer):
+    def dumps(self, data: Any) -> bytes:
+        return json.dumps(data, separators=(",", ":"), default=str).encode()
+
+    def loads(self, raw: bytes) -> Any:
+        return json.loads(raw)
+
+
+class OrjsonSerializer(Serializer):
+    """JSON encoded with orjson, faster than the json module, requires the orjson package"""
+
+    def __init__(self):
+        import orjson
+
+        self._dumps = orjson.dumps
+        self._loads = orjson.loads
+
+    def dumps(self, data: Any) -> bytes:
+        return self._dumps(data)
+
+    def loads(self, raw: bytes) -> Any:
+        return self._loads(raw)
+
+
+class PickleSerializer(Serializer):
+    """Fastest for python objects, only for data written and read by trusted code"""
+
+    def __init__(self, protocol: int = 5):
+        self.protocol = protocol
+
+    def dumps(self, data: Any) -> bytes:
+        return pickle.dumps(data, protocol=self.protocol)
+
+    def loads(self, raw: bytes) -> Any:
+        return pickle.loads(raw)
+
+
+class MsgpackSerializer(Serializer):
+    """Compact binary encoding, requires the msgpack package"""
+
+    def __init__(self):
+        import msgpack
+
+        self._packb = msgpack.packb
+        self._unpackb = msgpack.unpackb
+
+    def dumps(self, data: Any) -> bytes:
+        return self._packb(data)
+
+    def loads(self, raw: bytes) -> Any:
+        return self._unpackb(raw)
@@ -0,0 +1,77 @@
+from abc import ABC, abstractmethod
+from time import time
+from typing import Any
+
+
+class SnapshotPolicy(ABC):
+    """Decides after each applied event whether the aggregate takes snapshots"""
+
+    @abstractmethod
+    def should_snapshot(self, aggregate: Any) -> bool:
+        ...
+
+
+class EveryNVersions(SnapshotPolicy):
+    """Snapshot each time the stream version reaches a multiple of n"""
+
+    def __init__(self, n: int):
+        self.n = n
+
+    def should_snapshot(self, aggregate: Any) -> bool:
+        return (
+            aggregate.pending_version // self.n > aggregate.snapshot_version // self.n
+        )
+
+
+class TailLength(SnapshotPolicy):
+    """Snapshot when k events were stored after the last snapshot"""
+
+    def __init__(self, k: int):
+        self.k = k
+
+    def should_snapshot(self, aggregate: Any) -> bool:
+        return aggregate.events_since_snapshot >= self.k
+
+
+class ReplayTime(SnapshotPolicy):
+    """
+    Snapshot when replaying the events after the last snapshot would take longer than max_seconds.
+    The time per event is measured by the store when the aggregate is loaded,
+    aggregates which were not loaded yet are not snapshotted by this policy.
+    """
+
+    def __init__(self, max_seconds: float):
+        self.max_seconds = max_seconds
+
+    def should_snapshot(self, aggregate: Any) -> bool:
+        cost = aggregate.replay_seconds_per_event
+        return (
+            cost is not None
+            and aggregate.events_since_snapshot * cost > self.max_seconds
+        )
+
+
+class TimeInterval(SnapshotPolicy):
+    """
+    Snapshot when the last snapshot is older than seconds.
+    Aggregates without snapshots count from the time they were created or loaded.
+    """
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+
+    def should_snapshot(self, aggregate: Any) -> bool:
+        return (
+            aggregate.events_since_snapshot > 0
+            and time() - aggregate.snapshot_time >= self.seconds
+        )
+
+
+class AnyOf(SnapshotPolicy):
+    """Snapshot when any of the policies says so"""
+
+    def __init__(self, *policies: SnapshotPolicy):
+        self.policies = policies
+
+    def should_snapshot(self, aggregate: Any) -> bool:
+        return any(policy.should_snapshot(aggregate) for policy in self.policies)
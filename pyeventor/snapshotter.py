@@ -0,0 +1,89 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import BoundedSemaphore, Lock
+from typing import Any, Generic, Optional
+
+from pyeventor.aggregate import IdTypeHint
+from pyeventor.event_store import AggregateHint, EventStore
+
+
+class BackgroundSnapshotter(Generic[AggregateHint]):
+    """
+    Take snapshots off the command path. Aggregates saved with at least `threshold` events
+    after their last snapshot are rebuilt from the store and snapshotted by worker threads.
+
+        store.snapshotter = BackgroundSnapshotter(store, threshold=100)
+    """
+
+    def __init__(
+        self,
+        store: EventStore[Any, Any, AggregateHint],
+        threshold: int = 100,
+        workers: int = 1,
+        max_pending: int = 1000,
+        timeout: Optional[float] = None,
+    ):
+        """
+        threshold: number of events after the last snapshot to queue the aggregate
+        workers: number of threads taking the snapshots
+        max_pending: number of queued aggregates, submit blocks while the queue is full
+        timeout: seconds submit waits for a place in the queue before dropping the aggregate,
+            None to wait as long as needed
+        """
+        self.store = store
+        self.threshold = threshold
+        self.timeout = timeout
+        self.snapshots_taken = 0
+        self.dropped = 0
+        self.errors = 0
+        self.last_error: Optional[Exception] = None
+        self._executor = ThreadPoolExecutor(
+            workers, thread_name_prefix="pyeventor-snapshotter"
+        )
+        self._slots = BoundedSemaphore(max_pending)
+        self._pending: set = set()
+        self._lock = Lock()
+
+    def notify(self, aggregate: AggregateHint) -> bool:
+        """Queue the saved aggregate if its tail reached the threshold"""
+        if aggregate.events_since_snapshot < self.threshold:
+            return False
+        return self.submit(aggregate.id)
+
+    def submit(self, aggregate_id: IdTypeHint) -> bool:
+        """Queue the aggregate, return False if it is already queued or was dropped"""
+        with self._lock:
+            if aggregate_id in self._pending:
+                return False
+            self._pending.add(aggregate_id)
+        if not self._slots.acquire(timeout=self.timeout):
+            with self._lock:
+                self._pending.discard(aggregate_id)
+                self.dropped += 1
+            return False
+        self._executor.submit(self._snapshot, aggregate_id)
+        return True
+
+    def _snapshot(self, aggregate_id: IdTypeHint) -> None:
+        try:
+            # events saved from now on queue the aggregate again
+            with self._lock:
+                self._pending.discard(aggregate_id)
+            if self.store.take_snapshot(aggregate_id):
+                with self._lock:
+                    self.snapshots_taken += 1
+        except Exception as e:
+            with self._lock:
+                self.errors += 1
+                self.last_error = e
+        finally:
+            self._slots.release()
+
+    def close(self, wait: bool = True) -> None:
+        """Stop the workers, by default after the queued snapshots are taken"""
+        self._executor.shutdown(wait=wait)
+
+    def __enter__(self) -> "BackgroundSnapshotter[AggregateHint]":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
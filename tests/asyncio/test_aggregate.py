@@ -1,6 +1,7 @@
 from pyeventor.asyncio.aggregate import AsyncAggregate, AsyncProjection
 from pyeventor.event import Event, JsonSnapshot
 from pyeventor.exceptions import HandlerException
+from pyeventor.handler import EventHandler
 
 
 import pytest
@@ -10,6 +11,12 @@ from unittest.mock import patch
 
 @pytest.mark.asyncio
 class TestAsyncAggregate:
+    @pytest.fixture(autouse=True)
+    def clear_dispatch_cache(self):
+        EventHandler.__dispatch_cache__.clear()
+        yield
+        EventHandler.__dispatch_cache__.clear()
+
     @pytest.fixture
     def aggregate_id(self):
         return str(uuid4())
@@ -54,6 +61,12 @@ class TestAsyncAggregate:
 
 @pytest.mark.asyncio
 class TestProjection:
+    @pytest.fixture(autouse=True)
+    def clear_dispatch_cache(self):
+        EventHandler.__dispatch_cache__.clear()
+        yield
+        EventHandler.__dispatch_cache__.clear()
+
     @pytest.fixture
     def projection_id(self):
         return str(uuid4())
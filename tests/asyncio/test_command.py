@@ -0,0 +1,45 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from pyeventor.asyncio.aggregate import AsyncAggregate
+from pyeventor.asyncio.command import AsyncCommandExecutor
+from pyeventor.command import RetryPolicy
+from pyeventor.exceptions import ConcurrencyException
+
+
+@pytest.mark.asyncio
+class TestAsyncCommandExecutor:
+    @pytest.fixture
+    def store(self):
+        store = MagicMock()
+        store.load = AsyncMock(return_value=AsyncAggregate("test_id"))
+        store.save = AsyncMock()
+        store.refresh = AsyncMock()
+        return store
+
+    async def test_execute(self, store):
+        executor = AsyncCommandExecutor(store, RetryPolicy(backoff=0))
+        command = AsyncMock()
+        aggregate = await executor.execute("test_id", command)
+        command.assert_awaited_once_with(aggregate)
+        store.save.assert_awaited_once_with(aggregate)
+        store.refresh.assert_not_awaited()
+
+    async def test_execute_retries_on_conflict(self, store):
+        executor = AsyncCommandExecutor(store, RetryPolicy(backoff=0))
+        store.save.side_effect = [ConcurrencyException(), None]
+        command = AsyncMock()
+        await executor.execute("test_id", command)
+        store.load.assert_awaited_once()
+        store.refresh.assert_awaited_once_with(store.load.return_value)
+        assert command.await_count == 2
+        assert executor.conflicts == 1
+        assert executor.retries == 1
+
+    async def test_execute_gives_up_after_max_retries(self, store):
+        executor = AsyncCommandExecutor(store, RetryPolicy(max_retries=1, backoff=0))
+        store.save.side_effect = ConcurrencyException()
+        with pytest.raises(ConcurrencyException):
+            await executor.execute("test_id", AsyncMock())
+        assert executor.conflicts == 2
+        assert executor.retries == 1
@@ -1,5 +1,5 @@
 import pytest
-from unittest.mock import patch
+from unittest.mock import patch, AsyncMock
 
 # Assuming these imports are from your project's modules
 from pyeventor.event import Event, Snapshot
@@ -78,16 +78,65 @@ class TestEventStore:
         with patch.object(
             event_store, "get_last_snapshot"
         ) as mock_get_last_snapshot, patch.object(
-            event_store, "get_events"
-        ) as mock_get_events, patch.object(
+            event_store, "aiter_events"
+        ) as mock_iter_events, patch.object(
             MockAggregate, "from_snapshot"
         ) as mock_from_snapshot:
             mock_get_last_snapshot.return_value = MockSnapshot()
             await event_store.load("test_id")
             mock_get_last_snapshot.assert_called_once()
-            mock_get_events.assert_called_once()
+            mock_iter_events.assert_called_once()
             mock_from_snapshot.assert_called_once()
 
+    @patch.multiple(ConcreteEventStore, __abstractmethods__=set())
+    async def test_load_applies_events_after_snapshot(self):
+        """Test that events stored after the snapshot are replayed on top of it."""
+        event_store = ConcreteEventStore()
+        snapshot = MockSnapshot(data={}, sequence_order=1, version=1)
+        tail = [
+            MockEvent(sequence_order=2, version=2),
+            MockEvent(sequence_order=3, version=3),
+        ]
+
+        async def aiter_events(*args, **kwargs):
+            for event in tail:
+                yield event
+
+        with patch.object(
+            event_store, "get_last_snapshot", return_value=snapshot
+        ), patch.object(
+            event_store, "aiter_events", side_effect=aiter_events
+        ) as mock_iter_events, patch.object(
+            MockAggregate, "_apply_without_saving"
+        ) as mock_apply:
+            aggregate = await event_store.load("test_id")
+            mock_iter_events.assert_called_once_with("test_id", lte=None, gt=1)
+            assert [c.args[0] for c in mock_apply.call_args_list] == tail
+        assert aggregate.version == 3
+        assert aggregate.last_sequence_order == 3
+
+    @patch.multiple(ConcreteEventStore, __abstractmethods__=set())
+    async def test_refresh_selects_events_by_version(self):
+        """Test that refresh applies newer versions even with an older sequence_order."""
+        event_store = ConcreteEventStore()
+        aggregate = MockAggregate("test_id")
+        stored = [
+            MockEvent(sequence_order=1, version=1),
+            MockEvent(sequence_order=0, version=2),
+        ]
+        aggregate._mark_stored(stored[0])
+
+        async def aiter_events(*args, **kwargs):
+            for event in stored:
+                yield event
+
+        with patch.object(
+            event_store, "aiter_events", side_effect=aiter_events
+        ), patch.object(MockAggregate, "_apply_without_saving") as mock_apply:
+            await event_store.refresh(aggregate)
+            assert [c.args[0] for c in mock_apply.call_args_list] == stored[1:]
+        assert aggregate.version == 2
+
     @patch.multiple(ConcreteEventStore, __abstractmethods__=set())
     async def test_load_projection(self, mock_projection):
         event_store = ConcreteEventStore()
@@ -103,3 +152,78 @@ class TestEventStore:
             mock_get_last_snapshot.assert_called_once()
             mock_get_events.assert_called_once()
             mock_from_snapshot.assert_called_once()
+
+    @patch.multiple(ConcreteEventStore, __abstractmethods__=set())
+    async def test_save_many(self):
+        event_store = ConcreteEventStore()
+        first, second = MockAggregate("first"), MockAggregate("second")
+        first._pending_events = [MockEvent(), MockSnapshot()]
+        second._pending_events = [MockEvent(), MockEvent()]
+        with patch.object(event_store, "save_events") as mock_save_events, patch.object(
+            event_store, "save_snapshots"
+        ) as mock_save_snapshots:
+            await event_store.save_many([first, second])
+            assert mock_save_events.call_count == 2
+            mock_save_snapshots.assert_called_once()
+            assert not first.uncommmited_events
+            assert not second.uncommmited_events
+
+    @patch.multiple(ConcreteEventStore, __abstractmethods__=set())
+    async def test_unit_of_work(self, mock_aggregate):
+        event_store = ConcreteEventStore()
+        with patch.object(event_store, "save_many", AsyncMock()) as mock_save_many:
+            async with event_store.unit_of_work() as uow:
+                uow.add(mock_aggregate)
+                uow.add(mock_aggregate)
+            mock_save_many.assert_called_once_with([mock_aggregate])
+
+    @patch.multiple(ConcreteEventStore, __abstractmethods__=set())
+    async def test_load_many(self):
+        event_store = ConcreteEventStore()
+        snapshot = MockSnapshot()
+        with patch.object(
+            event_store, "get_last_snapshot", side_effect=[snapshot, None]
+        ) as mock_get_last_snapshot, patch.object(
+            event_store, "get_events", return_value=[]
+        ) as mock_get_events, patch.object(
+            MockAggregate, "from_snapshot"
+        ) as mock_from_snapshot:
+            aggregates = await event_store.load_many(["first", "second"])
+            assert mock_get_last_snapshot.call_count == 2
+            mock_from_snapshot.assert_called_once_with("first", snapshot)
+            mock_get_events.assert_any_call(
+                "first", [], gt=snapshot.sequence_order, lte=None
+            )
+            mock_get_events.assert_any_call("second", [], gt=None, lte=None)
+            assert aggregates["first"] == mock_from_snapshot.return_value
+            assert aggregates["second"].id == "second"
+
+    @patch.multiple(ConcreteEventStore, __abstractmethods__=set())
+    async def test_read_all_batches(self):
+        event_store = ConcreteEventStore()
+        log = [MockEvent() for _ in range(5)]
+        for position, event in enumerate(log, start=1):
+            event.position = position
+
+        async def get_all_events(after_position, limit):
+            return log[after_position : after_position + limit]
+
+        with patch.object(event_store, "get_all_events", side_effect=get_all_events):
+            batches = [batch async for batch in event_store.read_all(1, 2)]
+        assert batches == [log[1:3], log[3:5]]
+
+    @patch.multiple(ConcreteEventStore, __abstractmethods__=set())
+    async def test_subscribe_polls_after_catch_up(self):
+        event_store = ConcreteEventStore()
+        first, second = MockEvent(), MockEvent()
+        first.position, second.position = 1, 2
+        with patch.object(
+            event_store, "get_all_events", side_effect=[[first], [second]]
+        ) as mock_get_all_events, patch(
+            "pyeventor.asyncio.event_store.asyncio.sleep", AsyncMock()
+        ) as mock_sleep:
+            subscription = event_store.subscribe(batch_size=10, poll_interval=5)
+            assert await subscription.__anext__() == [first]
+            assert await subscription.__anext__() == [second]
+            mock_sleep.assert_awaited_once_with(5)
+            assert mock_get_all_events.call_args_list[-1].args == (1, 10)
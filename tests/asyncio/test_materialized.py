@@ -0,0 +1,104 @@
+import pytest
+from contextvars import ContextVar
+from unittest.mock import AsyncMock, MagicMock
+
+from pyeventor.event import Event
+from pyeventor.asyncio.aggregate import AsyncProjection
+from pyeventor.asyncio.materialized import (
+    AsyncMaterializer,
+    AsyncInMemoryProjectionStateStore,
+)
+from pyeventor.decorator import register_handler
+from pyeventor.materialized import EVENTUAL
+
+current_session: ContextVar = ContextVar("current_session", default=None)
+
+
+class Deposited(Event[int, int]):
+    __type_name__ = "async_materialized.Deposited"
+
+
+class Renamed(Event[int, str]):
+    __type_name__ = "async_materialized.Renamed"
+
+
+class Balance(AsyncProjection):
+    def _init_empty_attributes(self):
+        self.balance = 0
+
+    @register_handler(Deposited)
+    async def deposited(self, event: Deposited):
+        self.balance += event.data
+
+
+class MovedBalance(Balance):
+    __projection_name__ = "Balance"
+
+
+class SessionStateStore(AsyncInMemoryProjectionStateStore):
+    """Records the session seen by each update"""
+
+    def __init__(self):
+        super().__init__()
+        self.sessions = []
+
+    async def get_many(self, projection_class, aggregate_ids):
+        self.sessions.append(current_session.get())
+        return await super().get_many(projection_class, aggregate_ids)
+
+
+def saved(*events):
+    for version, event in enumerate(events, start=1):
+        event.version = version
+    return list(events)
+
+
+@pytest.fixture
+def store():
+    store = MagicMock()
+    store.load_projections_many = AsyncMock(
+        side_effect=lambda ids, cls: {id: cls(id) for id in ids}
+    )
+    return store
+
+
+@pytest.mark.asyncio
+class TestAsyncMaterializer:
+    async def test_inline(self, store):
+        state_store = AsyncInMemoryProjectionStateStore()
+        materializer = AsyncMaterializer(state_store, [Balance])
+        events = saved(Deposited(10), Renamed("x"), Deposited(5))
+        await materializer.on_save(store, {"a": events[:2]})
+        await materializer.on_save(store, {"a": events[2:]})
+        await materializer.on_commit(store, {"a": events[2:]})
+        state = await state_store.get(Balance, "a")
+        assert (state.balance, state.version) == (15, 3)
+        store.load_projections_many.assert_awaited_once_with(["a"], Balance)
+
+    async def test_eventual(self, store):
+        state_store = AsyncInMemoryProjectionStateStore()
+        events = saved(Deposited(10), Deposited(5))
+        async with AsyncMaterializer(state_store, [Balance], EVENTUAL) as materializer:
+            await materializer.on_save(store, {"a": events})
+            assert await state_store.get(Balance, "a") is None
+            await materializer.on_commit(store, {"a": events})
+        assert (await state_store.get(Balance, "a")).balance == 15
+        assert materializer.errors == 0
+
+    async def test_worker_doesnt_inherit_context(self, store):
+        """Test that the eventual worker doesn't see the context of the save starting it."""
+        state_store = SessionStateStore()
+        events = saved(Deposited(10))
+        async with AsyncMaterializer(state_store, [Balance], EVENTUAL) as materializer:
+            token = current_session.set("transaction session")
+            await materializer.on_commit(store, {"a": events})
+            current_session.reset(token)
+        assert state_store.sessions == [None]
+
+    async def test_states_keyed_on_projection_name(self, store):
+        """Test that a projection setting __projection_name__ reads the states stored under it."""
+        state_store = AsyncInMemoryProjectionStateStore()
+        materializer = AsyncMaterializer(state_store, [Balance])
+        await materializer.on_save(store, {"a": saved(Deposited(10))})
+        assert list(state_store.states) == [("Balance", "a")]
+        assert (await state_store.get(MovedBalance, "a")).balance == 10
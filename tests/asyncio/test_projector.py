@@ -0,0 +1,138 @@
+import pytest
+import asyncio
+from unittest.mock import patch
+
+from pyeventor.event import Event
+from pyeventor.asyncio.aggregate import AsyncAggregate, AsyncProjection
+from pyeventor.asyncio.event_store import AsyncEventStore
+from pyeventor.asyncio.projector import (
+    AsyncProjectionRunner,
+    AsyncInMemoryCheckpointStore,
+    AsyncProjectionRebuild,
+)
+from pyeventor.decorator import register_handler
+
+
+class Deposited(Event[int, int]):
+    __type_name__ = "async_projector.Deposited"
+
+
+class Renamed(Event[int, str]):
+    __type_name__ = "async_projector.Renamed"
+
+
+class DepositedInCents(Event[int, int]):
+    """Previous version of Deposited"""
+
+    __type_name__ = "async_projector.DepositedInCents"
+
+    def upcast(self):
+        return Deposited(self.data // 100, self.sequence_order, self.version)
+
+
+class Account(AsyncAggregate):
+    @register_handler(Deposited, Renamed)
+    async def handle(self, event: Event):
+        pass
+
+
+class TotalDeposits(AsyncProjection):
+    def _init_empty_attributes(self):
+        self.total = 0
+
+    @register_handler(Deposited)
+    async def deposited(self, event: Deposited):
+        self.total += event.data
+
+
+class LogStore(AsyncEventStore):
+    """Only the global log of the store"""
+
+    _AggregatedClass = Account
+
+    def __init__(self, events):
+        self.log = events
+        for position, event in enumerate(events, start=1):
+            event.position = position
+
+    async def get_all_events(self, after_position=0, limit=1000):
+        return self.log[after_position : after_position + limit]
+
+    async def get_last_position(self):
+        return len(self.log)
+
+
+@pytest.fixture
+def store():
+    with patch.multiple(LogStore, __abstractmethods__=set()):
+        yield LogStore([Deposited(10), Renamed("x"), Deposited(5)])
+
+
+@pytest.mark.asyncio
+class TestAsyncProjectionRunner:
+    async def test_run_once(self, store):
+        runner = AsyncProjectionRunner(store, TotalDeposits("total"), batch_size=2)
+        assert await runner.lag() == 3
+        assert await runner.run_once() == 3
+        assert runner.projection.total == 15
+        assert await runner.lag() == 0
+        assert runner.events_processed == 3
+
+    async def test_run_once_upcasts_events(self, store):
+        """Test that stored events of a previous version reach the handlers upcasted."""
+        store.log.append(DepositedInCents(300))
+        store.log[-1].position = 4
+        runner = AsyncProjectionRunner(store, TotalDeposits("total"))
+        assert await runner.run_once() == 4
+        assert runner.projection.total == 18
+        assert runner.position == 4
+
+    async def test_resumes_from_checkpoint(self, store):
+        checkpoints = AsyncInMemoryCheckpointStore()
+        await checkpoints.save("deposits", 2)
+        runner = AsyncProjectionRunner(
+            store, TotalDeposits("total"), checkpoints, name="deposits"
+        )
+        assert await runner.run_once() == 1
+        assert runner.projection.total == 5
+        assert await checkpoints.load("deposits") == 3
+
+    async def test_run_until_stopped(self, store):
+        runner = AsyncProjectionRunner(store, TotalDeposits("total"), poll_interval=10)
+        task = asyncio.create_task(runner.run())
+        await asyncio.sleep(0)
+        runner.stop()
+        await asyncio.wait_for(task, 1)
+        assert runner.projection.total == 15
+
+
+@pytest.mark.asyncio
+class TestAsyncProjectionRebuild:
+    async def test_rebuild(self):
+        async def load_projections_many(aggregate_ids, projection_class):
+            await asyncio.sleep(0)
+            return {id: projection_class(id) for id in aggregate_ids}
+
+        written, progress = {}, []
+
+        async def write(projections):
+            written.update(projections)
+
+        with patch.multiple(LogStore, __abstractmethods__=set()):
+            store = LogStore([])
+        ids = [f"account-{i}" for i in range(10)]
+        with patch.object(store, "get_aggregate_ids", return_value=ids), patch.object(
+            store, "load_projections_many", side_effect=load_projections_many
+        ) as mock_load:
+            rebuild = AsyncProjectionRebuild(
+                store,
+                TotalDeposits,
+                write=write,
+                workers=3,
+                chunk_size=2,
+                progress=lambda done, total: progress.append((done, total)),
+            )
+            assert await rebuild.run() == 10
+        assert sorted(written) == sorted(ids)
+        assert all(len(call.args[0]) <= 2 for call in mock_load.call_args_list)
+        assert progress[-1] == (10, 10)
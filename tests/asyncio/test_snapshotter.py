@@ -0,0 +1,69 @@
+import asyncio
+import pytest
+from contextvars import ContextVar
+from unittest.mock import AsyncMock, MagicMock
+
+from pyeventor.asyncio.snapshotter import AsyncBackgroundSnapshotter
+
+
+current_session: ContextVar = ContextVar("current_session", default=None)
+
+
+def mock_aggregate(aggregate_id, events_since_snapshot):
+    aggregate = MagicMock()
+    aggregate.id = aggregate_id
+    aggregate.events_since_snapshot = events_since_snapshot
+    return aggregate
+
+
+@pytest.mark.asyncio
+class TestAsyncBackgroundSnapshotter:
+    async def test_notify_threshold(self):
+        """Test that only aggregates with a tail reaching the threshold are snapshotted."""
+        store = MagicMock(take_snapshot=AsyncMock(return_value=True))
+        async with AsyncBackgroundSnapshotter(store, threshold=3) as snapshotter:
+            assert not await snapshotter.notify(mock_aggregate("a", 2))
+            assert await snapshotter.notify(mock_aggregate("b", 3))
+        store.take_snapshot.assert_awaited_once_with("b")
+        assert snapshotter.snapshots_taken == 1
+
+    async def test_workers_dont_inherit_context(self):
+        """Test that the workers don't see the context of the save starting them."""
+        sessions = []
+
+        async def take_snapshot(aggregate_id):
+            sessions.append(current_session.get())
+            return True
+
+        store = MagicMock(take_snapshot=AsyncMock(side_effect=take_snapshot))
+        async with AsyncBackgroundSnapshotter(store) as snapshotter:
+            token = current_session.set("transaction session")
+            await snapshotter.submit("a")
+            current_session.reset(token)
+        assert sessions == [None]
+
+    async def test_backpressure(self):
+        """Test that submit drops aggregates when the queue stays full."""
+        release = asyncio.Event()
+
+        async def take_snapshot(aggregate_id):
+            await release.wait()
+            return True
+
+        store = MagicMock(take_snapshot=AsyncMock(side_effect=take_snapshot))
+        snapshotter = AsyncBackgroundSnapshotter(store, max_pending=1, timeout=0.01)
+        assert await snapshotter.submit("a")
+        await asyncio.sleep(0)  # the worker takes "a" from the queue
+        assert await snapshotter.submit("b")
+        assert not await snapshotter.submit("c")
+        release.set()
+        await snapshotter.close()
+        assert (snapshotter.snapshots_taken, snapshotter.dropped) == (2, 1)
+
+    async def test_errors_are_counted(self):
+        store = MagicMock(take_snapshot=AsyncMock(side_effect=ValueError("failed")))
+        snapshotter = AsyncBackgroundSnapshotter(store)
+        await snapshotter.submit("a")
+        await snapshotter.close()
+        assert snapshotter.errors == 1
+        assert isinstance(snapshotter.last_error, ValueError)
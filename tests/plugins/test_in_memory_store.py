@@ -0,0 +1,167 @@
+import pytest
+from unittest.mock import patch
+
+from pyeventor.event import Event, JsonSnapshot
+from pyeventor.aggregate import Aggregate, Projection
+from pyeventor.plugins.in_memory_store import InMemoryEventStore
+from pyeventor.decorator import register_handler
+from pyeventor.exceptions import ConcurrencyException
+
+
+class EventA(Event[int, None]):
+    pass
+
+
+class EventB(Event[int, None]):
+    pass
+
+
+class DerivedEventA(EventA):
+    pass
+
+
+class OtherSnapshot(JsonSnapshot):
+    pass
+
+
+class MockAggregate(Aggregate):
+    @register_handler(EventA, EventB)
+    def handle(self, event: Event):
+        pass
+
+
+class MockInMemoryEventStore(InMemoryEventStore):
+    _AggregatedClass = MockAggregate
+
+
+class TestInMemoryEventStore:
+    @pytest.fixture
+    def store(self):
+        return MockInMemoryEventStore()
+
+    @pytest.fixture
+    def events(self, store):
+        events = [
+            EventA(sequence_order=1),
+            EventB(sequence_order=2),
+            DerivedEventA(sequence_order=3),
+            EventB(sequence_order=4),
+        ]
+        # saved out of order on purpose
+        store.save_events(events[2:], "test_id")
+        store.save_events(events[:2], "test_id")
+        return events
+
+    def test_get_events_sorted(self, store, events):
+        """Test that events are returned in sequence order regardless of save order."""
+        assert store.get_events("test_id") == events
+        assert store.get_events("unknown_id") == []
+
+    def test_get_events_range(self, store, events):
+        """Test gt and lte bounds of the events range."""
+        assert store.get_events("test_id", gt=1, lte=3) == events[1:3]
+        assert store.get_events("test_id", gt=4) == []
+        assert store.get_events("test_id", lte=2) == events[:2]
+
+    def test_get_events_by_type(self, store, events):
+        """Test that type filtering includes subclasses and keeps sequence order."""
+        assert store.get_events("test_id", [EventA]) == [events[0], events[2]]
+        assert store.get_events("test_id", [EventB], gt=2) == [events[3]]
+        assert store.get_events("test_id", [EventA, EventB], lte=3) == events[:3]
+
+    def test_get_last_snapshot(self, store):
+        """Test the latest snapshot of a type at or before load_at."""
+        snapshots = [
+            JsonSnapshot(sequence_order=1),
+            OtherSnapshot(sequence_order=2),
+            JsonSnapshot(sequence_order=3),
+        ]
+        store.save_snapshots(snapshots, "test_id")
+        assert store.get_last_snapshot("test_id") == snapshots[2]
+        assert store.get_last_snapshot("test_id", OtherSnapshot) == snapshots[1]
+        assert (
+            store.get_last_snapshot("test_id", JsonSnapshot, load_at=2) == snapshots[1]
+        )
+        assert store.get_last_snapshot("test_id", OtherSnapshot, load_at=1) is None
+        assert store.get_last_snapshot("unknown_id") is None
+
+    def test_save_assigns_versions(self, store):
+        """Test that saved events are numbered after the aggregate version."""
+        aggregate = MockAggregate("test_id")
+        aggregate.apply(EventA())
+        aggregate.apply(EventB())
+        store.save(aggregate)
+        assert aggregate.version == 2
+        assert [e.version for e in store.get_events("test_id")] == [1, 2]
+        assert store.load("test_id").version == 2
+
+    def test_save_concurrent_writers(self, store):
+        """Test that a save based on a stale version raises ConcurrencyException."""
+        store.save(MockAggregate("test_id").apply(EventA()))
+        first, second = store.load("test_id"), store.load("test_id")
+        first.apply(EventA())
+        store.save(first)
+        second.apply(EventB())
+        with pytest.raises(ConcurrencyException):
+            store.save(second)
+        assert len(store.get_events("test_id")) == 2
+        assert second.uncommmited_events
+
+    def test_iter_events_after_version(self, store, events):
+        """Test that only the events newer than the version are read, in version order."""
+        with patch.object(store, "iter_events") as mock_iter_events:
+            assert list(store.iter_events_after_version("test_id", 2)) == events[:2]
+            assert list(store.iter_events_after_version("test_id", 4)) == []
+            assert list(store.iter_events_after_version("unknown_id", 0)) == []
+        mock_iter_events.assert_not_called()
+
+    def test_read_all(self, store):
+        """Test that the events of all the aggregates are read back in save order."""
+        store.save_many(
+            [MockAggregate("a").apply(EventA()), MockAggregate("b").apply(EventB())]
+        )
+        store.save(store.load("a").apply(EventB()))
+        events = [event for batch in store.read_all() for event in batch]
+        assert [e.position for e in events] == [1, 2, 3]
+        assert [e.aggregate_id for e in events] == ["a", "b", "a"]
+        assert [type(e) for e in events] == [EventA, EventB, EventB]
+        assert list(store.read_all(from_position=1, batch_size=1)) == [
+            [events[1]],
+            [events[2]],
+        ]
+        assert list(store.read_all(from_position=3)) == []
+
+    def test_subscribe(self, store):
+        """Test that the subscription catches up, then picks up the new events."""
+        store.save(MockAggregate("a").apply(EventA()))
+        with patch("pyeventor.event_store.sleep") as mock_sleep:
+            mock_sleep.side_effect = lambda _: store.save(
+                MockAggregate("b").apply(EventB())
+            )
+            subscription = store.subscribe(poll_interval=0.5)
+            assert [e.aggregate_id for e in next(subscription)] == ["a"]
+            assert [e.aggregate_id for e in next(subscription)] == ["b"]
+            mock_sleep.assert_called_once_with(0.5)
+
+    def test_load_projection_subclass_events(self, store):
+        """Test that projections get the subclasses of their events and the handlers of their bases."""
+
+        class BaseProjection(Projection):
+            def _init_empty_attributes(self):
+                self.seen = []
+
+            @register_handler(EventA)
+            def handle_a(self, event: EventA):
+                self.seen.append(type(event))
+
+        class DerivedProjection(BaseProjection):
+            pass
+
+        store.save(
+            MockAggregate("test_id")
+            .apply(EventA())
+            .apply(EventB())
+            .apply(DerivedEventA())
+        )
+        projection = store.load_projection("test_id", DerivedProjection)
+        assert projection.seen == [EventA, DerivedEventA]
@@ -0,0 +1,379 @@
+import asyncio
+import os
+import re
+from datetime import datetime
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import MetaData, event, update
+
+from pyeventor.event import Event, JsonSnapshot
+from pyeventor.asyncio.command import AsyncCommandExecutor
+from pyeventor.asyncio.aggregate import AsyncAggregate
+from pyeventor.cache import AggregateCache
+from pyeventor.decorator import register_handler
+from pyeventor.exceptions import ConcurrencyException
+from pyeventor.plugins.postgres_store import (
+    MIGRATION_STATEMENTS,
+    PostgresAsyncCheckpointStore,
+    PostgresAsyncEventStore,
+    create_tables,
+)
+from pyeventor.serializer import PickleSerializer
+
+DATABASE_URL = os.environ.get("PYEVENTOR_TEST_DATABASE_URL")
+
+requires_database = pytest.mark.skipif(
+    not DATABASE_URL,
+    reason="set PYEVENTOR_TEST_DATABASE_URL=postgresql+asyncpg://... to run",
+)
+
+
+class Counted(Event[int, int]):
+    __type_name__ = "postgres_store.Counted"
+
+
+class Counter(AsyncAggregate):
+    def _init_empty_attributes(self):
+        self.value = 0
+
+    @register_handler(Counted)
+    async def counted(self, event: Counted):
+        self.value += event.data
+
+
+class PickleSnapshot(JsonSnapshot):
+    serializer = PickleSerializer()
+
+
+class PickledCounter(Counter):
+    SnapshotClass = PickleSnapshot
+
+
+metadata = MetaData()
+test_event_table, test_snapshot_table = create_tables(
+    metadata, prefix="pyeventor_test_"
+)
+
+
+class CounterStore(PostgresAsyncEventStore):
+    _AggregatedClass = Counter
+    event_table = test_event_table
+    snapshot_table = test_snapshot_table
+
+
+def count_statements(store, keyword):
+    """List appended with each statement executed by the store starting with keyword"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        if statement.lstrip().upper().startswith(keyword):
+            statements.append(statement)
+
+    event.listen(
+        store.engine.sync_engine, "before_cursor_execute", before_cursor_execute
+    )
+    return statements
+
+
+def test_migration_statements_use_table_names():
+    """Test that the migration targets the tables and indexes of create_tables."""
+    names = {"events": "custom_events", "snapshots": "custom_snapshots"}
+    statements = [statement.format(**names) for statement in MIGRATION_STATEMENTS]
+    tables = set()
+    for statement in statements:
+        tables.update(re.findall(r"\b(?:TABLE|UPDATE|FROM|ON) (\w+)", statement))
+    assert tables - {"information_schema"} == {
+        *names.values(),
+        "custom_events_position_seq",
+    }
+    indexes = {
+        index
+        for statement in statements
+        for index in re.findall(r"INDEX IF NOT EXISTS (\w+)", statement)
+    }
+    events, snapshots = create_tables(MetaData(), prefix="custom_")
+    # the indexes of the id columns were created with the tables
+    assert indexes == {index.name for index in events.indexes | snapshots.indexes} - {
+        "ix_custom_events_id",
+        "ix_custom_snapshots_id",
+    }
+
+
+@pytest_asyncio.fixture
+async def store():
+    store = CounterStore(DATABASE_URL)
+    async with store.engine.begin() as connection:
+        await connection.run_sync(metadata.drop_all)
+    await store.create_schema()
+    yield store
+    async with store.engine.begin() as connection:
+        await connection.run_sync(metadata.drop_all)
+    await store.engine.dispose()
+
+
+@requires_database
+@pytest.mark.asyncio
+async def test_save_and_load(store):
+    """Test that saved events get their version and position and are replayed."""
+    counter = Counter("a")
+    await counter.apply(Counted(1))
+    await counter.apply(Counted(2))
+    await store.save(counter)
+    loaded = await store.load("a")
+    assert (loaded.value, loaded.version) == (3, 2)
+    events = await store.get_all_events()
+    assert [(e.aggregate_id, e.version, e.position) for e in events] == [
+        ("a", 1, 1),
+        ("a", 2, 2),
+    ]
+
+
+@requires_database
+@pytest.mark.asyncio
+async def test_unversioned_events_follow_stored_version(store):
+    """Test that events saved without a version are numbered after the stored ones."""
+    await store.save_events([Counted(1), Counted(2)], "a")
+    await store.save_events([Counted(3)], "a")
+    events = await store.get_events("a")
+    assert [(e.version, e.position) for e in events] == [(1, 1), (2, 2), (3, 3)]
+
+
+@requires_database
+@pytest.mark.asyncio
+async def test_save_many_inserts_once_per_table(store):
+    """Test that the events and snapshots of a save are written with one INSERT each."""
+    inserts = count_statements(store, "INSERT")
+    counters = [Counter(aggregate_id, auto_snapshot_each_n=2) for aggregate_id in "abc"]
+    for counter in counters:
+        await counter.apply(Counted(1))
+        await counter.apply(Counted(2))
+    await store.save_many(counters)
+    assert [statement.split()[2] for statement in inserts] == [
+        test_event_table.name,
+        test_snapshot_table.name,
+    ]
+    loaded = await store.load_many(["a", "b", "c"])
+    assert {(c.value, c.version, c.snapshot_version) for c in loaded.values()} == {
+        (3, 2, 2)
+    }
+
+
+@requires_database
+@pytest.mark.asyncio
+async def test_save_with_copy_above_threshold(store):
+    """Test that the batches reaching copy_threshold are written with COPY."""
+    if "asyncpg" not in DATABASE_URL:
+        pytest.skip("COPY needs the asyncpg driver")
+    store.copy_threshold = 3
+    inserts = count_statements(store, "INSERT")
+    await store.save_events([Counted(1), Counted(2), Counted(3)], "a")
+    assert inserts == []
+    await store.save_events([Counted(4)], "a")
+    assert len(inserts) == 1
+    events = await store.get_events("a")
+    assert [(e.data, e.version, e.position) for e in events] == [
+        (1, 1, 1),
+        (2, 2, 2),
+        (3, 3, 3),
+        (4, 4, 4),
+    ]
+
+
+@requires_database
+@pytest.mark.asyncio
+async def test_nested_transactions_commit_once(store):
+    """Test that nested transactions reuse the session of the outer one and commit once."""
+    commits = []
+    event.listen(
+        store.engine.sync_engine, "commit", lambda connection: commits.append(1)
+    )
+    async with store.transaction() as outer:
+        async with store.transaction() as inner:
+            assert inner is outer
+        await store.save_events([Counted(1)], "a")
+        await store.save_events([Counted(2)], "b")
+        assert commits == []
+    assert commits == [1]
+    assert await store.get_last_position() == 2
+
+
+@requires_database
+@pytest.mark.asyncio
+async def test_after_commit_callbacks(store):
+    """Test that callbacks wait for the outer commit and are dropped on rollback."""
+    called = []
+
+    async def callback():
+        called.append(len(await store.get_events("a")))
+
+    with pytest.raises(RuntimeError):
+        async with store.transaction():
+            await store.save_events([Counted(1)], "a")
+            await store.after_commit(callback)
+            raise RuntimeError()
+    assert called == []
+
+    async with store.transaction():
+        await store.save_events([Counted(1)], "a")
+        async with store.transaction():
+            await store.after_commit(callback)
+        assert called == []
+    # run after the commit, outside of the transaction
+    assert called == [1]
+
+
+@requires_database
+@pytest.mark.asyncio
+async def test_refresh_applies_events_with_older_sequence_order(store):
+    """Test that refresh selects the tail by version, not by sequence_order."""
+    counter = Counter("a")
+    await counter.apply(Counted(1))
+    await store.save(counter)
+    loaded = await store.load("a")
+    concurrent = await store.load("a")
+    await concurrent.apply(Counted(10, sequence_order=datetime(2000, 1, 1)))
+    await store.save(concurrent)
+    await store.refresh(loaded)
+    assert (loaded.value, loaded.version) == (11, 2)
+
+
+@requires_database
+@pytest.mark.asyncio
+async def test_rolled_back_save_not_cached(store):
+    """Test that a save is cached once the outer transaction is committed, not before."""
+    store.aggregate_cache = AggregateCache()
+    with pytest.raises(RuntimeError):
+        async with store.transaction():
+            counter = Counter("a")
+            await counter.apply(Counted(1))
+            await store.save(counter)
+            raise RuntimeError()
+    assert len(store.aggregate_cache) == 0
+    assert await store.get_last_position() == 0
+
+    async with store.transaction():
+        counter = Counter("a")
+        await counter.apply(Counted(1))
+        await store.save(counter)
+        assert len(store.aggregate_cache) == 0
+    assert store.aggregate_cache.get("a").version == 1
+
+
+@requires_database
+@pytest.mark.asyncio
+async def test_concurrent_writers_conflict(store):
+    """Test that only one of two writers appending to the same version succeeds."""
+    counter = Counter("a")
+    await counter.apply(Counted(1))
+    await store.save(counter)
+    first, second = await store.load("a"), await store.load("a")
+    await first.apply(Counted(10))
+    await second.apply(Counted(100))
+    results = await asyncio.gather(
+        store.save(first), store.save(second), return_exceptions=True
+    )
+    assert sum(isinstance(r, ConcurrencyException) for r in results) == 1
+    loaded = await store.load("a")
+    assert loaded.version == 2
+    assert loaded.value in (11, 101)
+    assert len(await store.get_all_events()) == 2
+
+
+@requires_database
+@pytest.mark.asyncio
+@pytest.mark.parametrize("ordered_log", [False, True])
+async def test_concurrent_saves(store, ordered_log):
+    """Test that concurrent saves of different aggregates all get unique positions."""
+    store.ordered_log = ordered_log
+    counters = [Counter(str(i)) for i in range(20)]
+    for counter in counters:
+        await counter.apply(Counted(1))
+        await counter.apply(Counted(2))
+    await asyncio.gather(*(store.save(counter) for counter in counters))
+    events = await store.get_all_events()
+    positions = [e.position for e in events]
+    assert len(set(positions)) == len(positions) == 40
+    if ordered_log:
+        assert positions == list(range(1, 41))
+    for counter in counters:
+        loaded = await store.load(counter.id)
+        assert (loaded.value, loaded.version) == (3, 2)
+
+
+@requires_database
+@pytest.mark.asyncio
+@pytest.mark.parametrize("ordered_log", [False, True])
+async def test_concurrent_appends(store, ordered_log):
+    """Test that concurrent appends to one aggregate keep its versions gap-free."""
+    store.ordered_log = ordered_log
+    results = await asyncio.gather(
+        *(store.save_events([Counted(1)], "a") for _ in range(10)),
+        return_exceptions=True,
+    )
+    assert all(r is None or isinstance(r, ConcurrencyException) for r in results)
+    saved = sum(r is None for r in results)
+    assert saved >= 1
+    versions = [e.version for e in await store.get_events("a")]
+    assert versions == list(range(1, saved + 1))
+
+
+@requires_database
+@pytest.mark.asyncio
+async def test_snapshot_class_round_trip(store):
+    """Test that snapshots are stored with the serializer of the snapshot class."""
+    store._AggregatedClass = PickledCounter
+    counter = PickledCounter("a", auto_snapshot_each_n=1)
+    await counter.apply(Counted(3))
+    await store.save(counter)
+    snapshot = await store.get_last_snapshot("a", PickleSnapshot)
+    assert isinstance(snapshot, PickleSnapshot)
+    assert snapshot.dumps() == PickleSerializer().dumps({"value": 3})
+    loaded = await store.load("a")
+    assert (loaded.value, loaded.snapshot_version) == (3, 1)
+
+
+@requires_database
+@pytest.mark.asyncio
+async def test_migrated_snapshot_version(store):
+    """Test that snapshots stored without a version get the one of their last event."""
+    counter = Counter("a")
+    for _ in range(4):
+        await counter.apply(Counted(1))
+    await store.save(counter)
+    await store.take_snapshot("a")
+    async with store.transaction() as session:
+        await session.execute(update(test_snapshot_table).values(version=None))
+    await store.migrate_schema()
+
+    loaded = await store.load("a")
+    assert (loaded.value, loaded.version, loaded.snapshot_version) == (4, 4, 4)
+
+    async def command(counter):
+        if not executor.conflicts:
+            concurrent = await store.load("a")
+            await concurrent.apply(Counted(10))
+            await store.save(concurrent)
+        await counter.apply(Counted(1))
+
+    executor = AsyncCommandExecutor(store)
+    saved = await executor.execute("a", command)
+    assert (saved.value, saved.version, executor.conflicts) == (15, 6, 1)
+    assert (await store.load("a")).value == 15
+
+
+@requires_database
+@pytest.mark.asyncio
+async def test_checkpoint_concurrent_first_saves(store):
+    """Test that concurrent first saves of a checkpoint upsert instead of conflicting."""
+    checkpoints = PostgresAsyncCheckpointStore(store)
+    await checkpoints.create_schema()
+    try:
+        await asyncio.gather(*(checkpoints.save("runner", i) for i in range(1, 6)))
+        assert await checkpoints.load("runner") in range(1, 6)
+        await checkpoints.save("runner", 10)
+        assert await checkpoints.load("runner") == 10
+        assert await checkpoints.load("other") == 0
+    finally:
+        async with store.engine.begin() as connection:
+            await connection.run_sync(checkpoints.table.drop)
@@ -1,6 +1,7 @@
 from pyeventor.aggregate import Aggregate, Projection
 from pyeventor.event import Event, JsonSnapshot
 from pyeventor.exceptions import HandlerException
+from pyeventor.handler import EventHandler
 import inspect
 
 
@@ -10,6 +11,12 @@ from unittest.mock import patch
 
 
 class TestAggregate:
+    @pytest.fixture(autouse=True)
+    def clear_dispatch_cache(self):
+        EventHandler.__dispatch_cache__.clear()
+        yield
+        EventHandler.__dispatch_cache__.clear()
+
     @pytest.fixture
     def aggregate_id(self):
         return str(uuid4())
@@ -79,6 +86,7 @@ class TestAggregate:
 
         assert len(aggregate._pending_events) == n + 1  # n events + 1 snapshot
         assert isinstance(aggregate._pending_events[-1], JsonSnapshot)
+        assert aggregate._pending_events[-1].version == n
 
     def test_from_snapshot(self, aggregate_id, snapshot):
         """Test loading an aggregate from a snapshot."""
@@ -93,6 +101,12 @@ class TestAggregate:
 
 
 class TestProjection:
+    @pytest.fixture(autouse=True)
+    def clear_dispatch_cache(self):
+        EventHandler.__dispatch_cache__.clear()
+        yield
+        EventHandler.__dispatch_cache__.clear()
+
     @pytest.fixture
     def projection_id(self):
         return str(uuid4())
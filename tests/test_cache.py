@@ -0,0 +1,228 @@
+import pytest
+from contextlib import contextmanager
+from unittest.mock import patch
+
+from pyeventor.event import Event, Snapshot, JsonSnapshot
+from pyeventor.aggregate import Aggregate
+from pyeventor.cache import AggregateCache, SnapshotCache, NOT_CACHED
+from pyeventor.decorator import register_handler
+from pyeventor.plugins.in_memory_store import InMemoryEventStore
+
+
+class Incremented(Event[int, int]):
+    __type_name__ = "cache.Incremented"
+
+
+class Counter(Aggregate):
+    def _init_empty_attributes(self):
+        self.value = 0
+
+    @register_handler(Incremented)
+    def incremented(self, event: Incremented):
+        self.value += event.data
+
+
+class CounterStore(InMemoryEventStore):
+    _AggregatedClass = Counter
+
+
+class TransactionalCounterStore(CounterStore):
+    """Nested transactions committed by the outermost one, callbacks run on its commit"""
+
+    def __init__(self):
+        super().__init__()
+        self.callbacks = None
+
+    @contextmanager
+    def transaction(self):
+        if self.callbacks is not None:
+            yield
+            return
+        self.callbacks = []
+        try:
+            yield
+        except Exception:
+            self.callbacks = None
+            raise
+        callbacks, self.callbacks = self.callbacks, None
+        for callback in callbacks:
+            callback()
+
+    def after_commit(self, callback):
+        if self.callbacks is None:
+            callback()
+        else:
+            self.callbacks.append(callback)
+
+
+class TestAggregateCache:
+    def test_lru_eviction(self):
+        """Test that the least recently used aggregate is evicted."""
+        cache = AggregateCache(max_size=2)
+        cache.put(Counter("a"))
+        cache.put(Counter("b"))
+        cache.get("a")
+        cache.put(Counter("c"))
+        assert cache.get("b") is None
+        assert cache.get("a") is not None
+        assert cache.get("c") is not None
+        assert len(cache) == 2
+        assert cache.evictions == 1
+        assert (cache.hits, cache.misses) == (3, 1)
+
+    def test_ttl(self):
+        """Test that expired aggregates are misses."""
+        cache = AggregateCache(ttl=10)
+        with patch("pyeventor.cache.monotonic", return_value=0):
+            cache.put(Counter("a"))
+        with patch("pyeventor.cache.monotonic", return_value=5):
+            assert cache.get("a") is not None
+        with patch("pyeventor.cache.monotonic", return_value=11):
+            assert cache.get("a") is None
+        assert len(cache) == 0
+
+    def test_put_keeps_newer_version(self):
+        """Test that an older version does not replace a newer cached one."""
+        cache = AggregateCache()
+        newer = Counter("a")
+        newer._version = 2
+        cache.put(newer)
+        cache.put(Counter("a"))
+        assert cache.get("a") is newer
+
+    def test_invalidate(self):
+        cache = AggregateCache()
+        cache.put(Counter("a"))
+        cache.invalidate("a")
+        cache.invalidate("unknown")
+        assert cache.get("a") is None
+
+
+class TestEventStoreCache:
+    @pytest.fixture
+    def store(self):
+        store = CounterStore()
+        store.aggregate_cache = AggregateCache()
+        store.save(Counter("test_id").apply(Incremented(1)))
+        return store
+
+    def test_save_writes_through(self, store):
+        """Test that saved aggregates are served from the cache."""
+        with patch.object(store, "get_last_snapshot") as mock_snapshot:
+            counter = store.load("test_id")
+            mock_snapshot.assert_not_called()
+        assert counter.value == 1
+        assert store.aggregate_cache.hits == 1
+
+    def test_load_returns_copies(self, store):
+        """Test that changes to a loaded aggregate do not leak into the cache."""
+        store.load("test_id").apply(Incremented(5))
+        assert store.load("test_id").value == 1
+
+    def test_load_applies_new_events(self, store):
+        """Test that events saved by another writer are applied to the cached aggregate."""
+        other = CounterStore()
+        other.events = store.events
+        other.events_by_type = store.events_by_type
+        other.save(other.load("test_id").apply(Incremented(2)))
+
+        counter = store.load("test_id")
+        assert counter.value == 3
+        assert counter.version == 2
+        assert store.aggregate_cache.get("test_id").version == 2
+
+    def test_nested_save_cached_on_outer_commit(self):
+        """Test that a save nested in a transaction is cached once it is committed."""
+        store = TransactionalCounterStore()
+        store.aggregate_cache = AggregateCache()
+        counter = Counter("test_id")
+        with store.transaction():
+            store.save(counter.apply(Incremented(1)))
+            counter.apply(Incremented(10))
+            assert len(store.aggregate_cache) == 0
+        cached = store.aggregate_cache.get("test_id")
+        assert (cached.value, cached.version) == (1, 1)
+
+    def test_nested_save_not_cached_on_rollback(self):
+        """Test that a save rolled back with the outer transaction is not cached."""
+        store = TransactionalCounterStore()
+        store.aggregate_cache = AggregateCache()
+        with pytest.raises(RuntimeError):
+            with store.transaction():
+                store.save(Counter("test_id").apply(Incremented(1)))
+                raise RuntimeError()
+        assert len(store.aggregate_cache) == 0
+
+    def test_load_at_bypasses_cache(self, store):
+        """Test that historical loads are not served from nor stored in the cache."""
+        store.aggregate_cache.clear()
+        event = store.get_events("test_id")[0]
+        assert store.load("test_id", load_at=event.sequence_order).value == 1
+        assert len(store.aggregate_cache) == 0
+        assert store.aggregate_cache.misses == 0
+
+
+class TestSnapshotCache:
+    def test_get_put(self):
+        """Test hits, misses and cached absence of snapshots."""
+        cache = SnapshotCache()
+        assert cache.get("a", JsonSnapshot) is NOT_CACHED
+        cache.put("a", JsonSnapshot, None)
+        assert cache.get("a", JsonSnapshot) is None
+        snapshot = JsonSnapshot(data={"value": 1}, sequence_order=1)
+        cache.put("a", JsonSnapshot, snapshot)
+        cached = cache.get("a", JsonSnapshot)
+        assert cached.data == {"value": 1} and cached is not snapshot
+        assert (cache.hits, cache.misses) == (2, 1)
+
+    def test_save_keeps_newest(self):
+        """Test that saved snapshots replace older ones of the types they are instances of."""
+        cache = SnapshotCache()
+        cache.put("a", Snapshot, None)
+        cache.save("a", [JsonSnapshot(data={"value": 2}, sequence_order=2)])
+        cache.put("a", JsonSnapshot, JsonSnapshot(data={"value": 1}, sequence_order=1))
+        assert cache.get("a", Snapshot).data == {"value": 2}
+        assert cache.get("a", JsonSnapshot).data == {"value": 2}
+
+    def test_lru_eviction(self):
+        cache = SnapshotCache(max_size=1)
+        cache.put("a", JsonSnapshot, None)
+        cache.put("b", JsonSnapshot, None)
+        assert cache.get("a", JsonSnapshot) is NOT_CACHED
+        assert cache.evictions == 1
+
+
+class TestEventStoreSnapshotCache:
+    @pytest.fixture
+    def store(self):
+        store = CounterStore()
+        store.snapshot_cache = SnapshotCache()
+        counter = Counter("test_id", auto_snapshot_each_n=2)
+        store.save(counter.apply(Incremented(1)).apply(Incremented(2)))
+        return store
+
+    def test_save_writes_through(self, store):
+        """Test that saved snapshots are served from the cache."""
+        with patch.object(store, "get_last_snapshot") as mock_snapshot:
+            store.load("test_id")
+            store.load_many(["test_id"])
+            mock_snapshot.assert_not_called()
+        assert store.snapshot_cache.hits == 2
+
+    def test_load_caches_missing_snapshots(self, store):
+        """Test that aggregates without snapshots are queried once."""
+        with patch.object(
+            store, "get_last_snapshot", wraps=store.get_last_snapshot
+        ) as mock_snapshot:
+            store.load("other_id")
+            store.load("other_id")
+            mock_snapshot.assert_called_once()
+
+    def test_load_at_bypasses_cache(self, store):
+        """Test that time travel loads query the store."""
+        event = store.get_events("test_id")[0]
+        with patch.object(
+            store, "get_last_snapshot", wraps=store.get_last_snapshot
+        ) as mock_snapshot:
+            store.load("test_id", load_at=event.sequence_order)
+            mock_snapshot.assert_called_once()
@@ -0,0 +1,99 @@
+import pytest
+from datetime import datetime
+from unittest.mock import patch
+
+from pyeventor.event import Event
+from pyeventor.aggregate import Aggregate
+from pyeventor.decorator import register_handler
+from pyeventor.command import CommandExecutor, RetryPolicy
+from pyeventor.exceptions import ConcurrencyException
+from pyeventor.plugins.in_memory_store import InMemoryEventStore
+
+
+class Incremented(Event[int, int]):
+    __type_name__ = "command.Incremented"
+
+
+class Counter(Aggregate):
+    def _init_empty_attributes(self):
+        self.value = 0
+
+    @register_handler(Incremented)
+    def incremented(self, event: Incremented):
+        self.value += event.data
+
+
+class CounterStore(InMemoryEventStore):
+    _AggregatedClass = Counter
+
+
+class TestCommandExecutor:
+    @pytest.fixture
+    def store(self):
+        store = CounterStore()
+        store.save(Counter("test_id").apply(Incremented(1)))
+        return store
+
+    @pytest.fixture
+    def executor(self, store):
+        return CommandExecutor(store, RetryPolicy(max_retries=2, backoff=0))
+
+    def test_execute(self, executor, store):
+        """Test that the command result is saved."""
+        counter = executor.execute("test_id", lambda c: c.apply(Incremented(2)))
+        assert counter.value == 3
+        assert store.load("test_id").value == 3
+        assert executor.conflicts == 0
+
+    def test_execute_retries_on_conflict(self, executor, store):
+        """Test that on conflict the new events are applied and the command is retried."""
+        concurrent = store.load("test_id")
+
+        def command(counter):
+            if concurrent.version == 1:
+                store.save(concurrent.apply(Incremented(10)))
+            counter.apply(Incremented(2))
+
+        with patch.object(store, "load", wraps=store.load) as mock_load:
+            counter = executor.execute("test_id", command)
+            mock_load.assert_called_once()
+
+        assert counter.value == 13
+        assert store.load("test_id").value == 13
+        assert executor.conflicts == 1
+        assert executor.retries == 1
+
+    def test_execute_retries_on_conflict_with_older_event(self, executor, store):
+        """Test that a competing event with an older timestamp is applied on refresh."""
+        concurrent = store.load("test_id")
+
+        def command(counter):
+            if concurrent.version == 1:
+                # written by another process with a clock behind
+                concurrent.apply(Incremented(10, sequence_order=datetime(2000, 1, 1)))
+                store.save(concurrent)
+            counter.apply(Incremented(2))
+
+        counter = executor.execute("test_id", command)
+        assert (counter.value, counter.version) == (13, 3)
+        assert executor.conflicts == 1
+
+    def test_default_retry_policy_per_executor(self, store):
+        """Test that each executor gets its own retry policy."""
+        assert (
+            CommandExecutor(store).retry_policy
+            is not CommandExecutor(store).retry_policy
+        )
+
+    def test_execute_gives_up_after_max_retries(self, executor, store):
+        """Test that ConcurrencyException is raised when retries are exhausted."""
+
+        def command(counter):
+            concurrent = store.load("test_id")
+            store.save(concurrent.apply(Incremented(10)))
+            counter.apply(Incremented(2))
+
+        with pytest.raises(ConcurrencyException):
+            executor.execute("test_id", command)
+        assert executor.conflicts == 3
+        assert executor.retries == 2
@@ -1,7 +1,7 @@
 from datetime import datetime, timedelta
 import pytest
-from unittest.mock import MagicMock
-from pyeventor.event import Event, JsonSnapshot
+from unittest.mock import MagicMock, patch
+from pyeventor.event import Event, JsonSnapshot, event_type_filter
 
 # Assuming the classes Event, JsonSnapshot, and others are imported correctly
 
@@ -55,3 +55,84 @@ class TestEvent:
         assert (
             snapshot.data == expected_data
         ), "Snapshot should only contain public attributes that aren't methods"
+
+    def test_event_type_name(self):
+        """Test that the type name defaults to the class name and is not inherited."""
+
+        class CustomEvent(Event[int, dict]):
+            __type_name__ = "custom.Event.v1"
+
+        class DerivedEvent(CustomEvent):
+            pass
+
+        assert Event.type_name() == "Event"
+        assert CustomEvent.type_name() == "custom.Event.v1"
+        assert DerivedEvent.type_name() == "DerivedEvent"
+
+    def test_event_type_filter(self):
+        """Test that the filter includes the subclasses, even the ones defined later."""
+
+        class BaseEvent(Event[int, dict]):
+            pass
+
+        class RenamedEvent(BaseEvent):
+            __type_name__ = "renamed.v2"
+
+        event_filter = event_type_filter((BaseEvent,))
+        assert event_filter.classes == {BaseEvent, RenamedEvent}
+        assert event_filter.names == ("BaseEvent", "renamed.v2")
+        assert event_type_filter((BaseEvent,)) is event_filter
+
+        class LaterEvent(RenamedEvent):
+            pass
+
+        assert LaterEvent in event_type_filter((BaseEvent,)).classes
+
+    def test_event_data_type(self):
+        """Test that the data type is taken from the generic parameters."""
+
+        class CustomEvent(Event[int, dict]):
+            pass
+
+        class DerivedEvent(CustomEvent):
+            pass
+
+        assert Event.data_type() is None
+        assert CustomEvent.data_type() is dict
+        assert DerivedEvent.data_type() is dict
+        assert JsonSnapshot.data_type() is dict
+
+    def test_slotted_event(self):
+        """Test that events declaring __slots__ have no __dict__, the others keep it."""
+
+        class SlottedEvent(Event[int, dict]):
+            __slots__ = ()
+
+        class CustomEvent(Event[int, dict]):
+            pass
+
+        assert not hasattr(SlottedEvent({}), "__dict__")
+        assert not hasattr(JsonSnapshot({}), "__dict__")
+        event = CustomEvent({})
+        event.extra = 1
+        assert event.extra == 1
+
+    def test_lazy_data(self):
+        """Test that lazily loaded data is decoded on the first access."""
+
+        class CustomEvent(Event[int, dict]):
+            __slots__ = ()
+
+        raw = CustomEvent({"key": "value"}).dumps()
+        with patch.object(
+            CustomEvent, "_decode", wraps=CustomEvent._decode
+        ) as mock_decode:
+            event = CustomEvent.loads(raw, lazy=True, sequence_order=1, version=2)
+            assert (event.sequence_order, event.version) == (1, 2)
+            assert event.dumps() is raw
+            mock_decode.assert_not_called()
+            assert event.data == {"key": "value"}
+            assert event.data == {"key": "value"}
+            mock_decode.assert_called_once()
+        with pytest.raises(AttributeError):
+            event.missing
@@ -5,6 +5,8 @@ from unittest.mock import MagicMock, patch
 from pyeventor.event import Event, Snapshot
 from pyeventor.aggregate import Aggregate, Projection
 from pyeventor.event_store import EventStore
+from pyeventor.decorator import register_handler
+from pyeventor.plugins.in_memory_store import InMemoryEventStore
 from contextlib import contextmanager
 
 
@@ -28,6 +30,45 @@ class ConcreteEventStore(EventStore):
         yield
 
 
+class Deposited(Event[int, int]):
+    __type_name__ = "event_store.Deposited"
+
+
+class DepositedInCents(Deposited):
+    """Previous version of Deposited, selected by the projections handling Deposited"""
+
+    __type_name__ = "event_store.DepositedInCents"
+
+    def upcast(self):
+        return Deposited(self.data // 100, self.sequence_order, self.version)
+
+
+class DepositedInMillis(Deposited):
+    __type_name__ = "event_store.DepositedInMillis"
+
+    def upcast(self):
+        return DepositedInCents(self.data // 10, self.sequence_order, self.version)
+
+
+class Balance(Projection):
+    def _init_empty_attributes(self):
+        self.balance = 0
+
+    @register_handler(Deposited)
+    def deposited(self, event: Deposited):
+        self.balance += event.data
+
+
+class Account(Aggregate):
+    @register_handler(Deposited)
+    def handle(self, event: Event):
+        pass
+
+
+class AccountStore(InMemoryEventStore):
+    _AggregatedClass = Account
+
+
 @pytest.fixture
 def mock_aggregate():
     aggregate = MockAggregate(aggregate_id="test_id")
@@ -79,16 +120,38 @@ class TestEventStore:
         with patch.object(
             event_store, "get_last_snapshot"
         ) as mock_get_last_snapshot, patch.object(
-            event_store, "get_events"
-        ) as mock_get_events, patch.object(
+            event_store, "iter_events"
+        ) as mock_iter_events, patch.object(
             MockAggregate, "from_snapshot"
         ) as mock_from_snapshot:
             mock_get_last_snapshot.return_value = MockSnapshot()
             event_store.load("test_id")
             mock_get_last_snapshot.assert_called_once()
-            mock_get_events.assert_called_once()
+            mock_iter_events.assert_called_once()
             mock_from_snapshot.assert_called_once()
 
+    @patch.multiple(ConcreteEventStore, __abstractmethods__=set())
+    def test_load_applies_events_after_snapshot(self):
+        """Test that events stored after the snapshot are replayed on top of it."""
+        event_store = ConcreteEventStore()
+        snapshot = MockSnapshot(data={}, sequence_order=1, version=1)
+        tail = [
+            MockEvent(sequence_order=2, version=2),
+            MockEvent(sequence_order=3, version=3),
+        ]
+        with patch.object(
+            event_store, "get_last_snapshot", return_value=snapshot
+        ), patch.object(
+            event_store, "iter_events", return_value=iter(tail)
+        ) as mock_iter_events, patch.object(
+            MockAggregate, "_apply_without_saving"
+        ) as mock_apply:
+            aggregate = event_store.load("test_id")
+            mock_iter_events.assert_called_once_with("test_id", lte=None, gt=1)
+            assert [c.args[0] for c in mock_apply.call_args_list] == tail
+        assert aggregate.version == 3
+        assert aggregate.last_sequence_order == 3
+
     @patch.multiple(ConcreteEventStore, __abstractmethods__=set())
     def test_load_projection(self, mock_projection):
         event_store = ConcreteEventStore()
@@ -104,3 +167,60 @@ class TestEventStore:
             mock_get_last_snapshot.assert_called_once()
             mock_get_events.assert_called_once()
             mock_from_snapshot.assert_called_once()
+
+    @patch.multiple(ConcreteEventStore, __abstractmethods__=set())
+    def test_save_many(self):
+        event_store = ConcreteEventStore()
+        first, second = MockAggregate("first"), MockAggregate("second")
+        first._pending_events = [MockEvent(), MockSnapshot()]
+        second._pending_events = [MockEvent(), MockEvent()]
+        with patch.object(event_store, "save_events") as mock_save_events, patch.object(
+            event_store, "save_snapshots"
+        ) as mock_save_snapshots, patch.object(
+            event_store, "transaction", MagicMock()
+        ) as mock_transaction:
+            event_store.save_many([first, second])
+            mock_transaction.assert_called_once()
+            assert mock_save_events.call_count == 2
+            mock_save_snapshots.assert_called_once()
+            assert not first.uncommmited_events
+            assert not second.uncommmited_events
+
+    @patch.multiple(ConcreteEventStore, __abstractmethods__=set())
+    def test_unit_of_work(self, mock_aggregate):
+        event_store = ConcreteEventStore()
+        with patch.object(event_store, "save_many") as mock_save_many:
+            with event_store.unit_of_work() as uow:
+                uow.add(mock_aggregate)
+                uow.add(mock_aggregate)
+            mock_save_many.assert_called_once_with([mock_aggregate])
+
+    @patch.multiple(ConcreteEventStore, __abstractmethods__=set())
+    def test_load_many(self):
+        event_store = ConcreteEventStore()
+        snapshot = MockSnapshot()
+        with patch.object(
+            event_store, "get_last_snapshot", side_effect=[snapshot, None]
+        ) as mock_get_last_snapshot, patch.object(
+            event_store, "get_events", return_value=[]
+        ) as mock_get_events, patch.object(
+            MockAggregate, "from_snapshot"
+        ) as mock_from_snapshot:
+            aggregates = event_store.load_many(["first", "second"])
+            assert mock_get_last_snapshot.call_count == 2
+            mock_from_snapshot.assert_called_once_with("first", snapshot)
+            mock_get_events.assert_any_call(
+                "first", [], gt=snapshot.sequence_order, lte=None
+            )
+            mock_get_events.assert_any_call("second", [], gt=None, lte=None)
+            assert aggregates["first"] == mock_from_snapshot.return_value
+            assert aggregates["second"].id == "second"
+
+    def test_projection_loads_upcast_events(self):
+        """Test that the projection loads upcast the events through every version."""
+        event_store = AccountStore()
+        event_store.save_events(
+            [DepositedInMillis(3000), DepositedInCents(200), Deposited(1)], "a"
+        )
+        assert event_store.load_projection("a", Balance).balance == 6
+        assert event_store.load_projections_many(["a"], Balance)["a"].balance == 6
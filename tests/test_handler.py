@@ -1,14 +1,14 @@
 import pytest
 
 # Assuming these imports are from your project's modules
-from pyeventor.event import Event
+from pyeventor.event import Event, event_classes_by_name
 from pyeventor.aggregate import Aggregate
 from pyeventor.handler import EventHandler
+from pyeventor.exceptions import RegisterException
 from collections import defaultdict
 
 
 class TestEventHandler:
-
     # Mock classes for events and aggregates
     class BaseEvent(Event):
         pass
@@ -32,9 +32,19 @@ class TestEventHandler:
     @pytest.fixture(autouse=True)
     def run_around_tests(self):
         # Code that will run before your test, for example:
+        event_handlers = EventHandler.__event_handlers__
+        event_types = EventHandler.__event_types__
         EventHandler.__event_handlers__ = defaultdict(dict)
+        EventHandler.__event_types__ = {}
+        EventHandler.__dispatch_cache__.clear()
+        EventHandler.__handled_event_types__.clear()
         # A test function will be run at this point
         yield
+        # restore the handlers registered by the other test modules
+        EventHandler.__event_handlers__ = event_handlers
+        EventHandler.__event_types__ = event_types
+        EventHandler.__dispatch_cache__.clear()
+        EventHandler.__handled_event_types__.clear()
 
     def test_set_handler(self):
         """Test setting an event handler."""
@@ -79,3 +89,158 @@ class TestEventHandler:
             EventHandler.get_handler(self.DerivedAggregate, self.BaseEvent)
             == self.base_event_handler
         )
+
+    def test_get_invoker_aggregate_first(self):
+        """Test that an aggregate-defined handler is invoked as handler(aggregate, event)."""
+        calls = []
+
+        def handler(aggregate: TestEventHandler.BaseAggregate, event: Event):
+            calls.append((aggregate, event))
+
+        EventHandler.set_handler(self.BaseAggregate, self.BaseEvent, handler)
+        EventHandler.set_arguments_order(handler, event_first=False)
+        aggregate, event = self.DerivedAggregate(), self.DerivedEvent()
+        EventHandler.get_invoker(self.DerivedAggregate, self.DerivedEvent)(
+            aggregate, event
+        )
+        assert calls == [(aggregate, event)]
+
+    def test_get_invoker_event_first(self):
+        """Test that an event-defined handler is invoked as handler(event, aggregate)."""
+        calls = []
+
+        def handler(event, aggregate):
+            calls.append((event, aggregate))
+
+        EventHandler.set_handler(self.BaseAggregate, self.BaseEvent, handler)
+        EventHandler.set_arguments_order(handler, event_first=True)
+        aggregate, event = self.BaseAggregate(), self.BaseEvent()
+        EventHandler.get_invoker(self.BaseAggregate, self.BaseEvent)(aggregate, event)
+        assert calls == [(event, aggregate)]
+
+    def test_get_invoker_cache_invalidated_on_set_handler(self):
+        """Test that the dispatch cache is reset when the handlers registry changes."""
+        assert EventHandler.get_invoker(self.BaseAggregate, self.BaseEvent) is None
+        EventHandler.set_handler(
+            self.BaseAggregate, self.BaseEvent, self.base_event_handler
+        )
+        EventHandler.set_arguments_order(self.base_event_handler, event_first=False)
+        assert (
+            EventHandler.get_invoker(self.BaseAggregate, self.BaseEvent)
+            == self.base_event_handler
+        )
+
+    def test_get_event_class_by_name(self):
+        """Test that event types are indexed by name when a handler is registered."""
+
+        class NamedEvent(Event[int, dict]):
+            pass
+
+        class VersionedEvent(NamedEvent):
+            __type_name__ = "test.NamedEvent.v2"
+
+        EventHandler.set_handler(
+            self.BaseAggregate, NamedEvent, self.base_event_handler
+        )
+        EventHandler.set_handler(
+            self.BaseAggregate, VersionedEvent, self.base_event_handler
+        )
+        assert EventHandler.get_event_class_by_name("NamedEvent") == (NamedEvent, dict)
+        assert EventHandler.get_event_class_by_name("test.NamedEvent.v2") == (
+            VersionedEvent,
+            dict,
+        )
+        assert EventHandler.get_event_class_by_name("VersionedEvent") == (None, None)
+
+    def test_register_event_type_name_collision(self):
+        """Test that two event classes can't be stored under the same name."""
+
+        def define():
+            class CollidingEvent(Event[int, dict]):
+                pass
+
+            return CollidingEvent
+
+        class CollidingEvent(Event[int, dict]):
+            pass
+
+        EventHandler.register_event_type(CollidingEvent)
+        with pytest.raises(RegisterException):
+            EventHandler.register_event_type(define())
+        assert EventHandler.get_event_class_by_name("CollidingEvent") == (
+            CollidingEvent,
+            dict,
+        )
+
+    def test_register_event_type_redefined_class(self):
+        """Test that a class defined again replaces the previous one."""
+        first = type("RedefinedEvent", (Event,), {})
+        second = type("RedefinedEvent", (Event,), {})
+        EventHandler.register_event_type(first)
+        EventHandler.register_event_type(second)
+        assert EventHandler.get_event_class_by_name("RedefinedEvent")[0] is second
+
+    def test_get_event_class_by_name_subclass_without_handler(self):
+        """Test that subclasses of the handled events are found by name too."""
+
+        class HandledEvent(Event[int, dict]):
+            pass
+
+        class UnhandledSubEvent(HandledEvent):
+            pass
+
+        EventHandler.set_handler(
+            self.BaseAggregate, HandledEvent, self.base_event_handler
+        )
+        assert EventHandler.get_event_class_by_name("UnhandledSubEvent") == (
+            UnhandledSubEvent,
+            dict,
+        )
+
+    def test_get_event_class_by_name_unknown_cached(self):
+        """Test that unknown names are not searched again until a class is defined."""
+        assert EventHandler.get_event_class_by_name("LaterEvent") == (None, None)
+        scans = event_classes_by_name.cache_info().misses
+        assert EventHandler.get_event_class_by_name("LaterEvent") == (None, None)
+        assert event_classes_by_name.cache_info().misses == scans
+
+        class LaterEvent(Event[int, dict]):
+            pass
+
+        assert EventHandler.get_event_class_by_name("LaterEvent") == (LaterEvent, dict)
+
+    def test_get_event_class_by_name_collision(self):
+        """Test that unhandled classes stored under the same name are rejected."""
+        first = type("UnhandledCollision", (Event,), {"__module__": "billing"})
+        second = type("UnhandledCollision", (Event,), {"__module__": "shipping"})
+        with pytest.raises(RegisterException, match="billing.UnhandledCollision"):
+            EventHandler.get_event_class_by_name("UnhandledCollision")
+        with pytest.raises(RegisterException, match="shipping.UnhandledCollision"):
+            EventHandler.get_event_class_by_name("UnhandledCollision")
+        assert "UnhandledCollision" not in EventHandler.__event_types__
+        assert event_classes_by_name()["UnhandledCollision"] == (first, second)
+
+    def test_get_event_class_by_name_redefined_class(self):
+        """Test that the last definition of an unhandled class is found by name."""
+        type("UnhandledRedefined", (Event,), {})
+        second = type("UnhandledRedefined", (Event,), {})
+        assert EventHandler.get_event_class_by_name("UnhandledRedefined")[0] is second
+
+    def test_get_handled_event_types(self):
+        """Test that the handled events include the handlers of the bases, once each."""
+        EventHandler.set_handler(
+            self.BaseAggregate, self.BaseEvent, self.base_event_handler
+        )
+        EventHandler.set_handler(
+            self.DerivedAggregate, self.DerivedEvent, self.derived_event_handler
+        )
+        EventHandler.set_handler(
+            self.DerivedAggregate, self.BaseEvent, self.derived_event_handler
+        )
+        assert EventHandler.get_handled_event_types(self.DerivedAggregate) == [
+            self.DerivedEvent,
+            self.BaseEvent,
+        ]
+        assert EventHandler.get_handled_event_types(self.BaseAggregate) == [
+            self.BaseEvent
+        ]
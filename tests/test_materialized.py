@@ -0,0 +1,145 @@
+import pytest
+from unittest.mock import patch
+
+from pyeventor.event import Event
+from pyeventor.aggregate import Aggregate, Projection
+from pyeventor.decorator import register_handler
+from pyeventor.plugins.in_memory_store import InMemoryEventStore
+from pyeventor.materialized import (
+    Materializer,
+    InMemoryProjectionStateStore,
+    INLINE,
+    EVENTUAL,
+)
+
+
+class Deposited(Event[int, int]):
+    __type_name__ = "materialized.Deposited"
+
+
+class Renamed(Event[int, str]):
+    __type_name__ = "materialized.Renamed"
+
+
+class Account(Aggregate):
+    @register_handler(Deposited, Renamed)
+    def handle(self, event: Event):
+        pass
+
+
+class Balance(Projection):
+    def _init_empty_attributes(self):
+        self.balance = 0
+
+    @register_handler(Deposited)
+    def deposited(self, event: Deposited):
+        self.balance += event.data
+
+
+class MovedBalance(Balance):
+    __projection_name__ = "Balance"
+
+
+class AccountStore(InMemoryEventStore):
+    _AggregatedClass = Account
+
+
+@pytest.fixture
+def state_store():
+    return InMemoryProjectionStateStore()
+
+
+@pytest.fixture
+def store(state_store):
+    store = AccountStore()
+    store.materializer = Materializer(state_store, [Balance])
+    return store
+
+
+def test_inline_updates_on_save(store, state_store):
+    """Test that the state is updated by each save and read without replay."""
+    account = Account("a").apply(Deposited(10)).apply(Renamed("x"))
+    store.save(account)
+    store.save(account.apply(Deposited(5)))
+    state = state_store.get(Balance, "a")
+    assert (state.balance, state.version) == (15, 3)
+
+    with patch.object(store, "iter_events") as mock_iter_events, patch.object(
+        store, "get_events_batch"
+    ) as mock_get_events_batch:
+        assert store.load_projection("a", Balance).balance == 15
+        assert store.load_projections_many(["a"], Balance)["a"].balance == 15
+    mock_iter_events.assert_not_called()
+    mock_get_events_batch.assert_not_called()
+
+
+def test_replays_aggregates_without_state(store, state_store):
+    """Test that events saved before the materialization are replayed once."""
+    materializer, store.materializer = store.materializer, None
+    store.save(Account("a").apply(Deposited(10)))
+    store.materializer = materializer
+
+    assert store.load_projection("a", Balance).balance == 10
+    assert state_store.get(Balance, "a") is None
+    store.save(store.load("a").apply(Deposited(1)))
+    assert state_store.get(Balance, "a").balance == 11
+
+
+def test_update_applied_twice(store, state_store):
+    """Test that events already applied to the state are skipped."""
+    account = Account("a").apply(Deposited(10))
+    store.save(account)
+    store.materializer.update(store, {"a": store.get_events("a")})
+    assert state_store.get(Balance, "a").balance == 10
+
+
+def test_load_at_replays(store):
+    """Test that loads in the past don't read the current state."""
+    account = Account("a").apply(Deposited(10)).apply(Deposited(5))
+    store.save(account)
+    first = store.get_events("a")[0]
+    assert (
+        store.load_projection("a", Balance, load_at=first.sequence_order).balance == 10
+    )
+
+
+def test_eventual(state_store):
+    """Test that eventual updates are applied in the background, in the order of the saves."""
+    store = AccountStore()
+    with Materializer(state_store, [Balance], EVENTUAL) as materializer:
+        store.materializer = materializer
+        account = Account("a")
+        for amount in range(10):
+            store.save(account.apply(Deposited(amount)))
+    assert state_store.get(Balance, "a").balance == 45
+    assert materializer.errors == 0
+
+
+def test_eventual_after_outer_commit(state_store):
+    """Test that eventual updates are submitted once the save is committed."""
+    store = AccountStore()
+    store.materializer = Materializer(state_store, [Balance], EVENTUAL)
+    callbacks = []
+    with patch.object(
+        store, "after_commit", side_effect=callbacks.append
+    ), patch.object(store.materializer, "on_commit") as mock_on_commit:
+        store.save(Account("a").apply(Deposited(10)))
+        mock_on_commit.assert_not_called()
+        for callback in callbacks:
+            callback()
+    mock_on_commit.assert_called_once()
+    store.materializer.close()
+
+
+def test_states_keyed_on_projection_name(store, state_store):
+    """Test that a projection setting __projection_name__ reads the states stored under it."""
+    store.save(Account("a").apply(Deposited(10)))
+    assert MovedBalance.projection_name() == Balance.projection_name() == "Balance"
+    assert list(state_store.states) == [("Balance", "a")]
+    assert state_store.get(MovedBalance, "a").balance == 10
+
+
+def test_unknown_consistency(state_store):
+    with pytest.raises(ValueError):
+        Materializer(state_store, [Balance], "sometimes")
+    assert Materializer(state_store, [Balance]).consistency == INLINE
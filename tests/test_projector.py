@@ -0,0 +1,224 @@
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event as StopFlag
+from zlib import crc32
+from unittest.mock import patch
+
+from pyeventor.event import Event
+from pyeventor.aggregate import Aggregate, Projection
+from pyeventor.decorator import register_handler
+from pyeventor.plugins.in_memory_store import InMemoryEventStore
+from pyeventor.projector import (
+    ProjectionRunner,
+    InMemoryCheckpointStore,
+    ProjectionRebuild,
+    partition,
+)
+
+
+class Deposited(Event[int, int]):
+    __type_name__ = "projector.Deposited"
+
+
+class Renamed(Event[int, str]):
+    __type_name__ = "projector.Renamed"
+
+
+class DepositedInCents(Event[int, int]):
+    """Previous version of Deposited"""
+
+    __type_name__ = "projector.DepositedInCents"
+
+    def upcast(self):
+        return Deposited(self.data // 100, self.sequence_order, self.version)
+
+
+class Account(Aggregate):
+    @register_handler(Deposited, Renamed)
+    def handle(self, event: Event):
+        pass
+
+
+class TotalDeposits(Projection):
+    def _init_empty_attributes(self):
+        self.total = 0
+        self.by_account = {}
+
+    @register_handler(Deposited)
+    def deposited(self, event: Deposited):
+        self.total += event.data
+        self.by_account[event.aggregate_id] = (
+            self.by_account.get(event.aggregate_id, 0) + event.data
+        )
+
+
+class AccountStore(InMemoryEventStore):
+    _AggregatedClass = Account
+
+
+class AccountBalance(Projection):
+    def _init_empty_attributes(self):
+        self.balance = 0
+
+    @register_handler(Deposited)
+    def deposited(self, event: Deposited):
+        self.balance += event.data
+
+
+def make_accounts_store():
+    """Same accounts in every process: account i got deposits 0..i"""
+    store = AccountStore()
+    for i in range(20):
+        account = Account(f"account-{i}")
+        for amount in range(i + 1):
+            account.apply(Deposited(amount))
+        store.save(account)
+    return store
+
+
+@pytest.fixture
+def store():
+    store = AccountStore()
+    store.save_many(
+        [
+            Account("a").apply(Deposited(10)).apply(Renamed("x")),
+            Account("b").apply(Deposited(5)),
+        ]
+    )
+    return store
+
+
+def test_run_once_applies_all_aggregates(store):
+    """Test that the events of all the aggregates reach the projection, others are skipped."""
+    runner = ProjectionRunner(store, TotalDeposits("total"), batch_size=2)
+    assert runner.lag() == 3
+    assert runner.run_once() == 3
+    assert runner.projection.total == 15
+    assert runner.projection.by_account == {"a": 10, "b": 5}
+    assert runner.lag() == 0
+    assert runner.events_processed == 3
+    assert runner.events_per_second > 0
+
+    store.save(store.load("b").apply(Deposited(1)))
+    assert runner.run_once() == 1
+    assert runner.projection.total == 16
+
+
+def test_run_once_upcasts_events(store):
+    """Test that stored events of a previous version reach the handlers upcasted."""
+    store.save_events([DepositedInCents(300)], "c")
+    runner = ProjectionRunner(store, TotalDeposits("total"))
+    assert runner.run_once() == 4
+    assert runner.projection.by_account == {"a": 10, "b": 5, "c": 3}
+    assert runner.position == 4
+
+
+def test_resumes_from_checkpoint(store):
+    """Test that a new runner starts after the checkpoint of the previous one."""
+    checkpoints = InMemoryCheckpointStore()
+    ProjectionRunner(store, TotalDeposits("total"), checkpoints).run_once()
+    assert checkpoints.load("TotalDeposits") == 3
+
+    store.save(store.load("a").apply(Deposited(7)))
+    runner = ProjectionRunner(store, TotalDeposits("total"), checkpoints)
+    assert runner.run_once() == 1
+    assert runner.projection.total == 7
+
+
+def test_checkpoint_every(store):
+    """Test that checkpoints are saved every checkpoint_every events during a run."""
+    checkpoints = InMemoryCheckpointStore()
+    runner = ProjectionRunner(
+        store, TotalDeposits("total"), checkpoints, batch_size=1, checkpoint_every=2
+    )
+    with patch.object(checkpoints, "save", wraps=checkpoints.save) as mock_save:
+        runner.run_once()
+    assert [c.args for c in mock_save.call_args_list] == [
+        ("TotalDeposits", 2),
+        ("TotalDeposits", 3),
+    ]
+
+
+def test_run_until_stopped(store):
+    """Test that run polls the store until the stop flag is set."""
+    stop = StopFlag()
+    runner = ProjectionRunner(store, TotalDeposits("total"), poll_interval=0)
+
+    def run_once():
+        stop.set()
+        return 0
+
+    with patch.object(runner, "run_once", side_effect=run_once) as mock_run_once:
+        runner.run(stop)
+    mock_run_once.assert_called_once()
+
+
+def test_partition_is_stable():
+    """Test that ids are partitioned by crc32, which is the same in every process."""
+    ids = [f"account-{i}" for i in range(20)] + [1, 2]
+    assert partition(ids, 3) == [
+        [id for id in ids if crc32(str(id).encode()) % 3 == i] for i in range(3)
+    ]
+
+
+def test_rebuild_in_processes():
+    """Test that the projections of all the aggregates are rebuilt by the worker processes."""
+    progress = []
+    rebuild = ProjectionRebuild(
+        make_accounts_store,
+        AccountBalance,
+        workers=2,
+        chunk_size=3,
+        progress=lambda done, total: progress.append((done, total)),
+    )
+    assert rebuild.run() == 20
+    assert {id: p.balance for id, p in rebuild.projections.items()} == {
+        f"account-{i}": sum(range(i + 1)) for i in range(20)
+    }
+    assert progress[-1] == (20, 20)
+    assert [done for done, _ in progress] == sorted({done for done, _ in progress})
+
+
+def test_rebuild_write(store):
+    """Test that the chunks are handed to write instead of being sent back."""
+    written = {}
+    with ThreadPoolExecutor(2) as executor:
+        rebuild = ProjectionRebuild(
+            lambda: store,
+            AccountBalance,
+            write=written.update,
+            workers=2,
+            executor=executor,
+        )
+        assert rebuild.run(["a", "b"]) == 2
+    assert {id: p.balance for id, p in written.items()} == {"a": 10, "b": 5}
+    assert rebuild.projections == {}
+
+
+def test_rebuild_one_task_per_partition():
+    """Test that each partition is submitted once and replayed in chunks by its worker."""
+    submitted, written = [], []
+    store = make_accounts_store()
+
+    class RecordingExecutor(ThreadPoolExecutor):
+        def submit(self, fn, *args, **kwargs):
+            submitted.append(args[2])
+            return super().submit(fn, *args, **kwargs)
+
+    with RecordingExecutor(3) as executor:
+        rebuild = ProjectionRebuild(
+            lambda: store,
+            AccountBalance,
+            write=lambda projections: written.append(list(projections)),
+            workers=3,
+            chunk_size=4,
+            executor=executor,
+        )
+        assert rebuild.run() == 20
+    assert sorted(map(sorted, submitted)) == sorted(
+        sorted(part) for part in partition(store.get_aggregate_ids(), 3) if part
+    )
+    assert all(len(chunk) <= 4 for chunk in written)
+    assert sorted(id for chunk in written for id in chunk) == sorted(
+        store.get_aggregate_ids()
+    )
@@ -0,0 +1,123 @@
+from pyeventor.aggregate import Aggregate
+from pyeventor.decorator import register_handler
+from pyeventor.event import Event, JsonSnapshot
+from pyeventor.plugins.in_memory_store import InMemoryEventStore
+from pyeventor.schema import SnapshotSchema
+
+
+class Account(Aggregate):
+    def _init_empty_attributes(self):
+        self.owner = None
+        self.balance = 0
+
+
+class DeclaredAccount(Account):
+    __snapshot_fields__ = ("balance", "limit")
+
+    @property
+    def limit(self):
+        return self.balance * 2
+
+
+class ItemAdded(Event[int, int]):
+    __type_name__ = "schema.ItemAdded"
+
+
+class Basket(Aggregate):
+    def _init_empty_attributes(self):
+        self.items = []
+
+    @register_handler(ItemAdded)
+    def item_added(self, event: ItemAdded):
+        self.items.append(event.data)
+
+
+class BasketStore(InMemoryEventStore):
+    _AggregatedClass = Basket
+
+
+class SetterAccount(Account):
+    __snapshot_fields__ = ("balance",)
+
+    @property
+    def balance(self):
+        return self._balance
+
+    @balance.setter
+    def balance(self, value):
+        self._balance = value
+        self.restored_balance = value
+
+
+class TestSnapshotSchema:
+    def test_fields_computed_once(self):
+        """Test that the fields of the class are reused for the other instances."""
+        first, second = Account("a"), Account("b")
+        second.balance = 10
+        assert SnapshotSchema.attributes_of(first) == {"owner": None, "balance": 0}
+        schema = SnapshotSchema.of(first)
+        assert SnapshotSchema.attributes_of(second) == {"owner": None, "balance": 10}
+        assert SnapshotSchema.of(second) is schema
+
+    def test_fields_follow_new_attributes(self):
+        """Test that attributes set outside _init_empty_attributes are kept."""
+        account = Account("a")
+        SnapshotSchema.attributes_of(account)
+        account.closed = True
+        assert SnapshotSchema.attributes_of(account) == {
+            "owner": None,
+            "balance": 0,
+            "closed": True,
+        }
+        del account.closed
+        account.frozen = True
+        assert SnapshotSchema.attributes_of(account)["frozen"] is True
+
+    def test_fields_follow_replaced_attributes(self):
+        """Test that the fields are computed again when as many attributes are set as removed."""
+        account = Account("a")
+        SnapshotSchema.attributes_of(account)
+        account.closed = True
+        del account._snapshot_time
+        assert SnapshotSchema.attributes_of(account) == {
+            "owner": None,
+            "balance": 0,
+            "closed": True,
+        }
+
+    def test_declared_fields(self):
+        """Test that only the declared fields are taken, properties included."""
+        account = DeclaredAccount("a")
+        account.balance = 5
+        assert SnapshotSchema.attributes_of(account) == {"balance": 5, "limit": 10}
+
+    def test_snapshot_round_trip(self):
+        account = Account("a")
+        account.owner, account.balance = "owner", 3
+        restored = Account.from_snapshot("a", JsonSnapshot.create(account))
+        assert (restored.owner, restored.balance) == ("owner", 3)
+
+    def test_snapshot_shares_no_object(self):
+        """Test that applies after a snapshot don't change the stored snapshot."""
+        store = BasketStore()
+        basket = Basket("a", auto_snapshot_each_n=3)
+        for item in range(7):
+            basket.apply(ItemAdded(item))
+            store.save(basket)
+        assert store.get_last_snapshot("a").data == {"items": [0, 1, 2, 3, 4, 5]}
+        loaded = store.load("a")
+        assert (loaded.items, loaded.version) == (list(range(7)), 7)
+        loaded.items.append(7)
+        assert store.load("a").items == list(range(7))
+
+    def test_restore_through_setters(self):
+        """Test that declared fields are restored through the property setters."""
+        account = SetterAccount("a")
+        account.balance = 5
+        snapshot = JsonSnapshot.create(account)
+        restored = SetterAccount.from_snapshot("a", snapshot)
+        assert (restored.balance, restored.restored_balance) == (5, 5)
+        restored = DeclaredAccount.from_snapshot(
+            "a", JsonSnapshot(data={"balance": 5, "limit": 10})
+        )
+        assert (restored.balance, restored.limit) == (5, 10)
@@ -0,0 +1,107 @@
+import pytest
+from datetime import datetime
+from unittest.mock import patch
+
+from pyeventor.event import Event
+from pyeventor.aggregate import Aggregate
+from pyeventor.decorator import register_handler
+from pyeventor.plugins.in_memory_store import InMemoryEventStore
+from pyeventor.snapshot_policy import EveryNVersions
+from pyeventor.sequence import (
+    Timestamp,
+    HybridLogicalClock,
+    StreamVersion,
+    StorePosition,
+)
+
+
+class Stamped(Event[datetime, int]):
+    pass
+
+
+class Clocked(Event[int, int]):
+    sequence = HybridLogicalClock()
+
+
+class Versioned(Event[int, int]):
+    sequence = StreamVersion()
+
+
+class Positioned(Event[int, int]):
+    sequence = StorePosition()
+
+
+class Counter(Aggregate):
+    def _init_empty_attributes(self):
+        self.value = 0
+
+    @register_handler(Stamped, Clocked, Versioned, Positioned)
+    def added(self, event: Event):
+        self.value += event.data
+
+
+class CounterStore(InMemoryEventStore):
+    _AggregatedClass = Counter
+
+
+@pytest.fixture
+def store():
+    return CounterStore()
+
+
+def test_timestamp_is_default():
+    """Test that events keep getting datetime sequence orders by default."""
+    assert isinstance(Event.sequence, Timestamp)
+    assert isinstance(Stamped(1).sequence_order, datetime)
+
+
+def test_hybrid_logical_clock_strictly_increasing():
+    """Test that the clock never repeats nor goes back, even when the wall clock does."""
+    orders = [Clocked(1).sequence_order for _ in range(1000)]
+    assert orders == sorted(set(orders))
+    with patch("pyeventor.sequence.time_ns", return_value=0):
+        assert Clocked(1).sequence_order == orders[-1] + 1
+
+
+def test_assigned_on_save_strategies_start_empty():
+    """Test that the orders assigned by the store are unknown until the save."""
+    assert Versioned(1).sequence_order is None
+    assert Positioned(1).sequence_order is None
+    assert Versioned(1, sequence_order=0).sequence_order == 0
+
+
+def test_stream_version(store):
+    """Test that StreamVersion events are ordered by their version."""
+    counter = Counter("a").apply(Versioned(1)).apply(Versioned(2))
+    store.save(counter)
+    counter.apply(Versioned(3))
+    store.save(counter)
+    assert [e.sequence_order for e in store.get_events("a")] == [1, 2, 3]
+    assert store.get_events("a", gt=0, lte=1)[0].data == 1
+    assert store.load("a", load_at=2).value == 3
+
+
+def test_store_position(store):
+    """Test that StorePosition events get a position in the whole store."""
+    store.save_many(
+        [Counter("a").apply(Positioned(1)), Counter("b").apply(Positioned(2))]
+    )
+    store.save(store.load("a").apply(Positioned(3)))
+    assert [e.sequence_order for e in store.get_events("a")] == [1, 3]
+    assert [e.sequence_order for e in store.get_events("b")] == [2]
+    assert store.load("a").value == 4
+
+
+@pytest.mark.parametrize("event_class", [Stamped, Clocked, Versioned, Positioned])
+def test_snapshot_placed_on_last_event(store, event_class):
+    """Test that snapshots get the order of their last event, whatever the strategy."""
+    counter = Counter("a", snapshot_policy=EveryNVersions(2))
+    for value in range(5):
+        counter.apply(event_class(value))
+    store.save(counter)
+    events = store.get_events("a")
+    snapshot = store.get_last_snapshot("a")
+    assert snapshot.version == 4
+    assert snapshot.sequence_order == events[3].sequence_order
+    assert store.load("a").value == 10
+    assert store.load("a", load_at=events[2].sequence_order).value == 3
@@ -0,0 +1,97 @@
+import pytest
+
+from pyeventor.aggregate import Aggregate
+from pyeventor.decorator import register_handler
+from pyeventor.event import Event, JsonSnapshot
+from pyeventor.plugins.in_memory_store import InMemoryEventStore
+from pyeventor.serializer import (
+    JsonSerializer,
+    OrjsonSerializer,
+    PickleSerializer,
+    MsgpackSerializer,
+)
+
+
+class PickleSnapshot(JsonSnapshot):
+    serializer = PickleSerializer()
+
+
+class Payload(dict):
+    def __init__(self, name, amount):
+        self.name = name
+        self.amount = amount
+        dict.__init__(self, name=name, amount=amount)
+
+
+class Paid(Event[int, Payload]):
+    pass
+
+
+class PickledAccount(Aggregate):
+    SnapshotClass = PickleSnapshot
+
+    def _init_empty_attributes(self):
+        self.balance = 0
+
+    @register_handler(Paid)
+    def paid(self, event: Paid):
+        self.balance += event.data["amount"]
+
+
+class PickledAccountStore(InMemoryEventStore):
+    _AggregatedClass = PickledAccount
+
+
+class TestSerializer:
+    data = {"name": "name", "balance": 10, "tags": ["a", "b"], "limit": None}
+
+    @pytest.mark.parametrize("serializer", [JsonSerializer(), PickleSerializer()])
+    def test_round_trip(self, serializer):
+        raw = serializer.dumps(self.data)
+        assert isinstance(raw, bytes)
+        assert serializer.loads(raw) == self.data
+
+    @pytest.mark.parametrize(
+        "module,serializer_class",
+        [("msgpack", MsgpackSerializer), ("orjson", OrjsonSerializer)],
+    )
+    def test_optional_round_trip(self, module, serializer_class):
+        pytest.importorskip(module)
+        serializer = serializer_class()
+        assert serializer.loads(serializer.dumps(self.data)) == self.data
+
+    def test_event_loads_data_type(self):
+        """Test that the data is rebuilt with the data type of the event class."""
+        event = Paid(Payload("name", 10), sequence_order=1, version=1)
+        loaded = Paid.loads(event.dumps(), sequence_order=1, version=1)
+        assert isinstance(loaded.data, Payload)
+        assert (loaded.data.name, loaded.data.amount) == ("name", 10)
+
+    def test_default_serializer(self):
+        """Test that the store serializer is used unless the class sets one."""
+        raw = Paid(Payload("name", 10)).dumps(PickleSerializer())
+        assert Paid.loads(raw, PickleSerializer()).data == {
+            "name": "name",
+            "amount": 10,
+        }
+        snapshot = PickleSnapshot(data=self.data)
+        assert PickleSnapshot.loads(snapshot.dumps(JsonSerializer())).data == self.data
+
+    def test_snapshot_dumps_loads(self):
+        """Test that snapshots are serialized with the serializer of their class."""
+        snapshot = PickleSnapshot(data=self.data, sequence_order=1, version=2)
+        loaded = PickleSnapshot.loads(snapshot.dumps(), sequence_order=1, version=2)
+        assert isinstance(loaded, PickleSnapshot)
+        assert (loaded.data, loaded.sequence_order, loaded.version) == (self.data, 1, 2)
+
+    def test_snapshot_class_of_aggregate(self):
+        """Test that aggregates are snapshotted and restored with their snapshot class."""
+        store = PickledAccountStore()
+        store.save(PickledAccount("a").apply(Paid(Payload("name", 10))))
+        assert store.take_snapshot("a")
+        snapshot = store.get_last_snapshot("a", PickleSnapshot)
+        assert isinstance(snapshot, PickleSnapshot)
+        assert PickleSnapshot.create(PickledAccount("b")).__class__ is PickleSnapshot
+        raw = snapshot.dumps(JsonSerializer())
+        assert raw == PickleSerializer().dumps({"balance": 10})
+        assert store.load("a").balance == 10
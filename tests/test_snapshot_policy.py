@@ -0,0 +1,112 @@
+import pytest
+from unittest.mock import patch
+
+from pyeventor.event import Event, JsonSnapshot
+from pyeventor.aggregate import Aggregate
+from pyeventor.decorator import register_handler
+from pyeventor.plugins.in_memory_store import InMemoryEventStore
+from pyeventor.snapshot_policy import (
+    EveryNVersions,
+    TailLength,
+    ReplayTime,
+    TimeInterval,
+    AnyOf,
+)
+
+
+class Incremented(Event[int, int]):
+    __type_name__ = "snapshot_policy.Incremented"
+
+
+class Counter(Aggregate):
+    snapshot_policy = EveryNVersions(3)
+
+    def _init_empty_attributes(self):
+        self.value = 0
+
+    @register_handler(Incremented)
+    def incremented(self, event: Incremented):
+        self.value += event.data
+
+
+class CounterStore(InMemoryEventStore):
+    _AggregatedClass = Counter
+
+
+def snapshot_versions(aggregate):
+    return [
+        e.version for e in aggregate.uncommmited_events if isinstance(e, JsonSnapshot)
+    ]
+
+
+class TestSnapshotPolicy:
+    def test_every_n_versions_after_reload(self):
+        """Test that the cadence follows the stream version, not the events applied in the process."""
+        store = CounterStore()
+        store.save(Counter("test_id").apply(Incremented(1)).apply(Incremented(1)))
+
+        counter = store.load("test_id", from_snapshots=False)
+        counter.apply(Incremented(1)).apply(Incremented(1))
+        assert snapshot_versions(counter) == [3]
+
+    def test_auto_snapshot_each_n(self):
+        """Test that auto_snapshot_each_n overrides the class policy."""
+        counter = Counter("test_id", auto_snapshot_each_n=2)
+        for _ in range(4):
+            counter.apply(Incremented(1))
+        assert snapshot_versions(counter) == [2, 4]
+
+    def test_tail_length(self):
+        """Test that the tail is counted from the snapshot the aggregate was loaded from."""
+        store = CounterStore()
+        store.save(Counter("test_id").apply(Incremented(1)))
+        store.save_snapshots([JsonSnapshot({"value": 1}, version=1)], "test_id")
+
+        counter = store.load("test_id")
+        counter._snapshot_policy = TailLength(2)
+        assert counter.snapshot_version == 1
+        counter.apply(Incremented(1))
+        assert snapshot_versions(counter) == []
+        counter.apply(Incremented(1))
+        assert snapshot_versions(counter) == [3]
+        assert counter.events_since_snapshot == 0
+
+    def test_replay_time(self):
+        """Test that the replay cost measured on load is used to estimate the tail replay time."""
+        store = CounterStore()
+        store.save(Counter("test_id").apply(Incremented(1)).apply(Incremented(1)))
+        counter = Counter("test_id", snapshot_policy=ReplayTime(1.0))
+        counter.apply(Incremented(1))
+        assert snapshot_versions(counter) == []
+
+        counter = store.load("test_id")
+        assert counter.replay_seconds_per_event is not None
+        counter._replay_seconds_per_event = 0.5
+        counter._snapshot_policy = ReplayTime(1.0)
+        counter.apply(Incremented(1))
+        assert snapshot_versions(counter) == [3]
+
+    def test_time_interval(self):
+        """Test that snapshots are taken when the last one is older than the interval."""
+        with patch("pyeventor.aggregate.time", return_value=100):
+            counter = Counter("test_id", snapshot_policy=TimeInterval(60))
+        with patch("pyeventor.snapshot_policy.time", return_value=150), patch(
+            "pyeventor.aggregate.time", return_value=150
+        ):
+            counter.apply(Incremented(1))
+        assert snapshot_versions(counter) == []
+        with patch("pyeventor.snapshot_policy.time", return_value=160), patch(
+            "pyeventor.aggregate.time", return_value=160
+        ):
+            counter.apply(Incremented(1))
+        assert snapshot_versions(counter) == [2]
+        assert counter.snapshot_time == 160
+
+    @pytest.mark.parametrize(
+        "policy,expected",
+        [(AnyOf(TailLength(5), EveryNVersions(2)), [2]), (AnyOf(), [])],
+    )
+    def test_any_of(self, policy, expected):
+        counter = Counter("test_id", snapshot_policy=policy)
+        counter.apply(Incremented(1)).apply(Incremented(1)).apply(Incremented(1))
+        assert snapshot_versions(counter) == expected
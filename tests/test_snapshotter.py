@@ -0,0 +1,101 @@
+import pytest
+from threading import Event as ThreadEvent
+from unittest.mock import patch
+
+from pyeventor.event import Event, JsonSnapshot
+from pyeventor.aggregate import Aggregate
+from pyeventor.decorator import register_handler
+from pyeventor.plugins.in_memory_store import InMemoryEventStore
+from pyeventor.snapshotter import BackgroundSnapshotter
+
+
+class Incremented(Event[int, int]):
+    __type_name__ = "snapshotter.Incremented"
+
+
+class Counter(Aggregate):
+    def _init_empty_attributes(self):
+        self.value = 0
+
+    @register_handler(Incremented)
+    def incremented(self, event: Incremented):
+        self.value += event.data
+
+
+class CounterStore(InMemoryEventStore):
+    _AggregatedClass = Counter
+
+
+def increment(store, aggregate_id, n):
+    counter = store.load(aggregate_id)
+    for _ in range(n):
+        counter.apply(Incremented(1))
+    store.save(counter)
+
+
+class TestBackgroundSnapshotter:
+    @pytest.fixture
+    def store(self):
+        return CounterStore()
+
+    def test_take_snapshot(self, store):
+        """Test that the snapshot is saved at the stored version and used on load."""
+        increment(store, "test_id", 3)
+        assert store.take_snapshot("test_id")
+        assert not store.take_snapshot("test_id")
+
+        snapshot = store.get_last_snapshot("test_id", JsonSnapshot)
+        assert snapshot.version == 3
+        assert snapshot.data == {"value": 3}
+        increment(store, "test_id", 1)
+        counter = store.load("test_id")
+        assert (counter.value, counter.version, counter.snapshot_version) == (4, 4, 3)
+
+    def test_snapshots_after_threshold(self, store):
+        """Test that saved aggregates are snapshotted once their tail reaches the threshold."""
+        with BackgroundSnapshotter(store, threshold=3) as snapshotter:
+            store.snapshotter = snapshotter
+            increment(store, "test_id", 2)
+            increment(store, "other_id", 3)
+        assert snapshotter.snapshots_taken == 1
+        assert store.get_last_snapshot("test_id") is None
+        assert store.get_last_snapshot("other_id").version == 3
+
+    def test_notified_once_committed(self, store):
+        """Test that the snapshotter is notified by the after commit hook of the save."""
+        callbacks = []
+        with BackgroundSnapshotter(store, threshold=3) as snapshotter:
+            store.snapshotter = snapshotter
+            with patch.object(store, "after_commit", side_effect=callbacks.append):
+                increment(store, "test_id", 3)
+            assert len(callbacks) == 1
+            with patch.object(snapshotter, "submit") as mock_submit:
+                callbacks[0]()
+                mock_submit.assert_called_once_with("test_id")
+
+    def test_backpressure(self, store):
+        """Test that submit drops aggregates when the queue stays full."""
+        increment(store, "a", 1)
+        increment(store, "b", 1)
+        release = ThreadEvent()
+        take_snapshot = store.take_snapshot
+
+        def blocked_take_snapshot(aggregate_id):
+            release.wait()
+            return take_snapshot(aggregate_id)
+
+        snapshotter = BackgroundSnapshotter(store, max_pending=1, timeout=0.01)
+        with patch.object(store, "take_snapshot", side_effect=blocked_take_snapshot):
+            assert snapshotter.submit("a")
+            assert not snapshotter.submit("b")
+            release.set()
+            snapshotter.close()
+        assert (snapshotter.snapshots_taken, snapshotter.dropped) == (1, 1)
+
+    def test_errors_are_counted(self, store):
+        snapshotter = BackgroundSnapshotter(store)
+        with patch.object(store, "take_snapshot", side_effect=ValueError("failed")):
+            snapshotter.submit("test_id")
+            snapshotter.close()
+        assert snapshotter.errors == 1
+        assert isinstance(snapshotter.last_error, ValueError)